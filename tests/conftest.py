@@ -0,0 +1,92 @@
+#pylint: disable=missing-docstring
+import asyncio
+import sys
+import pytest
+from worth.db.adapter import Db
+from worth.db.db_state import DbState
+
+class FakeDb:
+    """Async db stand-in answering queries from canned results.
+
+    `results` maps an SQL fragment (e.g. a table name) to what queries
+    containing it return: a value, or a function of the bind params.
+    The first matching fragment wins. Every query is recorded in
+    `queries` as (sql, params).
+    """
+
+    def __init__(self, results=None, delay=0):
+        self.results = dict(results or {})
+        self.queries = []
+        self.delay = delay
+
+    def count(self, fragment):
+        """Number of queries run which contain `fragment`."""
+        return sum(1 for sql, _ in self.queries if fragment in sql)
+
+    def params(self, fragment):
+        """Bind params of queries which contain `fragment`."""
+        return [params for sql, params in self.queries if fragment in sql]
+
+    def _result(self, sql, params):
+        self.queries.append((sql, params))
+        for fragment, result in self.results.items():
+            if fragment in sql:
+                return result(**params) if callable(result) else result
+        return None
+
+    async def _answer(self, sql, params):
+        result = self._result(sql, params)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return result
+
+    async def query_all(self, sql, **params):
+        return await self._answer(sql, params) or []
+
+    async def query_col(self, sql, **params):
+        return await self._answer(sql, params) or []
+
+    async def query_row(self, sql, **params):
+        return await self._answer(sql, params)
+
+    async def query_one(self, sql, **params):
+        return await self._answer(sql, params)
+
+    async def query_primary_one(self, sql, **params):
+        return await self._answer(sql, params)
+
+    async def query(self, sql, **params):
+        return await self._answer(sql, params)
+
+class FakeIndexerDb(FakeDb):
+    """Sync variant of `FakeDb`, standing in for the indexer `Db`."""
+
+    def query_all(self, sql, **params):
+        return self._result(sql, params) or []
+
+    def query_col(self, sql, **params):
+        return self._result(sql, params) or []
+
+    def query_row(self, sql, **params):
+        return self._result(sql, params)
+
+    def query_one(self, sql, **params):
+        return self._result(sql, params)
+
+    def query(self, sql, **params):
+        return self._result(sql, params)
+
+@pytest.fixture
+def fake_db():
+    return FakeDb()
+
+@pytest.fixture
+def indexer_db(monkeypatch):
+    """Shared indexer `Db`, also swapped into already imported modules."""
+    db = FakeIndexerDb()
+    monkeypatch.setattr(Db, '_instance', db)
+    monkeypatch.setattr(DbState, '_db', db)
+    for name, module in list(sys.modules.items()):
+        if name.startswith('worth.indexer.') and hasattr(module, 'DB'):
+            monkeypatch.setattr(module, 'DB', db)
+    return db
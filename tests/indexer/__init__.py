@@ -0,0 +1 @@
+"""Worth indexer tests."""
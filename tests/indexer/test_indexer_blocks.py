@@ -0,0 +1,12 @@
+#pylint: disable=missing-docstring,import-outside-toplevel
+
+def test_save_trxids(indexer_db):
+    from worth.indexer.blocks import Blocks
+    Blocks.save_trxids([])
+    assert not indexer_db.queries
+
+    trx_id = bytes.fromhex('ab' * 20)
+    Blocks.save_trxids([(trx_id, 5), (bytes(20), 5)])
+    [(sql, params)] = indexer_db.queries
+    assert sql.endswith('VALUES (:id_0, :num_0), (:id_1, :num_1)')
+    assert params == dict(id_0=trx_id, num_0=5, id_1=bytes(20), num_1=5)
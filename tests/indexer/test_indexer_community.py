@@ -0,0 +1,43 @@
+#pylint: disable=missing-docstring,import-outside-toplevel
+from decimal import Decimal
+
+def _post(cid, cached_payout):
+    return dict(category='art', depth=0, community_id=cid,
+                cached_payout=cached_payout, cached_paidout=False)
+
+def test_community_pending(indexer_db):
+    from worth.indexer.cached_post import CachedPost
+    from worth.indexer.community import Community
+    from worth.indexer.tag_stats import TagStats
+    Community._pending = {}
+
+    # deltas match the DECIMAL(10,3) column the payouts are stored in
+    CachedPost._track_pending(_post(7, None), Decimal('0.4996'), False)
+    CachedPost._track_pending(_post(7, Decimal('0.500')), Decimal('1.2504'), False)
+    assert Community._pending == {7: [Decimal('1.250'), 1]}
+
+    # whole units are written, the fraction is carried over
+    sqls = Community.pending_sqls()
+    assert [p for _, p in sqls] == [dict(id=7, payout=1, posts=1)]
+    assert Community._pending == {7: [Decimal('0.250'), 0]}
+    CachedPost._track_pending(_post(7, Decimal('1.250')), Decimal('2.0'), False)
+    assert [p['payout'] for _, p in Community.pending_sqls()] == [1]
+    assert Community._pending == {}
+    TagStats._pending = {}
+
+def test_community_roles(indexer_db):
+    from worth.indexer.community import Community, Role
+    indexer_db.results['worth_roles'] = [(7, 1, Role.admin.value),
+                                         (7, 2, Role.member.value)]
+    Community.load_roles()
+    assert Community.get_user_role(7, 1) == Role.admin.value
+    assert Community.get_user_role(7, 3) == Role.guest.value
+    assert Community.get_user_role(8, 1) == Role.guest.value
+
+    # role changes are reflected without a query
+    Community.set_user_role(7, 3, Role.mod.value)
+    Community.set_user_role(7, 1, Role.guest.value)
+    assert Community.get_user_role(7, 3) == Role.mod.value
+    assert Community.get_user_role(7, 1) == Role.guest.value
+    assert indexer_db.count('worth_roles') == 1
+    Community._roles = {}
@@ -0,0 +1,63 @@
+#pylint: disable=missing-docstring,import-outside-toplevel
+import pytest
+
+LAST = 'SELECT entry_id, (created_at'
+APPEND = 'RETURNING post_id'
+EXISTS = 'SELECT 1 FROM worth_feed_cache'
+SHIFT = 'SET entry_id = entry_id + 1'
+INBOX = 'INSERT INTO worth_feed_inbox'
+
+@pytest.fixture
+def feed_cache(indexer_db, monkeypatch):
+    from worth.db.db_state import DbState
+    from worth.indexer.feed_cache import FeedCache
+    monkeypatch.setattr(DbState, '_is_initial_sync', False)
+    monkeypatch.setattr(FeedCache, '_fanout_limit', 0)
+    return FeedCache
+
+def test_feed_insert_append(feed_cache, indexer_db):
+    indexer_db.results[APPEND] = [5]
+
+    # first entry of a blog, then appends after the last entry
+    feed_cache.insert(5, 1, '2020-01-01T00:00:00')
+    indexer_db.results[LAST] = (4, True)
+    feed_cache.insert(5, 1, '2020-01-01T00:00:00')
+    assert [p['entry_id'] for p in indexer_db.params(APPEND)] == [0, 5]
+    assert indexer_db.count(EXISTS) == 0
+    assert indexer_db.count(SHIFT) == 0
+
+def test_feed_insert_shift(feed_cache, indexer_db):
+    # older than the last entry: later entries are shifted
+    indexer_db.results[LAST] = (4, False)
+    feed_cache.insert(5, 1, '2020-01-01T00:00:00')
+    assert indexer_db.count(APPEND) == 0
+    assert indexer_db.params(SHIFT) == [dict(account_id=1, id=5,
+                                              created_at='2020-01-01T00:00:00')]
+    assert indexer_db.count('COALESCE') == 1
+
+    # already in the blog: nothing moves
+    indexer_db.queries = []
+    indexer_db.results[EXISTS] = 1
+    feed_cache.insert(5, 1, '2020-01-01T00:00:00')
+    assert indexer_db.count(SHIFT) == 0
+    assert indexer_db.count('INSERT') == 0
+
+def test_feed_insert_duplicate(feed_cache, indexer_db, monkeypatch):
+    monkeypatch.setattr(feed_cache, '_fanout_limit', 100)
+    indexer_db.results['followers'] = 10
+    indexer_db.results[LAST] = (4, True)
+
+    # appended and fanned out once; a replayed append is a no-op
+    indexer_db.results[APPEND] = [5]
+    feed_cache.insert(5, 1, '2020-01-01T00:00:00')
+    indexer_db.results[APPEND] = []
+    feed_cache.insert(5, 1, '2020-01-01T00:00:00')
+    assert [p['fanned_out'] for p in indexer_db.params(APPEND)] == [True, True]
+    assert indexer_db.count(INBOX) == 1
+
+def test_feed_delete(feed_cache, indexer_db):
+    # each blog the post was in closes its gap
+    indexer_db.results['SELECT account_id, entry_id'] = [(1, 3), (2, 0)]
+    feed_cache.delete(5)
+    assert indexer_db.params('entry_id - 1') == [dict(account_id=1, entry_id=3),
+                                                 dict(account_id=2, entry_id=0)]
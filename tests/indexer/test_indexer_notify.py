@@ -0,0 +1,83 @@
+#pylint: disable=missing-docstring,import-outside-toplevel
+import pytest
+
+COUNTER = 'INSERT INTO worth_notifs_unread'
+
+@pytest.fixture
+def notify(indexer_db, monkeypatch):
+    from worth.db.db_state import DbState
+    from worth.indexer.notify import Notify
+    monkeypatch.setattr(DbState, '_is_initial_sync', False)
+    monkeypatch.setattr(Notify, '_partitioned', False)
+    return Notify
+
+def _write(notify, **kwargs):
+    kwargs.setdefault('dst_id', 2)
+    notify('vote', when='2020-01-01T00:00:00', src_id=1, **kwargs).write()
+
+def test_notify_unread_bucket(notify, indexer_db):
+    for score in (24, 25, 99, None):
+        _write(notify, score=score)
+    assert indexer_db.count('INSERT INTO worth_notifs ') == 4
+    assert [p['bucket'] for p in indexer_db.params(COUNTER)] == [0, 25, 75, 25]
+    assert indexer_db.params(COUNTER)[0] == dict(
+        bucket=0, dst_id=2, created_at='2020-01-01T00:00:00')
+
+def test_notify_unread_skipped(notify, indexer_db, monkeypatch):
+    from worth.db.db_state import DbState
+    _write(notify, dst_id=None)
+    _write(notify, score=-10)
+    monkeypatch.setattr(DbState, '_is_initial_sync', True)
+    _write(notify)
+    assert indexer_db.count('INSERT INTO worth_notifs ') == 3
+    assert indexer_db.count(COUNTER) == 0
+
+def test_notify_reconcile_next(notify, indexer_db, monkeypatch):
+    monkeypatch.setattr(notify, 'RECONCILE_SLICE', 100)
+    monkeypatch.setattr(notify, '_reconcile_from', 0)
+    indexer_db.results['MAX(id)'] = 150
+
+    # slices cover [0, 100) and [100, 200), then start over
+    notify.reconcile_next()
+    notify.reconcile_next()
+    notify.reconcile_next()
+    assert indexer_db.params(COUNTER) == [dict(lo=0, hi=100), dict(lo=100, hi=200),
+                                          dict(lo=0, hi=100)]
+
+def test_notify_partition(notify, indexer_db, monkeypatch):
+    monkeypatch.setattr(notify, '_partitioned', True)
+    monkeypatch.setattr(notify, '_months', set())
+    _write(notify)
+    _write(notify)
+    notify('vote', when='2020-12-31T23:59:59', src_id=1, dst_id=2).write()
+
+    # one partition per month; December ends at the next year
+    sqls = [sql for sql, _ in indexer_db.queries if 'PARTITION OF' in sql]
+    assert len(sqls) == 2
+    assert "FROM ('2020-01-01') TO ('2020-02-01')" in sqls[0]
+    assert "worth_notifs_202012" in sqls[1]
+    assert "FROM ('2020-12-01') TO ('2021-01-01')" in sqls[1]
+
+def test_notify_prune(notify, indexer_db, monkeypatch):
+    from datetime import datetime
+    from worth.indexer import notify as notify_module
+
+    class _Now(datetime):
+        @classmethod
+        def utcnow(cls):
+            return datetime(2020, 3, 15)
+
+    monkeypatch.setattr(notify_module, 'datetime', _Now)
+    monkeypatch.setattr(notify, '_partitioned', True)
+    monkeypatch.setattr(notify, '_retention_days', 30)
+    monkeypatch.setattr(notify, '_months', {'2019-12', '2020-01', '2020-02'})
+    indexer_db.results['pg_inherits'] = ['worth_notifs_202002', 'worth_notifs_201912',
+                                         'worth_notifs_202001', 'worth_notifs_202003']
+    indexer_db.results['SELECT DISTINCT dst_id'] = [2, 3]
+
+    # cutoff is 2020-02-14: partitions ending by then are dropped
+    notify.prune()
+    assert [sql for sql, _ in indexer_db.queries if 'DROP' in sql] == [
+        'DROP TABLE worth_notifs_201912', 'DROP TABLE worth_notifs_202001']
+    assert notify._months == {'2020-02'}
+    assert indexer_db.params('account_id IN :ids') == [dict(ids=(2, 3))]
@@ -0,0 +1,50 @@
+#pylint: disable=missing-docstring,import-outside-toplevel
+import pytest
+
+SWAP = ['START TRANSACTION', 'DROP TABLE payout_stats',
+        'ALTER TABLE payout_stats_new RENAME TO payout_stats',
+        'ALTER INDEX payout_stats_new_ix1 RENAME TO payout_stats_ix1', 'COMMIT']
+
+@pytest.fixture
+def payout_stats(indexer_db, monkeypatch):
+    from worth.indexer.payout_stats import PayoutStats
+    monkeypatch.setattr(PayoutStats, '_build', None)
+    return PayoutStats
+
+def _sqls(db):
+    return [' '.join(sql.split()) for sql, _ in db.queries]
+
+def test_payout_stats_generate(payout_stats, indexer_db):
+    payout_stats.generate()
+    sqls = _sqls(indexer_db)
+    assert sqls[0] == 'DROP TABLE IF EXISTS payout_stats_new'
+    assert sqls[-5:] == SWAP
+    assert len(sqls) == 9
+
+def test_payout_stats_async(payout_stats, indexer_db):
+    # built on its own connection; swapped in between blocks
+    build_db = type(indexer_db)()
+    payout_stats.generate_async(build_db)
+    build = payout_stats._build
+    payout_stats.generate_async(build_db)
+    build.result()
+    assert len(build_db.queries) == 4
+    assert not indexer_db.queries
+
+    payout_stats.swap_built()
+    assert _sqls(indexer_db) == SWAP
+    assert payout_stats._build is None
+    payout_stats.swap_built()
+    assert len(indexer_db.queries) == 5
+
+def test_payout_stats_async_failed(payout_stats, indexer_db):
+    def _fail(**_):
+        raise Exception('build failed')
+    build_db = type(indexer_db)({'INSERT INTO payout_stats_new': _fail})
+    payout_stats.generate_async(build_db)
+    payout_stats._build.exception()
+
+    # a failed build is dropped without touching payout_stats
+    payout_stats.swap_built()
+    assert payout_stats._build is None
+    assert not indexer_db.queries
@@ -0,0 +1,26 @@
+#pylint: disable=missing-docstring,import-outside-toplevel
+
+def _post(pid, root_id=None):
+    return dict(id=pid, depth=0 if root_id is None else 1, category='art',
+                community_id=7, is_valid=True, is_muted=False, root_id=root_id)
+
+def test_posts_props(indexer_db):
+    from worth.indexer.posts import Posts
+    Posts.invalidate_props()
+    indexer_db.results['FROM worth_posts'] = (1, 'dog', None, True, False, 5)
+
+    # freshly written posts are served from the cache
+    Posts._set_props(_post(1))
+    Posts._set_props(_post(2, root_id=1))
+    assert Posts._get_props(1) == (0, 'art', 7, True, False, 1)
+    assert Posts._get_props(2) == (1, 'art', 7, True, False, 1)
+    assert indexer_db.count('FROM worth_posts') == 0
+
+    # misses are loaded once; mutes drop the entry
+    assert Posts._get_props(6) == (1, 'dog', None, True, False, 5)
+    assert Posts._get_props(6) == (1, 'dog', None, True, False, 5)
+    assert indexer_db.count('FROM worth_posts') == 1
+    Posts.invalidate_props(1)
+    Posts._get_props(1)
+    assert indexer_db.params('FROM worth_posts') == [dict(id=6), dict(id=1)]
+    Posts.invalidate_props()
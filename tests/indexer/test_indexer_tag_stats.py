@@ -0,0 +1,32 @@
+#pylint: disable=missing-docstring
+from decimal import Decimal
+
+def _post(category, depth, cached_payout, cached_paidout=False):
+    return dict(category=category, depth=depth, community_id=None,
+                cached_payout=cached_payout, cached_paidout=cached_paidout)
+
+def _deltas(sqls):
+    return {p['category']: (p['payout'], p['posts'], p['top_posts'])
+            for _, p in sqls}
+
+def test_tag_stats(indexer_db):
+    # pylint: disable=import-outside-toplevel
+    from worth.indexer.cached_post import CachedPost
+    from worth.indexer.tag_stats import TagStats
+    TagStats._pending = {}
+
+    # insert: new pending post and comment
+    CachedPost._track_pending(_post('art', 0, None), Decimal('1.5'), False)
+    CachedPost._track_pending(_post('art', 1, None), Decimal('0.5'), False)
+    # vote: payout delta only
+    CachedPost._track_pending(_post('art', 0, Decimal('1.5')), Decimal('4'), False)
+    # unchanged: nothing tracked
+    CachedPost._track_pending(_post('dog', 0, Decimal('2')), Decimal('2'), False)
+    assert _deltas(TagStats.pending_sqls()) == {'art': (Decimal('4.5'), 2, 1)}
+    assert TagStats.pending_sqls() == []
+
+    # payout: leaves the pending stats
+    CachedPost._track_pending(_post('art', 0, Decimal('4')), Decimal('4.2'), True)
+    # delete of a pending comment (see CachedPost.delete)
+    TagStats.track('art', -Decimal('0.5'), -1, 0)
+    assert _deltas(TagStats.pending_sqls()) == {'art': (Decimal('-4.5'), -2, -1)}
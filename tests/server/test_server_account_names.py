@@ -0,0 +1,18 @@
+#pylint: disable=missing-docstring
+import pytest
+from worth.server.common.account_names import AccountNames
+
+@pytest.mark.asyncio
+async def test_account_names(fake_db, monkeypatch):
+    monkeypatch.setattr(AccountNames, 'CACHE_SIZE', 2)
+    fake_db.results['worth_accounts'] = lambda ids: [
+        (_id, 'acct%d' % _id) for _id in ids if _id != 404]
+    names = AccountNames(fake_db)
+    assert await names.names([1, 2, 404]) == {1: 'acct1', 2: 'acct2'}
+    assert await names.names([2]) == {2: 'acct2'}
+    assert fake_db.count('worth_accounts') == 1
+
+    # least recently used names are evicted
+    await names.names([3])
+    assert await names.names([1, 2]) == {1: 'acct1', 2: 'acct2'}
+    assert sorted(fake_db.params('worth_accounts')[-1]['ids']) == [1]
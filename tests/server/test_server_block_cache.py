@@ -0,0 +1,32 @@
+#pylint: disable=missing-docstring
+import asyncio
+import pytest
+from worth.server.common.block_cache import BlockCache
+
+class FakeWorths:
+    def __init__(self):
+        self.calls = []
+
+    def get_block(self, num, strict=True):
+        self.calls.append(num)
+        return None if num > 100 else {'num': num}
+
+@pytest.mark.asyncio
+async def test_block_cache():
+    worths = FakeWorths()
+    cache = BlockCache(worths, size=2)
+
+    blocks = await asyncio.gather(cache.get(1), cache.get(1), cache.get(2))
+    assert [b['num'] for b in blocks] == [1, 1, 2]
+    assert sorted(worths.calls) == [1, 2]
+
+    assert (await cache.get(1))['num'] == 1
+    assert len(worths.calls) == 2
+
+    await cache.get(3) # evicts 2
+    await cache.get(2)
+    assert worths.calls.count(2) == 2
+
+    assert await cache.get(101) is None
+    assert await cache.get(101) is None
+    assert worths.calls.count(101) == 2
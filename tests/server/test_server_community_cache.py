@@ -0,0 +1,46 @@
+#pylint: disable=missing-docstring
+import pytest
+from worth.server.common.community_cache import CommunityCache
+
+def _rows(rows, ids):
+    return [r for r in rows if not ids or r[0] in ids]
+
+@pytest.mark.asyncio
+async def test_community_cache(fake_db):
+    state = dict(head=1, notif_id=10, changed=[], deleted=[],
+                 titles={1: 'one', 2: 'two'}, pins=[(1, 100), (1, 101)])
+    fake_db.results.update({
+        'MAX(id)': lambda: state['notif_id'],
+        'DISTINCT community_id FROM worth_notifs': lambda **_: state['changed'],
+        'is_deleted = \'1\'': lambda ids: state['deleted'],
+        'worth_communities': lambda ids: _rows(
+            [(cid, 'worth-%d' % cid, title) for cid, title in state['titles'].items()], ids),
+        'worth_roles': lambda ids: _rows([(1, 7, 4, 'boss')], ids),
+        'is_pinned': lambda ids: _rows(state['pins'], ids)})
+
+    async def head_block():
+        return state['head']
+
+    cache = CommunityCache(fake_db, head_block)
+    await cache.load([1, 2])
+    assert cache.title(1) == 'one' and cache.name(2) == 'worth-2'
+    assert cache.role(1, 7) == (4, 'boss') and cache.role(2, 7) == (0, '')
+    assert cache.pinned(1) == [101, 100] and cache.is_pinned(1, 100)
+
+    # same block: no queries
+    queries = len(fake_db.queries)
+    await cache.load([1, 2])
+    assert len(fake_db.queries) == queries
+
+    # new block: only communities with change notifs are reloaded
+    state.update(head=2, notif_id=12, changed=[1], titles={1: 'uno', 2: 'dos'},
+                 pins=[(1, 101)])
+    await cache.load([1, 2])
+    assert cache.title(1) == 'uno' and cache.title(2) == 'two'
+    assert cache.pinned(1) == [101]
+    assert fake_db.params('worth_communities')[-1]['ids'] == (1,)
+
+    # a deleted pin reloads its community without any notification
+    state.update(head=3, changed=[], deleted=[1], pins=[])
+    await cache.load([1, 2])
+    assert cache.pinned(1) == []
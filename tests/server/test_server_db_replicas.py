@@ -0,0 +1,98 @@
+#pylint: disable=missing-docstring
+import asyncio
+import pytest
+from psycopg2 import InterfaceError, OperationalError
+from worth.server.db import Db
+
+class FakeCursor:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def execute(self, sql, params):
+        if self.pool.down:
+            raise self.pool.down
+        self.pool.queries.append(sql)
+
+    async def fetchone(self):
+        return None if self.pool.head is None else [self.pool.head]
+
+    async def fetchall(self):
+        return [[self.pool.head]]
+
+class FakePool(FakeCursor):
+    def __init__(self, head):
+        super().__init__(self)
+        self.head = head
+        self.down = None
+        self.queries = []
+
+    def acquire(self):
+        return self
+
+    def cursor(self, cursor_factory):
+        return FakeCursor(self)
+
+def _db(primary, *replicas):
+    db = Db()
+    db.db = primary
+    for idx, pool in enumerate(replicas):
+        db._replicas.append(dict(name='r%d' % idx, pool=pool, head=None,
+                                 lag=None, healthy=False))
+    return db
+
+@pytest.mark.asyncio
+async def test_replica_routing():
+    primary, fresh, stale = FakePool(100), FakePool(99), FakePool(50)
+    db = _db(primary, fresh, stale)
+
+    # lag unknown until first check: reads go to primary
+    assert await db.query_one("SELECT 1") == 100
+    await asyncio.sleep(0)
+    assert [r['lag'] for r in db.replica_status()] == [1, 50]
+
+    assert await db.query_one("SELECT 1") == 99
+    assert await db.query_one("SELECT 1") == 99
+
+    # failing replica falls back to primary, writes always go to primary
+    fresh.down = OperationalError('down')
+    assert await db.query_one("SELECT 1") == 100
+    assert not db.replica_status()[0]['healthy']
+    await db.query("UPDATE x SET y = 1")
+    assert primary.queries[-1] == "UPDATE x SET y = 1"
+
+@pytest.mark.asyncio
+async def test_replica_pinning():
+    primary, r0, r1 = FakePool(100), FakePool(99), FakePool(98)
+    db = _db(primary, r0, r1)
+    await db.query_one("SELECT 1")
+    await asyncio.sleep(0)
+
+    async def request():
+        db.pin_replica()
+        return [await db.query_one("SELECT 1") for _ in range(4)]
+
+    # each request sticks to one replica; head reads bypass replicas
+    heads = await asyncio.gather(*[asyncio.ensure_future(request())
+                                   for _ in range(2)])
+    assert sorted(len(set(h)) for h in heads) == [1, 1]
+    assert {h[0] for h in heads} == {98, 99}
+    assert await db.query_primary_one("SELECT 1") == 100
+
+@pytest.mark.asyncio
+async def test_replica_lag_check_errors():
+    primary, empty, closed = FakePool(100), FakePool(None), FakePool(99)
+    closed.down = InterfaceError('closed')
+    db = _db(primary, empty, closed)
+    for replica in db._replicas:
+        replica.update(lag=0, healthy=True)
+
+    # any failure marks the replica unhealthy instead of escaping the task
+    await db._check_lag()
+    assert [r['healthy'] for r in db.replica_status()] == [False, False]
+    assert await db.query_one("SELECT 1") == 100
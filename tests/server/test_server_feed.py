@@ -0,0 +1,38 @@
+#pylint: disable=missing-docstring
+from datetime import datetime, timedelta
+import pytest
+from worth.server.common.feed import pids_by_feed_inbox
+
+T0 = datetime(2020, 1, 1)
+
+# (post_id, blogger, created_at, pulled from worth_feed_cache)
+FEED = [(1, 'alice', 1, False), (2, 'bob', 2, False), (3, 'carol', 3, True),
+        (1, 'dave', 4, False), (4, 'alice', 5, False), (1, 'erin', 6, False),
+        (2, 'erin', 7, False)]
+FEED = [(pid, name, T0 + timedelta(minutes=at), pulled)
+        for pid, name, at, pulled in FEED]
+
+def _window(pulled):
+    def window(seek=None, rows=None, **_):
+        out = [(pid, at) for pid, _, at, side in FEED
+               if side == pulled and (not seek or at <= seek)]
+        return sorted(out, key=lambda r: r[1], reverse=True)[:rows]
+    return window
+
+@pytest.mark.asyncio
+async def test_feed_inbox(fake_db):
+    fake_db.results.update({
+        'UNION ALL': lambda ids, **_: [(pid, at, name) for pid, name, at, _ in FEED
+                                       if pid in ids],
+        'worth_feed_inbox': _window(False),
+        'worth_follows': _window(True)})
+
+    async def page(start_id, limit):
+        return await pids_by_feed_inbox(fake_db, 7, start_id, limit, T0)
+
+    # recent reblogs of old posts widen the window; posts keep their first slot
+    assert await page(None, 2) == [(4, 'alice'), (3, 'carol')]
+    assert await page(3, 2) == [(3, 'carol'), (2, 'bob,erin')]
+    assert await page(1, 5) == [(1, 'alice,dave,erin')]
+    assert await page(5, 5) == []
+    assert fake_db.params('worth_feed_inbox')[0]['rows'] == 4
@@ -0,0 +1,34 @@
+#pylint: disable=missing-docstring
+from datetime import datetime
+import pytest
+from worth.server.condenser_api import cursor
+
+def test_follow_cursor():
+    token = cursor.follow_cursor(dict(created_at=datetime(2020, 1, 2, 3, 4, 5),
+                                      account_id=42))
+    assert cursor._parse_follow_cursor(token) == (datetime(2020, 1, 2, 3, 4, 5), 42)
+    with pytest.raises(AssertionError):
+        cursor._parse_follow_cursor('bogus')
+
+@pytest.mark.asyncio
+async def test_follows_seek(fake_db):
+    db = fake_db
+    db.results.update({
+        'WHERE name = :n': 7,
+        'OFFSET :offset': (datetime(2020, 1, 2, 3, 4, 5), 42),
+        'worth_follows': []})
+
+    # legacy pages locate their first row, then seek from it
+    await cursor.get_followers_by_page(db, 'alice', 3, 10, 'blog')
+    seek, page = db.params('worth_follows')
+    assert seek == dict(account_id=7, state_a=1, state_b=3, limit=31, offset=30)
+    assert page['created_at'] == datetime(2020, 1, 2, 3, 4, 5)
+    assert page['other_id'] == 42
+
+    # cursors resume after the row they point at
+    db.queries = []
+    token = cursor.follow_cursor(dict(created_at=datetime(2020, 1, 1), account_id=5))
+    await cursor.list_follows(db, 'follower', 'alice', token, 'ignore', 20)
+    assert db.params('worth_follows') == [dict(account_id=7, state_a=2, state_b=3,
+                                               limit=20, created_at=datetime(2020, 1, 1),
+                                               other_id=4)]
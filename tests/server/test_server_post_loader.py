@@ -0,0 +1,31 @@
+#pylint: disable=missing-docstring
+import asyncio
+import pytest
+from worth.server.common.post_loader import PostLoader
+
+@pytest.mark.asyncio
+async def test_post_loader(fake_db):
+    fake_db.delay = 0.01
+    fake_db.results['worth_posts_cache'] = lambda ids: [
+        dict(post_id=pid, author='a') for pid in ids if pid != 404]
+    head = [1]
+
+    async def head_block():
+        return head[0]
+
+    loader = PostLoader(fake_db, head_block)
+
+    # concurrent requests are fetched in a single batch
+    res = await asyncio.gather(loader.load([1, 2]), loader.load([2, 3, 404]))
+    assert list(res[0]) == [1, 2] and sorted(res[1]) == [2, 3]
+    assert [sorted(p['ids']) for p in fake_db.params('worth_posts_cache')] \
+        == [[1, 2, 3, 404]]
+
+    # rows are cached per block and returned as copies
+    res[0][1]['author'] = 'changed'
+    assert (await loader.load([1, 3]))[1]['author'] == 'a'
+    assert fake_db.count('worth_posts_cache') == 1
+
+    head[0] = 2
+    await loader.load([1])
+    assert sorted(fake_db.params('worth_posts_cache')[-1]['ids']) == [1]
@@ -0,0 +1,35 @@
+#pylint: disable=missing-docstring
+from datetime import datetime
+import pytest
+from worth.server.common.posts_status import PostsStatus
+
+@pytest.mark.asyncio
+async def test_posts_status(fake_db):
+    rows = [(10, 'alice', 1), (0, 'bob', 3), (12, '', 2), (11, '', 2)]
+    updated_at = [datetime(2020, 1, 1)]
+    fake_db.results['COUNT(*)'] = lambda: (len(rows), updated_at[0])
+    fake_db.results['worth_posts_status'] = lambda: list(rows)
+    status = PostsStatus(fake_db)
+    status.CHECK_INTERVAL = 0
+    await status.refresh()
+    assert status.hidden_posts == {10}
+    assert status.hidden_authors == {'bob'}
+    assert status.listed_authors == {'alice', 'bob'}
+    assert status.post_ids(2) == [12, 11]
+
+    # unchanged version: no reload
+    await status.refresh()
+    assert status.hidden_posts == {10}
+    assert fake_db.count('list_type') == 1
+
+    del rows[0]
+    await status.refresh()
+    assert fake_db.count('list_type') == 2
+    assert not status.hidden_posts
+    assert status.post_ids(2) == [12, 11]
+
+    # updated in place: same row count, newer updated_at
+    rows[0] = (0, 'bob', 1)
+    updated_at[0] = datetime(2020, 1, 2)
+    await status.refresh()
+    assert status.hidden_posts == {0} and not status.hidden_authors
@@ -0,0 +1,51 @@
+#pylint: disable=missing-docstring
+from datetime import datetime, timedelta
+import pytest
+from worth.server.common.posts_status import PostsStatus
+from worth.server.common.ranking import RankingEngine
+
+T0 = datetime(2020, 1, 1)
+
+def _row(pid, trend, cid=None, paidout=False, at=T0):
+    return dict(post_id=pid, author='a%d' % pid, community_id=cid,
+                is_grayed=False, is_paidout=paidout, sc_trend=trend,
+                sc_hot=-trend, cached_at=at)
+
+@pytest.mark.asyncio
+async def test_ranking_engine(fake_db):
+    rows = [_row(i, i, cid=7 if i > 5 else None) for i in range(1, 11)]
+    hidden, deleted = [], []
+    fake_db.results.update({
+        'COUNT(*)': lambda: (len(hidden), None, None),
+        'worth_posts_status': lambda: [(None, author, 3) for author in hidden],
+        'deleted_at': lambda since: [pid for pid, at in deleted if at >= since],
+        'worth_post_tags': lambda ids: [(pid, 'tag%d' % (pid % 2)) for pid in ids],
+        'GROUP BY': [(7, 7.5, -100)],
+        ':since': lambda since: [r for r in rows if r['cached_at'] >= since],
+        'worth_posts_cache': lambda: [r for r in rows if not r['is_paidout']]})
+    engine = RankingEngine(fake_db)
+    engine.TOP_K = 4
+    engine.REFRESH_INTERVAL = 0
+    PostsStatus.CHECK_INTERVAL = 0
+
+    assert await engine.pids('trending', ('tag', ''), None, 3) == [10, 9, 8]
+    assert await engine.pids('trending', ('tag', ''), 8, 1) == [7]
+    assert await engine.pids('trending', ('tag', 'tag1'), None, 2) == [9, 7]
+    assert await engine.pids('hot', ('tag', ''), None, 2) == [1, 2]
+
+    # beyond top-k, or below the community's paid-out floor: fall back
+    assert await engine.pids('trending', ('tag', ''), 8, 2) is None
+    assert await engine.pids('trending', ('community', 7), None, 2) == [10, 9]
+    assert await engine.pids('trending', ('community', 7), None, 5) is None
+
+    # incremental update: re-rank, pay out, hide author
+    at = T0 + timedelta(minutes=1)
+    rows += [_row(2, 20, at=at), _row(10, 10, paidout=True, at=at)]
+    hidden.append('a9')
+    assert await engine.pids('trending', ('tag', ''), None, 2) == [2, 8]
+
+    # deleted posts leave the lists without waiting for a reload, including
+    # lists which are not built yet
+    deleted += [(2, at), (4, at)]
+    assert await engine.pids('trending', ('tag', ''), None, 1) == [8]
+    assert await engine.pids('trending', ('tag', 'tag0'), None, 5) == [8, 6]
@@ -0,0 +1,43 @@
+#pylint: disable=missing-docstring
+import asyncio
+import pytest
+from worth.server.common.response_cache import ResponseCache, cached_response
+
+CALLS = []
+
+@cached_response
+async def _ranked(context, sort, limit=20):
+    CALLS.append((sort, limit))
+    await asyncio.sleep(0.01)
+    return [sort, limit]
+
+@pytest.mark.asyncio
+async def test_response_cache(fake_db):
+    head = [1]
+    fake_db.results['worth_blocks'] = lambda: head[0]
+    cache = ResponseCache(fake_db)
+    cache.HEAD_TTL = 0
+    ResponseCache.set_shared_instance(cache)
+
+    # concurrent identical calls are coalesced; defaults are normalized
+    res = await asyncio.gather(_ranked(None, 'hot'), _ranked(None, 'hot', 20),
+                               _ranked(None, sort='hot', limit=20))
+    assert res == [['hot', 20]] * 3
+    assert CALLS == [('hot', 20)]
+
+    assert await _ranked(None, 'hot') == ['hot', 20]
+    assert await _ranked(None, 'trending', 5) == ['trending', 5]
+    assert len(CALLS) == 2
+
+    # new head block invalidates
+    head[0] = 2
+    assert await _ranked(None, 'hot') == ['hot', 20]
+    assert len(CALLS) == 3
+
+    stats = cache.stats()
+    assert stats['head_block'] == 2
+    assert stats['coalesced'] == 2
+    assert stats['hits'] == 1
+    assert stats['misses'] == 3
+
+    ResponseCache.set_shared_instance(None)
@@ -0,0 +1,90 @@
+#pylint: disable=missing-docstring
+import asyncio
+import pytest
+import ujson as json
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+from jsonrpcserver.methods import Methods
+from worth.server.common.helpers import RawJson
+from worth.server.rpc import Dispatcher
+
+async def echo(context, value, upper: bool = False):
+    assert value != 'bad', 'bad value'
+    return value.upper() if upper else [context, value]
+
+async def fail(context):
+    raise ValueError('boom')
+
+CALLS = []
+
+async def raw(context):
+    return {'votes': RawJson('[{"voter":"a"}]')}
+
+async def slow(context, delay):
+    CALLS.append(delay)
+    await asyncio.sleep(delay)
+    return delay
+
+def dispatcher():
+    return Dispatcher(Methods(**{'x.echo': echo, 'x.fail': fail,
+                                 'x.raw': raw, 'x.slow': slow}), 'ctx')
+
+async def call(body):
+    app = web.Application()
+    app.router.add_post('/', dispatcher().handle)
+    data = body if isinstance(body, str) else json.dumps(body)
+    async with TestClient(TestServer(app)) as client:
+        resp = await client.post('/', data=data)
+        out = await resp.text()
+    return json.loads(out) if out else None
+
+def req(method, params, _id=1):
+    return {'jsonrpc': '2.0', 'method': method, 'params': params, 'id': _id}
+
+@pytest.mark.asyncio
+async def test_dispatch():
+    assert await call(req('x.echo', ['a/b'])) == {
+        'jsonrpc': '2.0', 'result': ['ctx', 'a/b'], 'id': 1}
+    assert (await call(req('x.echo', {'value': 'a', 'upper': True})))['result'] == 'A'
+
+    # notifications get no response
+    assert await call({'jsonrpc': '2.0', 'method': 'x.echo', 'params': ['a']}) is None
+
+@pytest.mark.asyncio
+async def test_dispatch_errors():
+    def code(res):
+        return res['error']['code']
+    assert code(await call(req('x.nope', []))) == -32601
+    assert code(await call(req('x.echo', []))) == -32602
+    assert code(await call(req('x.echo', ['bad']))) == -32602
+    assert (await call(req('x.fail', [])))['error'] == {
+        'code': -32000, 'message': 'Server error', 'data': 'ValueError: boom'}
+    assert code(await call({'method': 'x.echo'})) == -32600
+    assert code(await call([])) == -32600
+    assert code(await call('{bad')) == -32700
+
+@pytest.mark.asyncio
+async def test_dispatch_batch():
+    res = await call([req('x.echo', ['a'], 1), req('x.nope', [], 2),
+                      {'jsonrpc': '2.0', 'method': 'x.echo', 'params': ['b']},
+                      {'method': 'x.echo', 'id': 3}])
+    assert len(res) == 3
+    assert {r['id'] for r in res} == {1, 2, None}
+
+@pytest.mark.asyncio
+async def test_dispatch_batch_limits(monkeypatch):
+    monkeypatch.setattr(Dispatcher, 'CALL_TIMEOUT', 0.1)
+    CALLS.clear()
+
+    # duplicate calls run once; slow calls time out individually
+    res = await call([req('x.slow', [0.01], 1), req('x.slow', [0.01], 2),
+                      req('x.slow', [1], 3)])
+    assert sorted(CALLS) == [0.01, 1]
+    res = {r['id']: r for r in res}
+    assert res[1]['result'] == res[2]['result'] == 0.01
+    assert res[3]['error']['data'] == 'TimeoutError: call timed out'
+
+@pytest.mark.asyncio
+async def test_dispatch_raw_json():
+    # pre-encoded values are spliced into the response as is
+    assert (await call(req('x.raw', [])))['result'] == {'votes': [{'voter': 'a'}]}
@@ -0,0 +1,14 @@
+#pylint: disable=missing-docstring
+from decimal import Decimal
+import pytest
+from worth.server.condenser_api.tags import get_trending_tags
+
+@pytest.mark.asyncio
+async def test_trending_tags(fake_db):
+    fake_db.results['worth_tag_stats'] = [
+        dict(category='photo', total_posts=5, top_posts=2,
+             total_payouts=Decimal('12.5'))]
+    tags = await get_trending_tags({'db': fake_db}, 'art', 10)
+    assert tags == [{'name': 'photo', 'comments': 3, 'top_posts': 2,
+                     'total_payouts': '12.500 WBD'}]
+    assert fake_db.params('worth_tag_stats') == [dict(limit=10, start_tag='art')]
@@ -0,0 +1,12 @@
+#pylint: disable=missing-docstring
+import pytest
+from worth.server.common.thread import load_tree
+
+@pytest.mark.asyncio
+async def test_load_tree(fake_db):
+    # (id, parent_id) replies of thread 1; reply 3 filtered out
+    fake_db.results['worth_posts'] = [(2, 1), (4, 3), (5, 2), (6, 2), (7, 5)]
+    assert await load_tree(fake_db, 1) == {1: [2], 2: [5, 6], 5: [7]}
+    assert await load_tree(fake_db, 1, max_depth=2) == {1: [2], 2: [5, 6]}
+    assert await load_tree(fake_db, 2) == {2: [5, 6], 5: [7]}
+    assert fake_db.params('worth_posts')[-1]['root_id'] == 2
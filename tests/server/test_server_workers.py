@@ -0,0 +1,22 @@
+#pylint: disable=missing-docstring
+from worth.server import workers
+from worth.server.workers import WorkerPool
+
+def test_restart_backoff(monkeypatch):
+    monkeypatch.setattr(workers.time, 'time', lambda: 1000.0)
+    pool = WorkerPool(lambda: None, 2)
+
+    # workers dying right after start are restarted with growing delays
+    for _ in range(3):
+        pool._schedule_restart(1, 256, 0.5)
+    assert [at - 1000 for at in pool._restarts] == [1.0, 2.0, 4.0]
+
+    # a worker which ran for a while resets the count
+    pool._restarts = []
+    pool._schedule_restart(1, 256, 3600)
+    assert [at - 1000 for at in pool._restarts] == [1.0]
+
+    # repeated immediate failures stop the pool
+    for _ in range(WorkerPool.MAX_FAILURES - 1):
+        pool._schedule_restart(1, 256, 0.5)
+    assert pool._stopping and pool._failures == WorkerPool.MAX_FAILURES
@@ -1,10 +1,13 @@
 #pylint: disable=missing-docstring,line-too-long
 from decimal import Decimal
 
+from worth.utils.normalize import rep_to_raw
 from worth.utils.post import (
     mentions,
+    post_active_votes,
     post_basic,
     post_legacy,
+    post_payload,
     post_payout,
     post_stats,
 )
@@ -189,6 +192,20 @@ def test_post_legacy():
               'url': '/spam/@test-safari/june-spam'}
     assert ret == expect
 
+def test_post_payload():
+    ret = post_payload(POST_1)
+    assert ret['url'] == '/spam/@test-safari/june-spam'
+    assert ret['curator_payout_value'] == '0.000 WBD'
+    assert 'allow_votes' not in ret
+
+def test_post_active_votes():
+    ret = post_active_votes(POST_1)
+    assert len(ret) == 4
+    assert ret[0] == {'voter': 'test-safari',
+                      'rshares': '1506388632',
+                      'percent': '10000',
+                      'reputation': rep_to_raw(49.03)}
+
 def test_post_payout():
     ret = post_payout(POST_1)
     expect = {'payout': Decimal('0.044'),
@@ -32,17 +32,23 @@ class Conf():
 
         # common
         add('--database-url', env_var='DATABASE_URL', required=False, help='database connection url', default='')
+        add('--database-replica-urls', env_var='DATABASE_REPLICA_URLS', required=False, help='comma-separated read replica urls for the API server', default='')
         add('--worths-url', env_var='WORTHS_URL', required=False, help='worths/jussi endpoint', default='https://api.wortheum.news')
         add('--muted-accounts-url', env_var='MUTED_ACCOUNTS_URL', required=False, help='url to flat list of muted accounts', default='')
 
         # server
         add('--http-server-port', type=int, env_var='HTTP_SERVER_PORT', default=8080)
+        add('--http-server-workers', type=int, env_var='HTTP_SERVER_WORKERS', help='number of pre-forked API server processes', default=1)
+        add('--db-pool-size', type=int, env_var='DB_POOL_SIZE', help='max db connections per server process', default=20)
 
         # sync
         add('--max-workers', type=int, env_var='MAX_WORKERS', help='max workers for batch requests', default=4)
         add('--max-batch', type=int, env_var='MAX_BATCH', help='max chunk size for batch requests', default=50)
         add('--trail-blocks', type=int, env_var='TRAIL_BLOCKS', help='number of blocks to trail head by', default=2)
         add('--sync-to-s3', type=strtobool, env_var='SYNC_TO_S3', help='alternative healthcheck for background sync service', default=False)
+        add('--trxid-partitions', type=int, env_var='TRXID_PARTITIONS', help='hash-partition the trx id lookup table into this many tables (0 to disable)', default=0)
+        add('--notify-retention-days', type=int, env_var='NOTIFY_RETENTION_DAYS', help='partition notifications by month and drop months older than this many days (0 to keep all)', default=0)
+        add('--feed-fanout-limit', type=int, env_var='FEED_FANOUT_LIMIT', help='fan out feed entries on write for bloggers with up to this many followers (0 to disable)', default=0)
 
         # community
         add('--recommend-communities', env_var='RECOMMEND_COMMUNITIES', help='add recommend communities into trending communities', default="worth-108451,worth-172186,worth-187187")
@@ -1,5 +1,6 @@
 """Wrapper for sqlalchemy, providing a simple interface."""
 
+import io
 import logging
 from time import perf_counter as perf
 from collections import OrderedDict
@@ -118,6 +119,35 @@ class Db:
         if trx:
             self.query("COMMIT")
 
+    def copy(self, table, columns, rows):
+        """Bulk-load rows using `COPY ... FROM STDIN` (postgresql only).
+
+        Runs on the current connection, so it joins any open transaction.
+        """
+        buf = io.StringIO()
+        for row in rows:
+            buf.write('\t'.join(map(self._copy_value, row)) + '\n')
+        buf.seek(0)
+
+        sql = "COPY %s (%s) FROM STDIN" % (table, ', '.join(columns))
+        start = perf()
+        cursor = self._conn.connection.cursor()
+        try:
+            cursor.copy_expert(sql, buf)
+        finally:
+            cursor.close()
+        Stats.log_db(sql, perf() - start)
+
+    @staticmethod
+    def _copy_value(value):
+        """Format a value for COPY text format."""
+        if value is None:
+            return '\\N'
+        if isinstance(value, bytes):
+            return '\\\\x' + value.hex()
+        return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+                .replace('\n', '\\n').replace('\r', '\\r'))
+
     @staticmethod
     def build_insert(table, values, pk=None):
         """Generates an INSERT statement w/ bindings."""
@@ -5,9 +5,13 @@
 import time
 import logging
 
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
 from worth.db.schema import (setup, reset_autovac, build_metadata,
                             build_metadata_community, teardown, DB_VERSION,
-                            build_metadata_blacklist, build_trxid_block_num)
+                            build_metadata_blacklist, build_trxid_block_num,
+                            setup_posts_status_trigger)
 from worth.db.adapter import Db
 
 log = logging.getLogger(__name__)
@@ -75,6 +79,99 @@ class DbState:
         """Check if we're still in the process of initial sync."""
         return cls._is_initial_sync
 
+    @classmethod
+    def partition_trxids(cls, partitions):
+        """Hash-partition `worth_trxid_block_num` into `partitions` tables.
+
+        Keeps trx id lookups and index maintenance on small, evenly
+        sized partitions as the table grows. Requires postgres 11+.
+        A value of 0 leaves the current layout as-is.
+        """
+        if not partitions:
+            return
+
+        sql = """SELECT COUNT(*) FROM pg_inherits
+                  WHERE inhparent = 'worth_trxid_block_num'::regclass"""
+        current = cls.db().query_one(sql)
+        if current == partitions:
+            return
+
+        log.info("[INIT] Partitioning trx ids: %d -> %d", current, partitions)
+        db = cls.db()
+        db.query("START TRANSACTION")
+        db.query("ALTER TABLE worth_trxid_block_num RENAME TO worth_trxid_block_num_old")
+        db.query("""CREATE TABLE worth_trxid_block_num (trx_id bytea, block_num integer NOT NULL)
+                    PARTITION BY HASH (trx_id)""")
+        for idx in range(partitions):
+            db.query("""CREATE TABLE worth_trxid_block_num_%d_%d
+                        PARTITION OF worth_trxid_block_num
+                        FOR VALUES WITH (MODULUS %d, REMAINDER %d)"""
+                     % (partitions, idx, partitions, idx))
+        db.query("""INSERT INTO worth_trxid_block_num (trx_id, block_num)
+                    SELECT trx_id, block_num FROM worth_trxid_block_num_old""")
+        db.query("DROP TABLE worth_trxid_block_num_old")
+        db.query("CREATE UNIQUE INDEX worth_trxid_ix1 ON worth_trxid_block_num (trx_id)")
+        db.query("CREATE INDEX worth_block_num_ix1 ON worth_trxid_block_num (block_num)")
+        db.query("COMMIT")
+
+    @classmethod
+    def partition_notifs(cls):
+        """Range-partition `worth_notifs` by month of `created_at`.
+
+        Lets expired notifications be dropped a partition at a time
+        instead of deleted row by row. Requires postgres 11+. Returns
+        false if the table is left unpartitioned (older postgres).
+        """
+        db = cls.db()
+        sql = "SELECT relkind FROM pg_class WHERE relname = 'worth_notifs'"
+        if db.query_one(sql) == 'p':
+            return True
+        if int(db.query_one("SHOW server_version_num")) < 110000:
+            log.warning("[INIT] Notifs partitioning requires postgres 11+")
+            return False
+
+        log.info("[INIT] Partitioning notifs by month")
+        cols = ("type_id, score, created_at, src_id, dst_id, post_id,"
+                " community_id, block_num, payload")
+        db.query("START TRANSACTION")
+        db.query("ALTER TABLE worth_notifs RENAME TO worth_notifs_old")
+        db.query("ALTER SEQUENCE worth_notifs_id_seq OWNED BY NONE")
+        db.query("""CREATE TABLE worth_notifs (
+                        id integer NOT NULL DEFAULT nextval('worth_notifs_id_seq'),
+                        type_id smallint NOT NULL,
+                        score smallint NOT NULL,
+                        created_at timestamp without time zone NOT NULL,
+                        src_id integer,
+                        dst_id integer,
+                        post_id integer,
+                        community_id integer,
+                        block_num integer,
+                        payload text
+                    ) PARTITION BY RANGE (created_at)""")
+        sql = "SELECT DISTINCT date_trunc('month', created_at) FROM worth_notifs_old"
+        for month in db.query_col(sql):
+            cls.notifs_partition(month)
+        db.query("""INSERT INTO worth_notifs (id, %s)
+                    SELECT id, %s FROM worth_notifs_old""" % (cols, cols))
+        db.query("DROP TABLE worth_notifs_old")
+        db.query("ALTER SEQUENCE worth_notifs_id_seq OWNED BY worth_notifs.id")
+        db.query("ALTER TABLE worth_notifs ADD PRIMARY KEY (id, created_at)")
+        table = build_metadata().tables['worth_notifs']
+        for index in sorted(table.indexes, key=lambda idx: idx.name):
+            db.query(str(CreateIndex(index).compile(dialect=postgresql.dialect())))
+        db.query("COMMIT")
+        return True
+
+    @classmethod
+    def notifs_partition(cls, when):
+        """Create the monthly `worth_notifs` partition holding `when`."""
+        year, month = int(str(when)[:4]), int(str(when)[5:7])
+        nyear, nmonth = year + month // 12, month % 12 + 1
+        cls.db().query("""CREATE TABLE IF NOT EXISTS worth_notifs_%04d%02d
+                          PARTITION OF worth_notifs
+                          FOR VALUES FROM ('%04d-%02d-01') TO ('%04d-%02d-01')"""
+                       % (year, month, year, month, nyear, nmonth))
+
     @classmethod
     def _all_foreign_keys(cls):
         md = build_metadata()
@@ -89,6 +186,7 @@ class DbState:
             'worth_posts_ix3', # (author, depth, id)
             'worth_posts_ix4', # (parent_id, id, is_deleted=0)
             'worth_posts_ix5', # (community_id>0, is_pinned=1)
+            'worth_posts_ix7', # (root_id, id, is_deleted=0)
             'worth_follows_ix5a', # (following, state, created_at, follower)
             'worth_follows_ix5b', # (follower, state, created_at, following)
             'worth_reblogs_ix1', # (post_id, account, created_at)
@@ -105,6 +203,7 @@ class DbState:
             'worth_posts_cache_ix32', # API: community created
             'worth_posts_cache_ix33', # API: community payout
             'worth_posts_cache_ix34', # API: community muted
+            'worth_posts_cache_ix40', # API: ranking engine refresh
             'worth_accounts_ix3', # (vote_weight, name VPO)
             'worth_accounts_ix4', # (id, name)
             'worth_accounts_ix5', # (cached_at, name)
@@ -326,12 +425,158 @@ class DbState:
             cls._set_ver(19)
         if cls._ver == 19:
             cls.db().query("ALTER TABLE worth_trxid_block_num DROP CONSTRAINT IF EXISTS worth_trxid_ux1")
-            cls.db().query("DROP INDEX worth_trx_id_ix1")
+            cls.db().query("DROP INDEX IF EXISTS worth_trx_id_ix1")
             cls.db().query("ALTER TABLE worth_trxid_block_num ALTER COLUMN trx_id DROP NOT NULL")
-            cls.db().query("CREATE INDEX worth_block_num_ix1 ON worth_trxid_block_num (block_num)")
-            cls.db().query("CREATE UNIQUE INDEX worth_trxid_ix1 ON worth_trxid_block_num (trx_id) WHERE trx_id IS NOT NULL")
+            cls.db().query("CREATE INDEX IF NOT EXISTS worth_block_num_ix1 ON worth_trxid_block_num (block_num)")
+            cls.db().query("CREATE UNIQUE INDEX IF NOT EXISTS worth_trxid_ix1 ON worth_trxid_block_num (trx_id) WHERE trx_id IS NOT NULL")
             cls._set_ver(20)
 
+        if cls._ver == 20:
+            cls.db().query("""CREATE TABLE worth_feed_inbox (
+                                account_id integer NOT NULL,
+                                post_id    integer NOT NULL,
+                                blogger_id integer NOT NULL,
+                                created_at timestamp without time zone NOT NULL,
+                                CONSTRAINT worth_feed_inbox_ux1 UNIQUE (post_id, blogger_id, account_id))""")
+            cls.db().query("CREATE INDEX worth_feed_inbox_ix1 ON worth_feed_inbox (account_id, created_at, post_id)")
+            cls.db().query("CREATE INDEX worth_feed_inbox_ix2 ON worth_feed_inbox (created_at)")
+            cls.db().query("ALTER TABLE worth_state ADD COLUMN feed_fanout_limit integer NOT NULL DEFAULT 0")
+            cls._set_ver(21)
+
+        if cls._ver == 21:
+            sql = """SELECT data_type FROM information_schema.columns
+                      WHERE table_name = 'worth_trxid_block_num' AND column_name = 'trx_id'"""
+            if cls.db().query_one(sql) != 'bytea':
+                cls.db().query("ALTER TABLE worth_trxid_block_num DROP CONSTRAINT IF EXISTS worth_trxid_ux1")
+                cls.db().query("DROP INDEX IF EXISTS worth_trx_id_ix1")
+                cls.db().query("ALTER TABLE worth_trxid_block_num ALTER COLUMN trx_id TYPE bytea USING decode(trx_id, 'hex')")
+            cls._set_ver(22)
+
+        if cls._ver == 22:
+            cls.db().query("ALTER TABLE worth_posts_cache ADD COLUMN cached_at TIMESTAMP WITHOUT TIME ZONE DEFAULT '1970-01-01 00:00:00' NOT NULL")
+            cls.db().query("CREATE INDEX worth_posts_cache_ix40 ON worth_posts_cache (cached_at, post_id) WHERE depth = 0")
+            cls._set_ver(23)
+
+        if cls._ver == 23:
+            cls.db().query("ALTER TABLE worth_posts ADD COLUMN root_id INTEGER")
+            cls.db().query("""
+                UPDATE worth_posts SET root_id = thread.root_id
+                  FROM (WITH RECURSIVE thread AS (
+                            SELECT id, id AS root_id FROM worth_posts
+                             WHERE parent_id IS NULL
+                             UNION ALL
+                            SELECT worth_posts.id, thread.root_id
+                              FROM thread
+                              JOIN worth_posts ON worth_posts.parent_id = thread.id
+                        ) SELECT id, root_id FROM thread) thread
+                 WHERE worth_posts.id = thread.id
+                   AND worth_posts.parent_id IS NOT NULL""")
+            cls.db().query("CREATE INDEX worth_posts_ix7 ON worth_posts (root_id, id) WHERE root_id IS NOT NULL AND is_deleted = '0'")
+            cls._set_ver(24)
+
+        if cls._ver == 24:
+            # filled in as posts are next cached; readers fall back to raw_json/votes
+            cls.db().query("ALTER TABLE worth_posts_cache ADD COLUMN payload TEXT")
+            cls._set_ver(25)
+
+        if cls._ver == 25:
+            cls.db().query("ALTER TABLE worth_feed_cache ADD COLUMN entry_id INTEGER NOT NULL DEFAULT 0")
+            cls.db().query("""
+                UPDATE worth_feed_cache SET entry_id = seq.entry_id
+                  FROM (SELECT account_id, post_id, ROW_NUMBER() OVER (
+                               PARTITION BY account_id ORDER BY created_at, post_id) - 1 AS entry_id
+                          FROM worth_feed_cache) seq
+                 WHERE worth_feed_cache.account_id = seq.account_id
+                   AND worth_feed_cache.post_id = seq.post_id""")
+            cls.db().query("CREATE INDEX worth_feed_cache_ix2 ON worth_feed_cache (account_id, entry_id)")
+            cls._set_ver(26)
+
+        if cls._ver == 26:
+            cls.db().query("""CREATE TABLE worth_notifs_unread (
+                                  account_id integer NOT NULL,
+                                  bucket smallint NOT NULL,
+                                  unread integer NOT NULL,
+                                  PRIMARY KEY (account_id, bucket))""")
+            from worth.indexer.notify import Notify
+            Notify.reconcile_unread()
+            cls._set_ver(27)
+
+        if cls._ver == 27:
+            cls.db().query("""CREATE TABLE worth_tag_stats (
+                                  category varchar(255) NOT NULL PRIMARY KEY,
+                                  total_posts integer NOT NULL,
+                                  top_posts integer NOT NULL,
+                                  total_payouts numeric(16,3) NOT NULL)""")
+            cls.db().query("CREATE INDEX worth_tag_stats_ix1 ON worth_tag_stats (total_payouts)")
+            from worth.indexer.tag_stats import TagStats
+            TagStats.recalc()
+            cls._set_ver(28)
+
+        if cls._ver == 28:
+            # previously created on the fly by the API server
+            cls.db().query("DROP TABLE IF EXISTS payout_stats")
+            cls.db().query("""CREATE TABLE payout_stats (
+                                  community_id integer,
+                                  author varchar(16),
+                                  payout numeric(16,3) NOT NULL,
+                                  posts integer NOT NULL,
+                                  authors integer)""")
+            cls.db().query("CREATE INDEX payout_stats_ix1 ON payout_stats (community_id, author, payout)")
+            from worth.indexer.payout_stats import PayoutStats
+            PayoutStats.generate()
+            cls._set_ver(29)
+
+        if cls._ver == 29:
+            cls.db().query("ALTER TABLE worth_feed_cache ADD COLUMN fanned_out boolean NOT NULL DEFAULT '0'")
+            limit = cls.db().query_one("SELECT feed_fanout_limit FROM worth_state")
+            if limit:
+                from worth.indexer.feed_cache import FeedCache
+                FeedCache.set_fanout_limit(limit, rebuild=True)
+            cls._set_ver(30)
+
+        if cls._ver == 30:
+            cls.db().query("ALTER TABLE worth_posts ADD COLUMN deleted_at TIMESTAMP WITHOUT TIME ZONE")
+            cls.db().query("CREATE INDEX worth_posts_ix8 ON worth_posts (deleted_at) WHERE is_deleted = '1'")
+            cls._set_ver(31)
+
+        if cls._ver == 31:
+            # filled in as posts are next cached; readers fall back to payload
+            cls.db().query("ALTER TABLE worth_posts_cache ADD COLUMN active_votes TEXT")
+            cls._set_ver(32)
+
+        if cls._ver == 32:
+            # replies the root_id backfill missed: walk up parent_id chains
+            # to the top-level post (or an ancestor with root_id set)
+            cls.db().query("""
+                UPDATE worth_posts SET root_id = chain.root_id
+                  FROM (WITH RECURSIVE chain AS (
+                            SELECT id, parent_id AS ancestor FROM worth_posts
+                             WHERE root_id IS NULL AND parent_id IS NOT NULL
+                             UNION ALL
+                            SELECT chain.id, worth_posts.parent_id
+                              FROM chain
+                              JOIN worth_posts ON worth_posts.id = chain.ancestor
+                             WHERE worth_posts.parent_id IS NOT NULL
+                               AND worth_posts.root_id IS NULL
+                        ) SELECT chain.id, COALESCE(root_id, worth_posts.id) AS root_id
+                            FROM chain
+                            JOIN worth_posts ON worth_posts.id = chain.ancestor
+                           WHERE worth_posts.parent_id IS NULL
+                              OR worth_posts.root_id IS NOT NULL) chain
+                 WHERE worth_posts.id = chain.id""")
+            # their descendants took the reply itself as root
+            cls.db().query("""
+                UPDATE worth_posts SET root_id = reply.root_id
+                  FROM worth_posts reply
+                 WHERE worth_posts.root_id = reply.id
+                   AND reply.root_id IS NOT NULL""")
+            cls._set_ver(33)
+
+        if cls._ver == 33:
+            cls.db().query("ALTER TABLE worth_posts_status ADD COLUMN updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now() NOT NULL")
+            setup_posts_status_trigger(cls.db())
+            cls._set_ver(34)
+
         reset_autovac(cls.db())
 
         log.info("[WORTH] db version: %d", cls._ver)
@@ -10,7 +10,7 @@ from sqlalchemy.types import BOOLEAN
 
 #pylint: disable=line-too-long, too-many-lines, bad-whitespace
 
-DB_VERSION = 20
+DB_VERSION = 34
 
 def build_metadata():
     """Build schema def with SqlAlchemy"""
@@ -72,6 +72,7 @@ def build_metadata():
         'worth_posts', metadata,
         sa.Column('id', sa.Integer, primary_key=True),
         sa.Column('parent_id', sa.Integer),
+        sa.Column('root_id', sa.Integer), # thread's top-level post (NULL for posts)
         sa.Column('author', VARCHAR(16), nullable=False),
         sa.Column('permlink', VARCHAR(255), nullable=False),
         sa.Column('category', VARCHAR(255), nullable=False, server_default=''),
@@ -83,6 +84,7 @@ def build_metadata():
         sa.Column('is_muted', BOOLEAN, nullable=False, server_default='0'),
         sa.Column('is_valid', BOOLEAN, nullable=False, server_default='1'),
         sa.Column('promoted', sa.types.DECIMAL(10, 3), nullable=False, server_default='0'),
+        sa.Column('deleted_at', sa.DateTime), # set by the indexer on delete_comment
 
         sa.ForeignKeyConstraint(['author'], ['worth_accounts.name'], name='worth_posts_fk1'),
         sa.ForeignKeyConstraint(['parent_id'], ['worth_posts.id'], name='worth_posts_fk3'),
@@ -91,6 +93,8 @@ def build_metadata():
         sa.Index('worth_posts_ix4', 'parent_id', 'id', postgresql_where=sql_text("is_deleted = '0'")), # API: fetching children
         sa.Index('worth_posts_ix5', 'id', postgresql_where=sql_text("is_pinned = '1' AND is_deleted = '0'")), # API: pinned post status
         sa.Index('worth_posts_ix6', 'community_id', 'id', postgresql_where=sql_text("community_id IS NOT NULL AND is_pinned = '1' AND is_deleted = '0'")), # API: community pinned
+        sa.Index('worth_posts_ix7', 'root_id', 'id', postgresql_where=sql_text("root_id IS NOT NULL AND is_deleted = '0'")), # API: thread replies
+        sa.Index('worth_posts_ix8', 'deleted_at', postgresql_where=sql_text("is_deleted = '1'")), # API: ranking engine refresh
     )
 
     sa.Table(
@@ -146,8 +150,22 @@ def build_metadata():
         sa.Column('post_id', sa.Integer, nullable=False),
         sa.Column('account_id', sa.Integer, nullable=False),
         sa.Column('created_at', sa.DateTime, nullable=False),
+        sa.Column('entry_id', sa.Integer, nullable=False, server_default='0'), # per-account seq
+        sa.Column('fanned_out', BOOLEAN, nullable=False, server_default='0'), # copied to worth_feed_inbox
         sa.UniqueConstraint('post_id', 'account_id', name='worth_feed_cache_ux1'), # core
         sa.Index('worth_feed_cache_ix1', 'account_id', 'post_id', 'created_at'), # API (and rebuild?)
+        sa.Index('worth_feed_cache_ix2', 'account_id', 'entry_id'), # API: blog by index
+    )
+
+    sa.Table(
+        'worth_feed_inbox', metadata,
+        sa.Column('account_id', sa.Integer, nullable=False), # follower
+        sa.Column('post_id', sa.Integer, nullable=False),
+        sa.Column('blogger_id', sa.Integer, nullable=False), # author or reblogger
+        sa.Column('created_at', sa.DateTime, nullable=False),
+        sa.UniqueConstraint('post_id', 'blogger_id', 'account_id', name='worth_feed_inbox_ux1'), # core
+        sa.Index('worth_feed_inbox_ix1', 'account_id', 'created_at', 'post_id'), # API: feed
+        sa.Index('worth_feed_inbox_ix2', 'created_at'), # pruning, forks
     )
 
     sa.Table(
@@ -180,6 +198,7 @@ def build_metadata():
         sa.Column('payout_at', sa.DateTime, nullable=False, server_default='1990-01-01'),
         sa.Column('updated_at', sa.DateTime, nullable=False, server_default='1990-01-01'),
         sa.Column('is_paidout', BOOLEAN, nullable=False, server_default='0'),
+        sa.Column('cached_at', sa.DateTime, nullable=False, server_default='1970-01-01 00:00:00'),
 
         # ui flags/filters
         sa.Column('is_nsfw', BOOLEAN, nullable=False, server_default='0'),
@@ -198,6 +217,8 @@ def build_metadata():
         sa.Column('votes', TEXT),
         sa.Column('json', sa.Text),
         sa.Column('raw_json', sa.Text),
+        sa.Column('payload', sa.Text), # pre-built API fields (see post_payload)
+        sa.Column('active_votes', sa.Text), # pre-encoded API votes (see post_active_votes)
 
         # index: misc
         sa.Index('worth_posts_cache_ix3',  'payout_at', 'post_id',           postgresql_where=sql_text("is_paidout = '0'")),         # core: payout sweep
@@ -225,6 +246,26 @@ def build_metadata():
         sa.Index('worth_posts_cache_ix32', 'community_id', 'created_at', 'post_id',  postgresql_where=sql_text("community_id IS NOT NULL AND is_grayed = '0' AND depth = 0")),        # API: community created
         sa.Index('worth_posts_cache_ix33', 'community_id', 'payout',     'post_id',  postgresql_where=sql_text("community_id IS NOT NULL AND is_grayed = '0' AND is_paidout = '0'")), # API: community payout
         sa.Index('worth_posts_cache_ix34', 'community_id', 'payout',     'post_id',  postgresql_where=sql_text("community_id IS NOT NULL AND is_grayed = '1' AND is_paidout = '0'")), # API: community muted
+        sa.Index('worth_posts_cache_ix40', 'cached_at', 'post_id', postgresql_where=sql_text("depth = 0")), # API: ranking engine refresh
+    )
+
+    sa.Table(
+        'worth_tag_stats', metadata,
+        sa.Column('category', VARCHAR(255), primary_key=True),
+        sa.Column('total_posts', sa.Integer, nullable=False),
+        sa.Column('top_posts', sa.Integer, nullable=False),
+        sa.Column('total_payouts', sa.types.DECIMAL(16, 3), nullable=False),
+        sa.Index('worth_tag_stats_ix1', 'total_payouts'), # API: trending tags
+    )
+
+    sa.Table(
+        'payout_stats', metadata,
+        sa.Column('community_id', sa.Integer, nullable=True),
+        sa.Column('author', VARCHAR(16), nullable=True),
+        sa.Column('payout', sa.types.DECIMAL(16, 3), nullable=False),
+        sa.Column('posts', sa.Integer, nullable=False),
+        sa.Column('authors', sa.Integer, nullable=True),
+        sa.Index('payout_stats_ix1', 'community_id', 'author', 'payout'), # API: payout stats
     )
 
     sa.Table(
@@ -235,6 +276,7 @@ def build_metadata():
         sa.Column('usd_per_worth', sa.types.DECIMAL(8, 3), nullable=False),
         sa.Column('wbd_per_worth', sa.types.DECIMAL(8, 3), nullable=False),
         sa.Column('dgpo', sa.Text, nullable=False),
+        sa.Column('feed_fanout_limit', sa.Integer, nullable=False, server_default='0'),
     )
 
     metadata = build_metadata_community(metadata)
@@ -319,6 +361,13 @@ def build_metadata_community(metadata=None):
         sa.Index('worth_notifs_ix6', 'dst_id', 'created_at', 'score', 'id', postgresql_where=sql_text("dst_id IS NOT NULL")), # unread
     )
 
+    sa.Table(
+        'worth_notifs_unread', metadata,
+        sa.Column('account_id', sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column('bucket', SMALLINT, primary_key=True, autoincrement=False), # min score
+        sa.Column('unread', sa.Integer, nullable=False),
+    )
+
     return metadata
 
 
@@ -333,6 +382,7 @@ def build_metadata_blacklist(metadata=None):
         sa.Column('author', VARCHAR(16), nullable=False, server_default=''),
         sa.Column('list_type', SMALLINT, nullable=False, server_default='0'),
         sa.Column('created_at', sa.DateTime, nullable=False, server_default='1990-01-01'),
+        sa.Column('updated_at', sa.DateTime, nullable=False, server_default=sql_text('now()')), # see setup_posts_status_trigger
         sa.UniqueConstraint('list_type', 'post_id', 'author', name='worth_posts_status_ux1'),
     )
 
@@ -344,10 +394,10 @@ def build_trxid_block_num(metadata=None):
 
     sa.Table(
         'worth_trxid_block_num', metadata,
-        sa.Column('trx_id', VARCHAR(40), nullable=False),
+        sa.Column('trx_id', sa.LargeBinary, nullable=True), # 20-byte binary id
         sa.Column('block_num', sa.Integer, nullable=False),
-        sa.UniqueConstraint('trx_id', name='worth_trxid_ux1'),
-        sa.Index('worth_trx_id_ix1', 'trx_id'),
+        sa.Index('worth_trxid_ix1', 'trx_id', unique=True, postgresql_where=sql_text("trx_id IS NOT NULL")),
+        sa.Index('worth_block_num_ix1', 'block_num'), # forks
     )
 
     return metadata
@@ -379,6 +429,24 @@ def setup(db):
     sql = "CREATE INDEX worth_communities_ft1 ON worth_communities USING GIN (to_tsvector('english', title || ' ' || about))"
     db.query(sql)
 
+    setup_posts_status_trigger(db)
+
+def setup_posts_status_trigger(db):
+    """Bump `worth_posts_status.updated_at` on every update.
+
+    The table is written by admin tools rather than the indexer; servers
+    detect changes by `COUNT(*), MAX(updated_at)`."""
+    db.query("""CREATE OR REPLACE FUNCTION worth_posts_status_touch()
+                  RETURNS trigger AS $$
+                  BEGIN
+                      NEW.updated_at = now();
+                      RETURN NEW;
+                  END;
+                  $$ LANGUAGE plpgsql""")
+    db.query("""CREATE TRIGGER worth_posts_status_touch
+                  BEFORE UPDATE ON worth_posts_status
+                  FOR EACH ROW EXECUTE PROCEDURE worth_posts_status_touch()""")
+
 def reset_autovac(db):
     """Initializes/resets per-table autovacuum/autoanalyze params.
 
@@ -392,6 +460,7 @@ def reset_autovac(db):
         'worth_post_tags':   (5000, 10000),
         'worth_follows':     (5000, 5000),
         'worth_feed_cache':  (5000, 5000),
+        'worth_feed_inbox':  (25000, 25000),
         'worth_blocks':      (5000, 25000),
         'worth_reblogs':     (5000, 5000),
         'worth_payments':    (5000, 5000),
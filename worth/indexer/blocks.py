@@ -10,6 +10,8 @@ from worth.indexer.cached_post import CachedPost
 from worth.indexer.custom_op import CustomOp
 from worth.indexer.payments import Payments
 from worth.indexer.follow import Follow
+from worth.indexer.community import Community
+from worth.indexer.notify import Notify
 
 log = logging.getLogger(__name__)
 
@@ -18,6 +20,9 @@ DB = Db.instance()
 class Blocks:
     """Processes blocks, dispatches work, manages `worth_blocks` table."""
 
+    # (trx_id, block_num) rows buffered for COPY during initial sync
+    _trxids = []
+
     @classmethod
     def head_num(cls):
         """Get worth's head block number."""
@@ -49,6 +54,10 @@ class Blocks:
             log.error("exception encountered block %d", last_num + 1)
             raise e
 
+        if cls._trxids:
+            DB.copy('worth_trxid_block_num', ['trx_id', 'block_num'], cls._trxids)
+            cls._trxids = []
+
         # Follows flushing needs to be atomic because recounts are
         # expensive. So is tracking follows at all; hence we track
         # deltas in memory and update follow/er counts in bulk.
@@ -65,9 +74,7 @@ class Blocks:
 
         account_names = set()
         json_ops = []
-        trxids = set()
         for tx_idx, tx in enumerate(block['transactions']):
-            trxids.add("('%s', %s)" % (block['transaction_ids'][tx_idx], num))
             for operation in tx['operations']:
                 op_type = operation['type']
                 op = operation['value']
@@ -114,7 +121,12 @@ class Blocks:
 
         Accounts.register(account_names, date)     # register any new names
         CustomOp.process_ops(json_ops, num, date)  # follow/reblog/community ops
-        cls.save_trxids(trxids)
+
+        trxids = [(bytes.fromhex(trx_id), num) for trx_id in block['transaction_ids']]
+        if is_initial_sync:
+            cls._trxids.extend(trxids)
+        else:
+            cls.save_trxids(trxids)
 
         return num
 
@@ -198,6 +210,7 @@ class Blocks:
          - worth_modlog
         """
         DB.query("START TRANSACTION")
+        notified = set()
 
         for block in blocks:
             num = block['num']
@@ -210,13 +223,17 @@ class Blocks:
             post_ids = tuple(DB.query_col(sql, date=date))
 
             # remove all recent records -- communities
-            DB.query("DELETE FROM worth_notifs        WHERE created_at >= :date", date=date)
+            sql = """DELETE FROM worth_notifs WHERE created_at >= :date
+                  RETURNING dst_id"""
+            notified.update(row[0] for row in DB.query(sql, date=date) if row[0])
             DB.query("DELETE FROM worth_subscriptions WHERE created_at >= :date", date=date)
             DB.query("DELETE FROM worth_roles         WHERE created_at >= :date", date=date)
             DB.query("DELETE FROM worth_communities   WHERE created_at >= :date", date=date)
 
             # remove all recent records -- core
+            # (feed cache: drops each blog's newest entries; entry_id stays dense)
             DB.query("DELETE FROM worth_feed_cache  WHERE created_at >= :date", date=date)
+            DB.query("DELETE FROM worth_feed_inbox  WHERE created_at >= :date", date=date)
             DB.query("DELETE FROM worth_reblogs     WHERE created_at >= :date", date=date)
             DB.query("DELETE FROM worth_follows     WHERE created_at >= :date", date=date) #*
 
@@ -231,14 +248,26 @@ class Blocks:
             DB.query("DELETE FROM worth_trxid_block_num WHERE block_num = :num", num=num)
 
         DB.query("COMMIT")
+
+        # popped rows may still be referenced by in-memory caches
+        Posts.invalidate_props()
+        Community.load_roles()
+        if notified:
+            Notify.reconcile_unread(tuple(notified))
+
         log.warning("[FORK] recovery complete")
         # TODO: manually re-process here the blocks which were just popped.
 
     @classmethod
     def save_trxids(cls, trxids):
-        data = ','.join(trxids)
-        if data == '':
+        """Insert a list of (binary trx_id, block_num) lookup rows."""
+        if not trxids:
             return
-        insert_sql = "INSERT INTO worth_trxid_block_num (trx_id, block_num) VALUES "
-        insert_sql = insert_sql + ','.join(trxids)
-        DB.query(insert_sql)
+        values = []
+        params = {}
+        for idx, (trx_id, num) in enumerate(trxids):
+            values.append("(:id_%d, :num_%d)" % (idx, idx))
+            params['id_%d' % idx] = trx_id
+            params['num_%d' % idx] = num
+        sql = "INSERT INTO worth_trxid_block_num (trx_id, block_num) VALUES "
+        DB.query(sql + ', '.join(values), **params)
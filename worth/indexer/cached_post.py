@@ -3,15 +3,21 @@
 import math
 import collections
 import logging
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
 import ujson as json
 
 from toolz import partition_all
+from funcy.seqs import first
 from worth.db.adapter import Db
 
-from worth.utils.post import post_basic, post_legacy, post_payout, post_stats, mentions
+from worth.utils.post import (post_active_votes, post_basic, post_legacy,
+                              post_payload, post_payout, post_stats, mentions)
 from worth.utils.timer import Timer
 from worth.indexer.accounts import Accounts
+from worth.indexer.community import Community
 from worth.indexer.notify import Notify
+from worth.indexer.tag_stats import TagStats
 from worth.server.common.mutes import Mutes
 
 # pylint: disable=too-many-lines
@@ -116,8 +122,14 @@ class CachedPost:
          - author/permlink is unique and always references the same post
          - you can always get_content on any author/permlink you see in an op
         """
-        DB.query("DELETE FROM worth_posts_cache WHERE post_id = :id", id=post_id)
+        sql = """DELETE FROM worth_posts_cache WHERE post_id = :id
+              RETURNING community_id, payout, is_paidout, category, depth"""
+        row = first(DB.query(sql, id=post_id))
         DB.query("DELETE FROM worth_post_tags   WHERE post_id = :id", id=post_id)
+        if row and not row[2]:
+            if row[0]:
+                Community.track_pending(row[0], -row[1], -1)
+            TagStats.track(row[3], -row[1], -1, -int(not row[4]))
 
         # if it was queued for a write, remove it
         url = author+'/'+permlink
@@ -355,6 +367,8 @@ class CachedPost:
                         post['community_id'] = core['community_id']
                         post['gray'] = core['is_muted']
                         post['hide'] = not core['is_valid']
+                        post['cached_payout'] = core['payout']
+                        post['cached_paidout'] = core['is_paidout']
                     buffer.extend(cls._sql(pid, post, level=level))
                 else:
                     # When a post has been deleted (or otherwise DNE),
@@ -382,6 +396,9 @@ class CachedPost:
 
                 cls._bump_last_id(pid)
 
+            buffer.extend(Community.pending_sqls())
+            buffer.extend(TagStats.pending_sqls())
+
             timer.batch_lap()
             DB.batch_queries(buffer, trx)
 
@@ -406,6 +423,9 @@ class CachedPost:
          - immutable `category` (returned from worths is subject to change)
          - authoritative community_id can be determined and written
          - community muted/valid cols override legacy gray/hide logic
+
+        Currently cached payout state is also loaded, so that changes to
+        community and tag pending payout sums can be tracked.
         """
         # get list of ids of posts which are to be inserted
         # TODO: try conditional. currently competes w/ legacy flags on vote
@@ -415,12 +435,17 @@ class CachedPost:
             return {}
 
         # build a map of id->fields for each of those posts
-        sql = """SELECT id, category, community_id, is_muted, is_valid
-                   FROM worth_posts WHERE id IN :ids"""
+        sql = """SELECT id, category, hp.community_id, is_muted, is_valid,
+                        payout, is_paidout
+                   FROM worth_posts hp
+              LEFT JOIN worth_posts_cache hpc ON hpc.post_id = hp.id
+                  WHERE id IN :ids"""
         core = {r[0]: {'category': r[1],
                        'community_id': r[2],
                        'is_muted': r[3],
-                       'is_valid': r[4]}
+                       'is_valid': r[4],
+                       'payout': r[5],
+                       'is_paidout': r[6]}
                 for r in DB.query_all(sql, ids=tuple(ids))}
         return core
 
@@ -535,6 +560,9 @@ class CachedPost:
             ('is_grayed',   stats['gray']),
             ('author_rep',  stats['author_rep']),
             ('children',    min(post['children'], 32767)),
+            ('payload',     json.dumps(post_payload(post))),
+            ('active_votes', json.dumps(post_active_votes(post))),
+            ('cached_at',   datetime.now().strftime('%Y-%m-%dT%H:%M:%S')),
         ])
 
         # update tags if action is insert/update and is root post
@@ -547,6 +575,11 @@ class CachedPost:
         if level == 'recount' and post['depth']:
             cls.recount(post['parent_author'], post['parent_permlink'])
 
+        # track community and tag pending payout sums
+        is_paidout = (basic['is_paidout'] if level in ['insert', 'payout', 'update']
+                      else post['cached_paidout'])
+        cls._track_pending(post, payout['payout'], is_paidout)
+
         # trigger any notifications
         cls._notifs(post, pid, level, payout['payout'])
 
@@ -557,6 +590,22 @@ class CachedPost:
             sql = cls._update(values)
         return [sql] + tag_sqls
 
+    @classmethod
+    def _track_pending(cls, post, payout, is_paidout):
+        """Report a post's pending payout change to its community and tag."""
+        # as stored in `payout` DECIMAL(10,3), so deltas add up to its sums
+        payout = Decimal(payout).quantize(Decimal('0.001'), ROUND_HALF_UP)
+        was_pending = (post['cached_payout'] is not None
+                       and not post['cached_paidout'])
+        delta = (0 if is_paidout else payout) - (post['cached_payout'] if was_pending else 0)
+        count = int(not is_paidout) - int(was_pending)
+        if not (delta or count):
+            return
+        if post['community_id']:
+            Community.track_pending(post['community_id'], delta, count)
+        TagStats.track(post['category'], delta, count,
+                       0 if post['depth'] else count)
+
     @classmethod
     def _notifs(cls, post, pid, level, payout):
         # pylint: disable=too-many-locals,too-many-branches
@@ -103,6 +103,29 @@ class Community:
     # id -> name map
     _names = {}
 
+    # id -> {account_id: role_id} map (non-guest roles only)
+    _roles = {}
+
+    # id -> [payout, posts] pending sum changes, not yet written
+    _pending = {}
+
+    @classmethod
+    def load_ids(cls):
+        """Load community name/id maps into memory."""
+        for cid, name in DB.query_all("SELECT id, name FROM worth_communities"):
+            cls._ids[name] = cid
+            cls._names[cid] = name
+
+    @classmethod
+    def load_roles(cls):
+        """Load all non-guest community roles into memory."""
+        cls._roles = {}
+        sql = """SELECT community_id, account_id, role_id
+                   FROM worth_roles WHERE role_id != 0"""
+        for cid, account_id, role_id in DB.query_all(sql):
+            cls._roles.setdefault(cid, {})[account_id] = role_id
+        log.info("[WORTH] loaded roles for %d communities", len(cls._roles))
+
     @classmethod
     def register(cls, names, block_date):
         """Block processing: hooks into new account registration.
@@ -128,6 +151,9 @@ class Community:
                          VALUES (:community_id, :account_id, :role_id, :date)"""
             DB.query(sql, community_id=_id, account_id=_id,
                      role_id=Role.owner.value, date=block_date)
+            cls._ids[name] = _id
+            cls._names[_id] = name
+            cls.set_user_role(_id, _id, Role.owner.value)
 
             Notify('new_community', src_id=None, dst_id=_id,
                    when=block_date, community_id=_id).write()
@@ -188,13 +214,19 @@ class Community:
     @classmethod
     def get_user_role(cls, community_id, account_id):
         """Get user role within a specific community."""
+        roles = cls._roles.get(community_id)
+        if not roles:
+            return Role.guest.value
+        return roles.get(account_id, Role.guest.value)
 
-        return DB.query_one("""SELECT role_id FROM worth_roles
-                                WHERE community_id = :community_id
-                                  AND account_id = :account_id
-                                LIMIT 1""",
-                            community_id=community_id,
-                            account_id=account_id) or Role.guest.value
+    @classmethod
+    def set_user_role(cls, community_id, account_id, role_id):
+        """Reflect a role change in the in-memory role map."""
+        roles = cls._roles.setdefault(community_id, {})
+        if role_id == Role.guest.value:
+            roles.pop(account_id, None)
+        else:
+            roles[account_id] = role_id
 
     @classmethod
     def is_post_valid(cls, community_id, comment_op: dict):
@@ -225,38 +257,91 @@ class Community:
 
     @classmethod
     def recalc_pending_payouts(cls):
-        """Update all pending payout and rank fields."""
-        sql = """SELECT id,
-                        COALESCE(posts, 0),
-                        COALESCE(payouts, 0),
-                        COALESCE(authors, 0)
-                   FROM worth_communities c
-              LEFT JOIN (
-                             SELECT community_id,
-                                    COUNT(*) posts,
-                                    ROUND(SUM(payout)) payouts,
-                                    COUNT(DISTINCT author) authors
-                               FROM worth_posts_cache
-                              WHERE community_id IS NOT NULL
-                                AND is_paidout = '0'
-                           GROUP BY community_id
-                        ) p
-                     ON community_id = id
-               ORDER BY COALESCE(payouts, 0) DESC,
-                        COALESCE(authors, 0) DESC,
-                        COALESCE(posts, 0) DESC,
-                        subscribers DESC,
-                        (CASE WHEN c.title = '' THEN 1 ELSE 0 END)
+        """Update all pending payout and rank fields.
+
+        Full reconciliation of the incrementally maintained sums; only
+        rows whose values changed are written.
         """
+        sql = """UPDATE worth_communities c
+                    SET sum_pending = r.payouts, num_pending = r.posts,
+                        num_authors = r.authors, rank = r.rank
+                   FROM (
+                          SELECT id,
+                                 COALESCE(posts, 0) posts,
+                                 COALESCE(payouts, 0) payouts,
+                                 COALESCE(authors, 0) authors,
+                                 ROW_NUMBER() OVER (
+                                   ORDER BY COALESCE(payouts, 0) DESC,
+                                            COALESCE(authors, 0) DESC,
+                                            COALESCE(posts, 0) DESC,
+                                            subscribers DESC,
+                                            (CASE WHEN title = '' THEN 1 ELSE 0 END),
+                                            id) rank
+                            FROM worth_communities
+                       LEFT JOIN (
+                                      SELECT community_id,
+                                             COUNT(*) posts,
+                                             ROUND(SUM(payout)) payouts,
+                                             COUNT(DISTINCT author) authors
+                                        FROM worth_posts_cache
+                                       WHERE community_id IS NOT NULL
+                                         AND is_paidout = '0'
+                                    GROUP BY community_id
+                                 ) p
+                              ON community_id = id
+                        ) r
+                  WHERE c.id = r.id
+                    AND (c.sum_pending, c.num_pending, c.num_authors, c.rank)
+                        IS DISTINCT FROM (r.payouts, r.posts, r.authors, r.rank)"""
+        DB.query(sql)
+        cls._pending = {}
 
-        for rank, row in enumerate(DB.query_all(sql)):
-            cid, posts, payouts, authors = row
-            sql = """UPDATE worth_communities
-                        SET sum_pending = :payouts, num_pending = :posts,
-                            num_authors = :authors, rank = :rank
-                      WHERE id = :id"""
-            DB.query(sql, id=cid, payouts=payouts, posts=posts,
-                     authors=authors, rank=rank+1)
+    @classmethod
+    def recalc_ranks(cls):
+        """Update rank fields from the maintained pending sums."""
+        sql = """UPDATE worth_communities c SET rank = r.rank
+                   FROM (
+                          SELECT id, ROW_NUMBER() OVER (
+                                   ORDER BY sum_pending DESC,
+                                            num_authors DESC,
+                                            num_pending DESC,
+                                            subscribers DESC,
+                                            (CASE WHEN title = '' THEN 1 ELSE 0 END),
+                                            id) rank
+                            FROM worth_communities
+                        ) r
+                  WHERE c.id = r.id AND c.rank IS DISTINCT FROM r.rank"""
+        DB.query(sql)
+
+    @classmethod
+    def track_pending(cls, community_id, payout, posts):
+        """Accumulate a change to a community's pending payout sums."""
+        if community_id not in cls._pending:
+            cls._pending[community_id] = [0, 0]
+        cls._pending[community_id][0] += payout
+        cls._pending[community_id][1] += posts
+
+    @classmethod
+    def pending_sqls(cls):
+        """Build queries which apply accumulated pending sum changes.
+
+        `sum_pending` is an integer; fractional payout is carried over
+        in memory until it adds up to a whole unit.
+        """
+        sqls = []
+        for cid, (payout, posts) in list(cls._pending.items()):
+            whole = int(payout)
+            if whole or posts:
+                sql = """UPDATE worth_communities
+                            SET sum_pending = sum_pending + :payout,
+                                num_pending = num_pending + :posts
+                          WHERE id = :id"""
+                sqls.append((sql, dict(id=cid, payout=whole, posts=posts)))
+            if payout == whole:
+                del cls._pending[cid]
+            else:
+                cls._pending[cid] = [payout - whole, 0]
+        return sqls
 
 class CommunityOp:
     """Handles validating and processing of community custom_json ops."""
@@ -340,6 +425,7 @@ class CommunityOp:
         """Applies a validated operation."""
         assert self.valid, 'cannot apply invalid op'
         from worth.indexer.cached_post import CachedPost
+        from worth.indexer.posts import Posts
 
         action = self.action
         params = dict(
@@ -386,6 +472,7 @@ class CommunityOp:
                         VALUES (:account_id, :community_id, :role_id, :date)
                             ON CONFLICT (account_id, community_id)
                             DO UPDATE SET role_id = :role_id""", **params)
+            Community.set_user_role(self.community_id, self.account_id, self.role_id)
             self._notify('set_role', payload=Role(self.role_id).name)
         elif action == 'setUserTitle':
             DB.query("""INSERT INTO worth_roles
@@ -399,6 +486,7 @@ class CommunityOp:
         elif action == 'mutePost':
             DB.query("""UPDATE worth_posts SET is_muted = '1'
                          WHERE id = :post_id""", **params)
+            Posts.invalidate_props(self.post_id)
             self._notify('mute_post', payload=self.notes)
             if not DbState.is_initial_sync():
                 CachedPost.update(self.account, self.permlink, self.post_id)
@@ -406,6 +494,7 @@ class CommunityOp:
         elif action == 'unmutePost':
             DB.query("""UPDATE worth_posts SET is_muted = '0'
                          WHERE id = :post_id""", **params)
+            Posts.invalidate_props(self.post_id)
             self._notify('unmute_post', payload=self.notes)
             if not DbState.is_initial_sync():
                 CachedPost.update(self.account, self.permlink, self.post_id)
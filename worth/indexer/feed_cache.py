@@ -2,6 +2,7 @@
 
 import logging
 import time
+from funcy.seqs import first
 from worth.db.adapter import Db
 from worth.db.db_state import DbState
 
@@ -9,21 +10,108 @@ log = logging.getLogger(__name__)
 
 DB = Db.instance()
 
+INBOX_CUTOFF = "now() - interval '1 month'"
+
+# (re)assign every account's entry_id sequence
+RENUMBER_SQL = """
+    UPDATE worth_feed_cache SET entry_id = seq.entry_id
+      FROM (SELECT account_id, post_id, ROW_NUMBER() OVER (
+                   PARTITION BY account_id ORDER BY created_at, post_id) - 1 AS entry_id
+              FROM worth_feed_cache) seq
+     WHERE worth_feed_cache.account_id = seq.account_id
+       AND worth_feed_cache.post_id = seq.post_id
+       AND worth_feed_cache.entry_id != seq.entry_id"""
+
 class FeedCache:
     """Maintains `worth_feed_cache`, which merges posts and reports.
 
     The feed cache allows for efficient querying of posts + reblogs,
     savings us from expensive queries. Effectively a materialized view.
+
+    Each account's entries are numbered by `entry_id`, a dense 0-based
+    sequence in (created_at, post_id) order, so blog entries can be
+    fetched by index range. Inserts (rarely, as most are appends) and
+    deletes shift later entries.
+
+    Optionally (`--feed-fanout-limit`), each [re-]post is also fanned
+    out on write into `worth_feed_inbox`, one row per follower, as long
+    as the blogger has no more than `limit` followers. Entries which
+    were fanned out are flagged (`fanned_out`); the feed API reads the
+    inbox and merges in the unflagged entries from the feed cache, so
+    bloggers crossing the limit neither lose nor duplicate entries.
     """
 
+    _fanout_limit = 0
+
+    @classmethod
+    def set_fanout_limit(cls, limit, rebuild=False):
+        """Apply configured fan-out limit; rebuild inbox if it changed.
+
+        With `rebuild`, the inbox is rebuilt even if the limit is unchanged."""
+        limit = limit or 0
+        cls._fanout_limit = limit
+        current = DB.query_one("SELECT feed_fanout_limit FROM worth_state")
+        if current == limit and not (rebuild and limit):
+            return
+
+        if current != limit:
+            log.info("[WORTH] Feed fan-out limit changed: %d -> %d", current, limit)
+            DB.query("UPDATE worth_state SET feed_fanout_limit = :limit", limit=limit)
+        if not DbState.is_initial_sync():
+            cls.rebuild_inbox()
+
     @classmethod
     def insert(cls, post_id, account_id, created_at):
         """Inserts a [re-]post by an account into feed."""
         assert not DbState.is_initial_sync(), 'writing to feed cache in sync'
-        sql = """INSERT INTO worth_feed_cache (account_id, post_id, created_at)
-                      VALUES (:account_id, :id, :created_at)
-                 ON CONFLICT (account_id, post_id) DO NOTHING"""
-        DB.query(sql, account_id=account_id, id=post_id, created_at=created_at)
+        fanned_out = False
+        if cls._fanout_limit:
+            sql = "SELECT followers FROM worth_accounts WHERE id = :account_id"
+            fanned_out = DB.query_one(sql, account_id=account_id) <= cls._fanout_limit
+
+        # usually appended after the blog's last entry (found via ix2)
+        sql = """SELECT entry_id, (created_at, post_id) < (:created_at, :id)
+                   FROM worth_feed_cache WHERE account_id = :account_id
+               ORDER BY entry_id DESC LIMIT 1"""
+        last = DB.query_row(sql, account_id=account_id, id=post_id,
+                            created_at=created_at)
+        if not last or last[1]:
+            sql = """INSERT INTO worth_feed_cache (account_id, post_id, created_at,
+                                                   entry_id, fanned_out)
+                          VALUES (:account_id, :id, :created_at, :entry_id, :fanned_out)
+                     ON CONFLICT DO NOTHING RETURNING post_id"""
+            if not first(DB.query(sql, account_id=account_id, id=post_id,
+                                  created_at=created_at, fanned_out=fanned_out,
+                                  entry_id=last[0] + 1 if last else 0)):
+                return
+        else:
+            # inserted before existing entries (e.g. undelete): shift them
+            sql = """SELECT 1 FROM worth_feed_cache
+                      WHERE account_id = :account_id AND post_id = :id"""
+            if DB.query_one(sql, account_id=account_id, id=post_id):
+                return
+            sql = """UPDATE worth_feed_cache SET entry_id = entry_id + 1
+                      WHERE account_id = :account_id
+                        AND (created_at, post_id) > (:created_at, :id)"""
+            DB.query(sql, account_id=account_id, id=post_id, created_at=created_at)
+            sql = """INSERT INTO worth_feed_cache (account_id, post_id, created_at,
+                                                   entry_id, fanned_out)
+                          VALUES (:account_id, :id, :created_at, COALESCE((
+                                 SELECT entry_id + 1 FROM worth_feed_cache
+                                  WHERE account_id = :account_id
+                                    AND (created_at, post_id) < (:created_at, :id)
+                               ORDER BY entry_id DESC LIMIT 1), 0), :fanned_out)"""
+            DB.query(sql, account_id=account_id, id=post_id, created_at=created_at,
+                     fanned_out=fanned_out)
+
+        if fanned_out:
+            sql = """INSERT INTO worth_feed_inbox (account_id, post_id, blogger_id, created_at)
+                          SELECT follower, :id, :account_id, :created_at
+                            FROM worth_follows
+                           WHERE following = :account_id AND state IN (1,3)
+                     ON CONFLICT DO NOTHING"""
+            DB.query(sql, account_id=account_id, id=post_id,
+                     created_at=created_at)
 
     @classmethod
     def delete(cls, post_id, account_id=None):
@@ -35,11 +123,57 @@ class FeedCache:
         to be removed.
         """
         assert not DbState.is_initial_sync(), 'writing to feed cache in sync'
+        sql = "SELECT account_id, entry_id FROM worth_feed_cache WHERE post_id = :id"
+        if account_id:
+            sql = sql + " AND account_id = :account_id"
+        entries = DB.query_all(sql, account_id=account_id, id=post_id)
+
         sql = "DELETE FROM worth_feed_cache WHERE post_id = :id"
         if account_id:
             sql = sql + " AND account_id = :account_id"
         DB.query(sql, account_id=account_id, id=post_id)
 
+        # close the gaps left in each blog's sequence
+        sql = """UPDATE worth_feed_cache SET entry_id = entry_id - 1
+                  WHERE account_id = :account_id AND entry_id > :entry_id"""
+        for entry in entries:
+            DB.query(sql, account_id=entry[0], entry_id=entry[1])
+
+        if cls._fanout_limit:
+            sql = "DELETE FROM worth_feed_inbox WHERE post_id = :id"
+            if account_id:
+                sql = sql + " AND blogger_id = :account_id"
+            DB.query(sql, account_id=account_id, id=post_id)
+
+    @classmethod
+    def follow(cls, follower, following):
+        """Backfill a new follower's inbox with recent entries."""
+        if not cls._fanout_limit:
+            return
+        sql = """INSERT INTO worth_feed_inbox (account_id, post_id, blogger_id, created_at)
+                      SELECT :follower, post_id, account_id, created_at
+                        FROM worth_feed_cache
+                       WHERE account_id = :following AND fanned_out
+                         AND created_at > %s
+                 ON CONFLICT DO NOTHING""" % INBOX_CUTOFF
+        DB.query(sql, follower=follower, following=following)
+
+    @classmethod
+    def unfollow(cls, follower, following):
+        """Remove an unfollowed account's entries from an inbox."""
+        if not cls._fanout_limit:
+            return
+        sql = """DELETE FROM worth_feed_inbox
+                  WHERE account_id = :follower AND blogger_id = :following"""
+        DB.query(sql, follower=follower, following=following)
+
+    @classmethod
+    def prune_inbox(cls):
+        """Drop inbox entries which have aged out of the feed window."""
+        if not cls._fanout_limit:
+            return
+        DB.query("DELETE FROM worth_feed_inbox WHERE created_at < %s" % INBOX_CUTOFF)
+
     @classmethod
     def rebuild(cls, truncate=True):
         """Rebuilds the feed cache upon completion of initial sync."""
@@ -67,8 +201,38 @@ class FeedCache:
             ON CONFLICT DO NOTHING
         """)
         lap_2 = time.perf_counter()
+        DB.query(RENUMBER_SQL)
+        lap_3 = time.perf_counter()
         DB.query("COMMIT")
 
-        log.info("[WORTH] Rebuilt worth feed cache in %ds (%d+%d)",
-                 (lap_2 - lap_0), (lap_1 - lap_0), (lap_2 - lap_1))
+        log.info("[WORTH] Rebuilt worth feed cache in %ds (%d+%d+%d)",
+                 (lap_3 - lap_0), (lap_1 - lap_0), (lap_2 - lap_1),
+                 (lap_3 - lap_2))
 
+    @classmethod
+    def rebuild_inbox(cls):
+        """Rebuilds feed inboxes from feed cache and follower counts."""
+        log.info("[WORTH] Rebuilding feed inbox (fan-out limit %d)",
+                 cls._fanout_limit)
+        lap_0 = time.perf_counter()
+        DB.query("START TRANSACTION")
+        DB.query("TRUNCATE TABLE worth_feed_inbox")
+        if cls._fanout_limit:
+            DB.query("""
+                UPDATE worth_feed_cache SET fanned_out = followers <= :limit
+                  FROM worth_accounts
+                 WHERE account_id = worth_accounts.id
+                   AND worth_feed_cache.created_at > %s
+                   AND fanned_out != (followers <= :limit)
+            """ % INBOX_CUTOFF, limit=cls._fanout_limit)
+            DB.query("""
+                INSERT INTO worth_feed_inbox (account_id, post_id, blogger_id, created_at)
+                     SELECT follower, post_id, account_id, worth_feed_cache.created_at
+                       FROM worth_feed_cache
+                       JOIN worth_follows ON account_id = following AND state IN (1,3)
+                      WHERE worth_feed_cache.created_at > %s
+                        AND fanned_out
+                ON CONFLICT DO NOTHING
+            """ % INBOX_CUTOFF)
+        DB.query("COMMIT")
+        log.info("[WORTH] Rebuilt feed inbox in %ds", time.perf_counter() - lap_0)
@@ -7,6 +7,7 @@ from funcy.seqs import first,second
 from worth.db.adapter import Db
 from worth.db.db_state import DbState
 from worth.indexer.accounts import Accounts
+from worth.indexer.feed_cache import FeedCache
 from worth.indexer.notify import Notify
 
 log = logging.getLogger(__name__)
@@ -59,12 +60,14 @@ class Follow:
                 return
             if new_state == 1:
                 Follow.follow(op['flr'], op['flg'])
+                FeedCache.follow(op['flr'], op['flg'])
                 if old_state == 0:
                     score = Accounts.default_score(op_json['follower'])
                     Notify('follow', src_id=op['flr'], dst_id=op['flg'],
                            when=op['at'], score=score).write()
             elif old_state & 1 == 1:
                 Follow.unfollow(op['flr'], op['flg'])
+                FeedCache.unfollow(op['flr'], op['flg'])
 
     @classmethod
     def _validated_op(cls, account, op, date):
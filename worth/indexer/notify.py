@@ -1,8 +1,10 @@
 """Handle notifications"""
 
+from datetime import datetime, timedelta
 from enum import IntEnum
 import logging
 from worth.db.adapter import Db
+from worth.db.db_state import DbState
 #pylint: disable=too-many-lines,line-too-long
 
 log = logging.getLogger(__name__)
@@ -43,10 +45,39 @@ class NotifyType(IntEnum):
     #message = 25
 
 class Notify:
-    """Handles writing notifications/messages."""
+    """Handles writing notifications/messages.
+
+    Unread counts are kept in `worth_notifs_unread`, per account and
+    score bucket (lowest score of the bucket). `write` increments them,
+    `set_lastread` recounts the account, and `reconcile_unread` rebuilds
+    them from `worth_notifs` where rows were removed (fork pops, dropped
+    partitions). `reconcile_next` recounts a rotating slice of accounts,
+    repairing drift from any other path within a bounded cost.
+
+    With a retention period set, `worth_notifs` is partitioned by month
+    and `prune` drops partitions which ended before the retention window.
+    """
     # pylint: disable=too-many-instance-attributes,too-many-arguments
     DEFAULT_SCORE = 35
 
+    # min_score values served from unread counters
+    UNREAD_BUCKETS = (0, 25, 50, 75)
+
+    # number of account ids recounted per `reconcile_next` call
+    RECONCILE_SLICE = 20000
+
+    # first account id of the next slice recounted
+    _reconcile_from = 0
+
+    # days of notifications kept (0: keep all)
+    _retention_days = 0
+
+    # true if `worth_notifs` is partitioned by month
+    _partitioned = False
+
+    # months (YYYY-MM) known to have a partition
+    _months = set()
+
     def __init__(self, type_id, when=None, src_id=None, dst_id=None, community_id=None,
                  post_id=None, payload=None, score=None, **kwargs):
         """Create a notification."""
@@ -80,6 +111,87 @@ class Notify:
         sql = "UPDATE worth_accounts SET lastread_at = :date WHERE name = :name"
         DB.query(sql, date=date, name=account)
 
+        if DbState.is_initial_sync():
+            return
+        account_id = DB.query_one("SELECT id FROM worth_accounts WHERE name = :name",
+                                  name=account)
+        DB.query("DELETE FROM worth_notifs_unread WHERE account_id = :id",
+                 id=account_id)
+        DB.query(cls._unread_sql("AND dst_id = :id"), id=account_id)
+
+    @classmethod
+    def set_retention(cls, days):
+        """Apply configured retention; partitions `worth_notifs` if set."""
+        cls._retention_days = days or 0
+        if cls._retention_days:
+            cls._partitioned = DbState.partition_notifs()
+        else:
+            sql = "SELECT relkind FROM pg_class WHERE relname = 'worth_notifs'"
+            cls._partitioned = DB.query_one(sql) == 'p'
+
+    @classmethod
+    def prune(cls):
+        """Drop monthly partitions which ended before the retention window."""
+        if not (cls._retention_days and cls._partitioned):
+            return
+        cutoff = datetime.utcnow() - timedelta(days=cls._retention_days)
+        sql = """SELECT relname FROM pg_inherits
+                   JOIN pg_class ON pg_class.oid = inhrelid
+                  WHERE inhparent = 'worth_notifs'::regclass"""
+        notified = set()
+        for name in sorted(DB.query_col(sql)):
+            year, month = int(name[-6:-2]), int(name[-2:])
+            if datetime(year + month // 12, month % 12 + 1, 1) > cutoff:
+                break
+            sql = """SELECT DISTINCT dst_id FROM %s
+                      WHERE dst_id IS NOT NULL""" % name
+            notified.update(DB.query_col(sql))
+            log.info("[NOTIFY] dropping expired partition %s", name)
+            DB.query("DROP TABLE %s" % name)
+            cls._months.discard("%04d-%02d" % (year, month))
+        if notified:
+            cls.reconcile_unread(tuple(notified))
+
+    @classmethod
+    def reconcile_unread(cls, account_ids=None):
+        """Rebuild unread counters of `account_ids` (default: all)."""
+        DB.query("START TRANSACTION")
+        if account_ids:
+            DB.query("DELETE FROM worth_notifs_unread WHERE account_id IN :ids",
+                     ids=account_ids)
+            DB.query(cls._unread_sql("AND dst_id IN :ids"), ids=account_ids)
+        else:
+            DB.query("DELETE FROM worth_notifs_unread")
+            DB.query(cls._unread_sql())
+        DB.query("COMMIT")
+
+    @classmethod
+    def reconcile_next(cls):
+        """Rebuild unread counters of the next slice of account ids."""
+        lo = cls._reconcile_from
+        hi = lo + cls.RECONCILE_SLICE
+        DB.query("START TRANSACTION")
+        DB.query("""DELETE FROM worth_notifs_unread
+                     WHERE account_id >= :lo AND account_id < :hi""", lo=lo, hi=hi)
+        DB.query(cls._unread_sql("AND dst_id >= :lo AND dst_id < :hi"), lo=lo, hi=hi)
+        DB.query("COMMIT")
+
+        max_id = DB.query_one("SELECT MAX(id) FROM worth_accounts") or 0
+        cls._reconcile_from = hi if hi <= max_id else 0
+
+    @classmethod
+    def _unread_sql(cls, where=''):
+        bucket = ' '.join("WHEN score >= %d THEN %d" % (b, b)
+                          for b in reversed(cls.UNREAD_BUCKETS[1:]))
+        return """INSERT INTO worth_notifs_unread (account_id, bucket, unread)
+                       SELECT dst_id, CASE %s ELSE %d END, COUNT(*)
+                         FROM worth_notifs
+                         JOIN worth_accounts ON worth_accounts.id = dst_id
+                        WHERE dst_id IS NOT NULL AND score >= %d
+                          AND worth_notifs.created_at > lastread_at %s
+                     GROUP BY 1, 2""" % (bucket, cls.UNREAD_BUCKETS[0],
+                                         cls.UNREAD_BUCKETS[0], where)
+
     def to_dict(self):
         """Generate a db row."""
         return dict(
@@ -102,9 +214,25 @@ class Notify:
                         self.enum.name, self.src_id, self.dst_id, self.post_id,
                         ' (%s)' % self.payload if self.payload else '',
                         self.community_id, self.score)
+        month = str(self.when)[:7]
+        if self._partitioned and month not in self._months:
+            DbState.notifs_partition(self.when)
+            self._months.add(month)
         sql = """INSERT INTO worth_notifs (type_id, score, created_at, src_id,
                                           dst_id, post_id, community_id,
                                           payload)
                       VALUES (:type_id, :score, :created_at, :src_id, :dst_id,
                               :post_id, :community_id, :payload)"""
         DB.query(sql, **self.to_dict())
+
+        # counters are built by reconcile_unread after initial sync
+        if (self.dst_id and self.score >= self.UNREAD_BUCKETS[0]
+                and not DbState.is_initial_sync()):
+            sql = """INSERT INTO worth_notifs_unread (account_id, bucket, unread)
+                          SELECT id, :bucket, 1 FROM worth_accounts
+                           WHERE id = :dst_id AND lastread_at < :created_at
+                     ON CONFLICT (account_id, bucket) DO UPDATE
+                             SET unread = worth_notifs_unread.unread + 1"""
+            bucket = max(b for b in self.UNREAD_BUCKETS if b <= self.score)
+            DB.query(sql, bucket=bucket, dst_id=self.dst_id,
+                     created_at=self.when)
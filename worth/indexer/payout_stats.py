@@ -0,0 +1,90 @@
+"""Maintains pending payout stats per community and author."""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from worth.db.adapter import Db
+
+log = logging.getLogger(__name__)
+DB = Db.instance()
+
+class PayoutStats:
+    """Maintains `payout_stats`, which backs `get_payout_stats`.
+
+    Stats are built into a shadow table and swapped in, so API readers
+    are only blocked for the duration of the rename. While following
+    blocks, the build runs in a background thread on its own connection
+    (`generate_async`) and only the swap runs between blocks (`swap_built`).
+    """
+
+    SQL = """
+        SELECT community_id,
+               author,
+               SUM(payout) payout,
+               COUNT(*) posts,
+               NULL::integer authors
+          FROM worth_posts_cache
+         WHERE is_paidout = '0'
+      GROUP BY community_id, author
+
+         UNION ALL
+
+        SELECT community_id,
+               NULL author,
+               SUM(payout) payout,
+               COUNT(*) posts,
+               COUNT(DISTINCT(author)) authors
+          FROM worth_posts_cache
+         WHERE is_paidout = '0'
+      GROUP BY community_id
+    """
+
+    _executor = None
+    _build = None
+
+    @classmethod
+    def generate(cls):
+        """Rebuild payout stats and swap them in."""
+        cls._build_new(DB)
+        cls._swap()
+
+    @classmethod
+    def generate_async(cls, db):
+        """Start rebuilding payout stats in the background on `db`.
+
+        `db` must be a separate connection from the shared `Db`. Does
+        nothing if a build is already running or waiting to be swapped.
+        """
+        if cls._build:
+            return
+        if not cls._executor:
+            cls._executor = ThreadPoolExecutor(max_workers=1)
+        cls._build = cls._executor.submit(cls._build_new, db)
+
+    @classmethod
+    def swap_built(cls):
+        """Swap in stats built by `generate_async`, if finished."""
+        if not cls._build or not cls._build.done():
+            return
+        build, cls._build = cls._build, None
+        if build.exception():
+            log.error("[WORTH] payout_stats build failed: %r", build.exception())
+            return
+        cls._swap()
+
+    @classmethod
+    def _build_new(cls, db):
+        log.info("[WORTH] Rebuilding payout_stats")
+        db.query("DROP TABLE IF EXISTS payout_stats_new")
+        db.query("CREATE TABLE payout_stats_new (LIKE payout_stats INCLUDING DEFAULTS)")
+        db.query("""INSERT INTO payout_stats_new
+                    (community_id, author, payout, posts, authors) %s""" % cls.SQL)
+        db.query("""CREATE INDEX payout_stats_new_ix1
+                        ON payout_stats_new (community_id, author, payout)""")
+
+    @staticmethod
+    def _swap():
+        DB.query("START TRANSACTION")
+        DB.query("DROP TABLE payout_stats")
+        DB.query("ALTER TABLE payout_stats_new RENAME TO payout_stats")
+        DB.query("ALTER INDEX payout_stats_new_ix1 RENAME TO payout_stats_ix1")
+        DB.query("COMMIT")
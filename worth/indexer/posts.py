@@ -2,6 +2,7 @@
 
 import logging
 import collections
+from datetime import datetime
 
 from worth.db.adapter import Db
 from worth.db.db_state import DbState
@@ -24,6 +25,11 @@ class Posts:
     _hits = 0
     _miss = 0
 
+    # LRU cache for (id -> depth, category, community_id, is_valid, is_muted)
+    # lookup; lets comment ingestion inherit parent props without a query
+    PROPS_CACHE_SIZE = 500000
+    _props = collections.OrderedDict()
+
     @classmethod
     def last_id(cls):
         """Get the last indexed post id."""
@@ -62,6 +68,38 @@ class Posts:
             cls._ids.popitem(last=False)
         cls._ids[url] = pid
 
+    @classmethod
+    def _get_props(cls, pid):
+        """Look up a post's inheritable props, making use of LRU cache."""
+        if pid in cls._props:
+            props = cls._props.pop(pid)
+        else:
+            sql = """SELECT depth, category, community_id, is_valid, is_muted,
+                            COALESCE(root_id, id)
+                       FROM worth_posts WHERE id = :id"""
+            props = tuple(DB.query_row(sql, id=pid))
+            if len(cls._props) > cls.PROPS_CACHE_SIZE:
+                cls._props.popitem(last=False)
+        cls._props[pid] = props
+        return props
+
+    @classmethod
+    def _set_props(cls, post):
+        """Cache inheritable props of a freshly written post."""
+        if len(cls._props) > cls.PROPS_CACHE_SIZE:
+            cls._props.popitem(last=False)
+        cls._props[post['id']] = (post['depth'], post['category'],
+                                  post['community_id'], post['is_valid'],
+                                  post['is_muted'], post['root_id'] or post['id'])
+
+    @classmethod
+    def invalidate_props(cls, pid=None):
+        """Drop a post's cached props (or all of them, if no `pid`)."""
+        if pid is None:
+            cls._props.clear()
+        else:
+            cls._props.pop(pid, None)
+
     @classmethod
     def save_ids_from_tuples(cls, tuples):
         """Skim & cache `author/permlink -> id` from external queries."""
@@ -112,15 +150,18 @@ class Posts:
     @classmethod
     def insert(cls, op, date):
         """Inserts new post records."""
-        sql = """INSERT INTO worth_posts (is_valid, is_muted, parent_id, author,
-                             permlink, category, community_id, depth, created_at)
-                      VALUES (:is_valid, :is_muted, :parent_id, :author,
-                             :permlink, :category, :community_id, :depth, :date)"""
+        sql = """INSERT INTO worth_posts (is_valid, is_muted, parent_id, root_id,
+                             author, permlink, category, community_id, depth,
+                             created_at)
+                      VALUES (:is_valid, :is_muted, :parent_id, :root_id,
+                             :author, :permlink, :category, :community_id, :depth,
+                             :date)"""
         sql += ";SELECT currval(pg_get_serial_sequence('worth_posts','id'))"
         post = cls._build_post(op, date)
         result = DB.query(sql, **post)
         post['id'] = int(list(result)[0][0])
         cls._set_id(op['author']+'/'+op['permlink'], post['id'])
+        cls._set_props(post)
 
         if not DbState.is_initial_sync():
             if post['error']:
@@ -138,11 +179,13 @@ class Posts:
         """Re-allocates an existing record flagged as deleted."""
         sql = """UPDATE worth_posts SET is_valid = :is_valid,
                    is_muted = :is_muted, is_deleted = '0', is_pinned = '0',
-                   parent_id = :parent_id, category = :category,
+                   parent_id = :parent_id, root_id = :root_id,
+                   category = :category,
                    community_id = :community_id, depth = :depth
                  WHERE id = :id"""
         post = cls._build_post(op, date, pid)
         DB.query(sql, **post)
+        cls._set_props(post)
 
         if not DbState.is_initial_sync():
             if post['error']:
@@ -158,7 +201,9 @@ class Posts:
     def delete(cls, op):
         """Marks a post record as being deleted."""
         pid, depth = cls.get_id_and_depth(op['author'], op['permlink'])
-        DB.query("UPDATE worth_posts SET is_deleted = '1' WHERE id = :id", id=pid)
+        sql = "UPDATE worth_posts SET is_deleted = '1', deleted_at = :at WHERE id = :id"
+        DB.query(sql, id=pid, at=datetime.now().strftime('%Y-%m-%dT%H:%M:%S'))
+        cls.invalidate_props(pid)
 
         if not DbState.is_initial_sync():
             CachedPost.delete(pid, op['author'], op['permlink'])
@@ -216,6 +261,7 @@ class Posts:
         # if this is a top-level post:
         if not op['parent_author']:
             parent_id = None
+            root_id = None
             depth = 0
             category = op['parent_permlink']
             community_id = None
@@ -227,10 +273,8 @@ class Posts:
         # this is a comment; inherit parent props.
         else:
             parent_id = cls.get_id(op['parent_author'], op['parent_permlink'])
-            sql = """SELECT depth, category, community_id, is_valid, is_muted
-                       FROM worth_posts WHERE id = :id"""
             (parent_depth, category, community_id, is_valid,
-             is_muted) = DB.query_row(sql, id=parent_id)
+             is_muted, root_id) = cls._get_props(parent_id)
             depth = parent_depth + 1
             if not is_valid: error = 'replying to invalid post'
             elif is_muted: error = 'replying to muted post'
@@ -244,5 +288,5 @@ class Posts:
 
         return dict(author=op['author'], permlink=op['permlink'], id=pid,
                     is_valid=is_valid, is_muted=is_muted, parent_id=parent_id,
-                    depth=depth, category=category, community_id=community_id,
-                    date=date, error=error)
+                    root_id=root_id, depth=depth, category=category,
+                    community_id=community_id, date=date, error=error)
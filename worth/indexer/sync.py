@@ -9,6 +9,7 @@ import ujson as json
 from funcy.seqs import drop
 from toolz import partition_all
 
+from worth.db.adapter import Db
 from worth.db.db_state import DbState
 
 from worth.utils.timer import Timer
@@ -20,6 +21,9 @@ from worth.indexer.cached_post import CachedPost
 from worth.indexer.feed_cache import FeedCache
 from worth.indexer.follow import Follow
 from worth.indexer.community import Community
+from worth.indexer.notify import Notify
+from worth.indexer.tag_stats import TagStats
+from worth.indexer.payout_stats import PayoutStats
 from worth.server.common.mutes import Mutes
 
 #from worth.indexer.jobs import audit_cache_missing, audit_cache_deleted
@@ -36,23 +40,36 @@ class Sync:
         self._conf = conf
         self._db = conf.db()
         self._worth = conf.worth()
+        self._stats_db = None
 
     def run(self):
         """Initialize state; setup/recovery checks; sync and runloop."""
 
         # ensure db schema up to date, check app status
         DbState.initialize()
+        DbState.partition_trxids(self._conf.get('trxid_partitions'))
 
         # prefetch id->name and id->rank memory maps
         Accounts.load_ids()
         Accounts.fetch_ranks()
 
+        # prefetch community id->name and role memory maps
+        Community.load_ids()
+        Community.load_roles()
+
         # load irredeemables
         mutes = Mutes(self._conf.get('muted_accounts_url'))
         Mutes.set_shared_instance(mutes)
 
-        # community stats
+        # feed fan-out on write (rebuilds inbox if limit changed)
+        FeedCache.set_fanout_limit(self._conf.get('feed_fanout_limit'))
+
+        # notification retention (partitions notifs by month if set)
+        Notify.set_retention(self._conf.get('notify_retention_days'))
+
+        # community and tag stats
         Community.recalc_pending_payouts()
+        TagStats.recalc()
 
         if DbState.is_initial_sync():
             # resume initial sync
@@ -105,6 +122,10 @@ class Sync:
         CachedPost.recover_missing_posts(self._worth)
         FeedCache.rebuild()
         Follow.force_recount()
+        FeedCache.rebuild_inbox()
+        Notify.reconcile_unread()
+        TagStats.recalc()
+        PayoutStats.generate()
 
     def from_checkpoints(self, chunk_size=1000):
         """Initial sync strategy: read from blocks on disk.
@@ -196,6 +217,7 @@ class Sync:
             CachedPost.dirty_paidouts(block['timestamp'])
             cnt = CachedPost.flush(worths, trx=False)
             self._db.query("COMMIT")
+            PayoutStats.swap_built()
 
             ms = (perf() - start_time) * 1000
             log.info("[LIVE] Got block %d at %s --% 4d txs,% 3d posts,% 3d edits,"
@@ -208,15 +230,25 @@ class Sync:
                 log.warning("head block %d @ %s", num, block['timestamp'])
                 log.info("[LIVE] hourly stats")
                 Accounts.fetch_ranks()
-                #Community.recalc_pending_payouts()
-            if num % 200 == 0: #10min
+                FeedCache.prune_inbox()
+                Notify.prune()
+                Notify.reconcile_next()
                 Community.recalc_pending_payouts()
+                PayoutStats.generate_async(self._background_db())
+            elif num % 200 == 0: #10min
+                Community.recalc_ranks()
             if num % 100 == 0: #5min
                 log.info("[LIVE] 5-min stats")
                 Accounts.dirty_oldest(500)
             if num % 20 == 0: #1min
                 self._update_chain_state()
 
+    def _background_db(self):
+        """Separate connection for work run outside the block loop."""
+        if not self._stats_db:
+            self._stats_db = Db(self._conf.get('database_url'))
+        return self._stats_db
+
     # refetch dynamic_global_properties, feed price, etc
     def _update_chain_state(self):
         """Update basic state props (head block, feed price) in db."""
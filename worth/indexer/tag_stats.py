@@ -0,0 +1,60 @@
+"""Maintains pending payout stats per tag."""
+
+from worth.db.adapter import Db
+
+DB = Db.instance()
+
+class TagStats:
+    """Maintains `worth_tag_stats`, which backs the trending tags API.
+
+    Holds the number of pending posts (and top-level posts) and their
+    total payout for each category. `CachedPost` reports changes, which
+    are accumulated in memory and written with each batch of posts;
+    `recalc` rebuilds the table from `worth_posts_cache`; it is only run
+    at startup and after initial sync, never from the block loop.
+    """
+
+    # category -> [payout, posts, top_posts] changes, not yet written
+    _pending = {}
+
+    @classmethod
+    def track(cls, category, payout, posts, top_posts):
+        """Accumulate a change to a category's pending stats."""
+        if category not in cls._pending:
+            cls._pending[category] = [0, 0, 0]
+        cls._pending[category][0] += payout
+        cls._pending[category][1] += posts
+        cls._pending[category][2] += top_posts
+
+    @classmethod
+    def pending_sqls(cls):
+        """Build queries which apply accumulated changes."""
+        sql = """INSERT INTO worth_tag_stats (category, total_posts,
+                                              top_posts, total_payouts)
+                      VALUES (:category, :posts, :top_posts, :payout)
+                 ON CONFLICT (category) DO UPDATE
+                         SET total_posts = worth_tag_stats.total_posts + :posts,
+                             top_posts = worth_tag_stats.top_posts + :top_posts,
+                             total_payouts = worth_tag_stats.total_payouts + :payout"""
+        sqls = [(sql, dict(category=category, payout=payout, posts=posts,
+                           top_posts=top_posts))
+                for category, (payout, posts, top_posts) in cls._pending.items()
+                if payout or posts or top_posts]
+        cls._pending = {}
+        return sqls
+
+    @classmethod
+    def recalc(cls):
+        """Rebuild all tag stats from pending posts."""
+        DB.query("START TRANSACTION")
+        DB.query("DELETE FROM worth_tag_stats")
+        DB.query("""INSERT INTO worth_tag_stats (category, total_posts,
+                                                 top_posts, total_payouts)
+                         SELECT category, COUNT(*),
+                                SUM(CASE WHEN depth = 0 THEN 1 ELSE 0 END),
+                                SUM(payout)
+                           FROM worth_posts_cache
+                          WHERE is_paidout = '0'
+                       GROUP BY category""")
+        DB.query("COMMIT")
+        cls._pending = {}
@@ -3,6 +3,11 @@
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 
+from worth.server.common.feed import feed_fanout_limit, pids_by_feed_inbox
+from worth.server.common.ranking import RankingEngine
+from worth.server.common.community_cache import load_communities
+from worth.server.common.posts_status import posts_status
+
 # pylint: disable=too-many-lines
 
 DEFAULT_CID = 1317453
@@ -116,6 +121,14 @@ async def pids_by_community(db, ids, sort, seek_id, limit):
     # validate
     assert sort in definitions, 'unknown sort %s' % sort
 
+    # serve top pages of single/all community rankings from memory
+    ranking = RankingEngine._instance
+    if ranking and sort in RankingEngine.SORTS and len(ids or []) <= 1:
+        key = ('community', ids[0] if ids else None)
+        pids = await ranking.pids(sort, key, seek_id, limit)
+        if pids is not None:
+            return pids
+
     # setup
     field, pending, toponly, gray, promoted = definitions[sort]
     table = 'worth_posts_cache'
@@ -147,8 +160,8 @@ async def pids_by_community(db, ids, sort, seek_id, limit):
     #where.append("post_id NOT IN (%s)" % sql)
 
     # hide author
-    sql = "SELECT author FROM worth_posts_status WHERE list_type = '3'"
-    where.append("author NOT IN (%s)" % sql)
+    hidden = (await posts_status(db)).hidden_authors
+    if hidden: where.append("author NOT IN :hidden")
 
     # build
     sql = ("""SELECT post_id FROM %s WHERE %s
@@ -156,7 +169,8 @@ async def pids_by_community(db, ids, sort, seek_id, limit):
               """ % (table, ' AND '.join(where), field))
 
     # execute
-    return await db.query_col(sql, ids=tuple(ids), seek_id=seek_id, limit=limit)
+    return await db.query_col(sql, ids=tuple(ids), seek_id=seek_id, limit=limit,
+                              hidden=tuple(hidden))
 
 
 
@@ -169,6 +183,13 @@ async def pids_by_category(db, tag, sort, last_id, limit):
     assert sort in ['trending', 'hot', 'created', 'promoted',
                     'payout', 'payout_comments', 'muted']
 
+    # serve top pages of pending rankings from memory
+    ranking = RankingEngine._instance
+    if ranking and sort in RankingEngine.SORTS:
+        pids = await ranking.pids(sort, ('tag', tag or ''), last_id, limit)
+        if pids is not None:
+            return pids
+
     params = {             # field      pending posts   comment promoted
         'trending':        ('sc_trend', True,   True,   False,  False),
         'hot':             ('sc_hot',   True,   True,   False,  False),
@@ -209,14 +230,15 @@ async def pids_by_category(db, tag, sort, last_id, limit):
     #where.append("post_id NOT IN (%s)" % sql)
 
     # hide author
-    sql = "SELECT author FROM worth_posts_status WHERE list_type = '3'"
-    where.append("author NOT IN (%s)" % sql)
+    hidden = (await posts_status(db)).hidden_authors
+    if hidden: where.append("author NOT IN :hidden")
 
     sql = ("""SELECT post_id FROM %s WHERE %s
               ORDER BY %s DESC, post_id LIMIT :limit
               """ % (table, ' AND '.join(where), field))
 
-    return await db.query_col(sql, tag=tag, last_id=last_id, limit=limit)
+    return await db.query_col(sql, tag=tag, last_id=last_id, limit=limit,
+                              hidden=tuple(hidden))
 
 
 async def _subscribed(db, account_id):
@@ -227,20 +249,13 @@ async def _subscribed(db, account_id):
 
 async def _pinned(db, community_id):
     """Get a list of pinned post `id`s in `community`."""
-    sql = """SELECT id FROM worth_posts
-              WHERE is_pinned = '1'
-                AND is_deleted = '0'
-                AND community_id = :community_id
-            ORDER BY id DESC"""
-    return await db.query_col(sql, community_id=community_id)
+    communities = await load_communities(db, [community_id])
+    return communities.pinned(community_id)
 
 
 async def _pids_by_type(db, list_type):
     """Get a list of post `id`s."""
-    sql = """SELECT post_id FROM worth_posts_status
-              WHERE list_type = :list_type
-            ORDER BY created_at DESC"""
-    return await db.query_col(sql, list_type=list_type)
+    return (await posts_status(db)).post_ids(int(list_type))
 
 
 async def hide_pids_by_ids(db, ids):
@@ -248,10 +263,8 @@ async def hide_pids_by_ids(db, ids):
     if not ids:
         return []
 
-    sql = """SELECT post_id FROM worth_posts_status
-              WHERE list_type = '1' 
-              AND post_id IN :ids"""
-    return await db.query_col(sql, ids=tuple(ids))
+    hidden = (await posts_status(db)).hidden_posts
+    return [pid for pid in ids if pid in hidden]
 
 
 async def pids_by_blog(db, account: str, start_author: str = '',
@@ -315,13 +328,18 @@ async def pids_by_feed_with_reblog(db, account: str, start_author: str = '',
     """Get a list of [post_id, reblogged_by_str] for an account's feed."""
     account_id = await _get_account_id(db, account)
 
-    seek = ''
     start_id = None
     if start_permlink:
         start_id = await _get_post_id(db, start_author, start_permlink)
         if not start_id:
             return []
 
+    if await feed_fanout_limit(db):
+        return await pids_by_feed_inbox(db, account_id, start_id, limit,
+                                        last_month())
+
+    seek = ''
+    if start_id:
         seek = """
           HAVING MIN(worth_feed_cache.created_at) <= (
             SELECT MIN(created_at) FROM worth_feed_cache WHERE post_id = :start_id
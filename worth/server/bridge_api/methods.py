@@ -8,6 +8,8 @@ from worth.server.common.helpers import (
     valid_permlink,
     valid_tag,
     valid_limit)
+from worth.server.common.response_cache import cached_response
+from worth.server.common.posts_status import posts_status
 from worth.server.worth_api.common import get_account_id
 from worth.server.worth_api.objects import _follow_contexts
 from worth.server.worth_api.community import list_top_communities
@@ -71,6 +73,7 @@ async def get_post(context, author, permlink, observer=None):
 
 
 @return_error_info
+@cached_response
 async def get_ranked_posts(context, sort, start_author='', start_permlink='',
                            limit=20, tag=None, observer=None):
     """Query posts, sorted by given method."""
@@ -106,8 +109,7 @@ async def get_account_posts(context, sort, account, start_author='', start_perml
     start = (start_author, start_permlink)
     limit = valid_limit(limit, 100)
 
-    _id = await db.query_one("SELECT id FROM worth_posts_status WHERE author = :n", n=account)
-    if _id:
+    if account in (await posts_status(db)).listed_authors:
         return []
 
     # pylint: disable=unused-variable
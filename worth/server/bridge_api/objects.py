@@ -4,6 +4,8 @@ import logging
 import ujson as json
 from worth.server.common.mutes import Mutes
 from worth.server.common.helpers import json_date
+from worth.server.common.post_loader import load_post_rows
+from worth.server.common.community_cache import load_communities
 
 from worth.utils.normalize import wbd_amount
 
@@ -39,79 +41,36 @@ ROLES = {-2: 'muted', 0: 'guest', 2: 'member', 4: 'mod', 6: 'admin', 8: 'owner'}
 
 async def load_posts_keyed(db, ids, truncate_body=0):
     """Given an array of post ids, returns full posts objects keyed by id."""
-    # pylint: disable=too-many-locals
     assert ids, 'no ids passed to load_posts_keyed'
 
     # fetch posts and associated author reps
-    sql = """SELECT post_id, community_id, author, permlink, title, body, category, depth,
-                    promoted, payout, payout_at, is_paidout, children, votes,
-                    created_at, updated_at, rshares, raw_json, json,
-                    is_hidden, is_grayed, total_votes, flag_weight
-               FROM worth_posts_cache WHERE post_id IN :ids"""
-    result = await db.query_all(sql, ids=tuple(ids))
-    author_map = await _query_author_map(db, result)
+    rows = await load_post_rows(db, ids)
 
     # TODO: author affiliation?
-    ctx = {}
     posts_by_id = {}
-    author_ids = {}
-    post_cids = {}
-    for row in result:
-        row = dict(row)
-        author = author_map[row['author']]
-        author_ids[author['id']] = author['name']
-
-        row['author_rep'] = author['reputation']
+    for row in rows.values():
         post = _condenser_post_object(row, truncate_body=truncate_body)
-
-        post['blacklists'] = Mutes.lists(post['author'], author['reputation'])
-
+        post['blacklists'] = Mutes.lists(post['author'], row['author_rep'])
         posts_by_id[row['post_id']] = post
-        post_cids[row['post_id']] = row['community_id']
 
-        cid = row['community_id']
-        if cid:
-            if cid not in ctx:
-                ctx[cid] = []
-            ctx[cid].append(author['id'])
-
-    # TODO: optimize
-    titles = {}
-    roles = {}
-    for cid, account_ids in ctx.items():
-        sql = "SELECT title FROM worth_communities WHERE id = :id"
-        titles[cid] = await db.query_one(sql, id=cid)
-        sql = """SELECT account_id, role_id, title
-                   FROM worth_roles
-                  WHERE community_id = :cid
-                    AND account_id IN :ids"""
-        roles[cid] = {}
-        ret = await db.query_all(sql, cid=cid, ids=tuple(account_ids))
-        for row in ret:
-            name = author_ids[row['account_id']]
-            roles[cid][name] = (row['role_id'], row['title'])
+    cids = {row['community_id'] for row in rows.values() if row['community_id']}
+    communities = await load_communities(db, cids)
 
     for pid, post in posts_by_id.items():
-        author = post['author']
-        cid = post_cids[pid]
+        cid = rows[pid]['community_id']
         if cid:
             post['community'] = post['category'] # TODO: True?
-            post['community_title'] = titles[cid] or post['category']
-            role = roles[cid][author] if author in roles[cid] else (0, '')
+            post['community_title'] = communities.title(cid) or post['category']
+            role = communities.role(cid, rows[pid]['author_id'])
             post['author_role'] = ROLES[role[0]]
             post['author_title'] = role[1]
+            if communities.is_pinned(cid, pid):
+                post['stats']['is_pinned'] = True
         else:
             post['stats']['gray'] = ('irredeemables' in post['blacklists']
                                      or len(post['blacklists']) >= 2)
         post['stats']['hide'] = 'irredeemables' in post['blacklists']
 
-
-    sql = """SELECT id FROM worth_posts
-              WHERE id IN :ids AND is_pinned = '1' AND is_deleted = '0'"""
-    for pid in await db.query_col(sql, ids=tuple(ids)):
-        if pid in posts_by_id:
-            posts_by_id[pid]['stats']['is_pinned'] = True
-
     return posts_by_id
 
 async def load_posts(db, ids, truncate_body=0):
@@ -139,13 +98,6 @@ async def load_posts(db, ids, truncate_body=0):
 
     return [posts_by_id[_id] for _id in ids]
 
-async def _query_author_map(db, posts):
-    """Given a list of posts, returns an author->reputation map."""
-    if not posts: return {}
-    names = tuple({post['author'] for post in posts})
-    sql = "SELECT id, name, reputation FROM worth_accounts WHERE name IN :names"
-    return {r['name']: r for r in await db.query_all(sql, names=names)}
-
 def _condenser_profile_object(row):
     """Convert an internal account record into legacy-worths style."""
 
@@ -207,7 +159,6 @@ def _condenser_post_object(row, truncate_body=0):
     post['promoted'] = _amount(row['promoted'])
 
     post['replies'] = []
-    post['active_votes'] = _hydrate_active_votes(row['votes'])
     post['author_reputation'] = row['author_rep']
 
     post['stats'] = {
@@ -216,29 +167,31 @@ def _condenser_post_object(row, truncate_body=0):
         'total_votes': row['total_votes'],
         'flag_weight': row['flag_weight']} # TODO: down_weight
 
-    # import fields from legacy object
-    assert row['raw_json']
-    assert len(row['raw_json']) > 32
-    raw_json = json.loads(row['raw_json'])
+    # import pre-built fields (legacy object, votes)
+    payload = _payload(row)
+    votes = (json.loads(row['active_votes']) if row.get('active_votes')
+             else payload['active_votes'])
+    post['active_votes'] = [dict(voter=vote['voter'], rshares=vote['rshares'])
+                            for vote in votes]
 
     # TODO: move to core, or payout_details
-    post['beneficiaries'] = raw_json['beneficiaries']
-    post['max_accepted_payout'] = raw_json['max_accepted_payout']
-    post['percent_worth_dollars'] = raw_json['percent_worth_dollars'] # TODO: systag?
+    post['beneficiaries'] = payload['beneficiaries']
+    post['max_accepted_payout'] = payload['max_accepted_payout']
+    post['percent_worth_dollars'] = payload['percent_worth_dollars'] # TODO: systag?
     if paid:
-        curator_payout = wbd_amount(raw_json['curator_payout_value'])
+        curator_payout = wbd_amount(payload['curator_payout_value'])
         post['author_payout_value'] = _amount(row['payout'] - curator_payout)
         post['curator_payout_value'] = _amount(curator_payout)
 
     # TODO: re-evaluate
     if row['depth'] > 0:
-        post['parent_author'] = raw_json['parent_author']
-        post['parent_permlink'] = raw_json['parent_permlink']
-        post['title'] = 'RE: ' + raw_json['root_title'] # PostSummary & comment context
+        post['parent_author'] = payload['parent_author']
+        post['parent_permlink'] = payload['parent_permlink']
+        post['title'] = 'RE: ' + payload['root_title'] # PostSummary & comment context
     #else:
     #    post['parent_author'] = ''
     #    post['parent_permlink'] = ''
-    post['url'] = raw_json['url']
+    post['url'] = payload['url']
 
     return post
 
@@ -247,6 +200,18 @@ def _amount(amount, asset='WBD'):
     assert asset == 'WBD', 'unhandled asset %s' % asset
     return "%.3f WBD" % amount
 
+def _payload(row):
+    """Get a row's pre-built payload, or derive it for rows cached before
+    `payload` existed."""
+    if row.get('payload'):
+        return json.loads(row['payload'])
+
+    assert row['raw_json']
+    assert len(row['raw_json']) > 32
+    payload = json.loads(row['raw_json'])
+    payload['active_votes'] = _hydrate_active_votes(row['votes'])
+    return payload
+
 def _hydrate_active_votes(vote_csv):
     """Convert minimal CSV representation into worths-style object."""
     if not vote_csv: return []
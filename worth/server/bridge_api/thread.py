@@ -7,7 +7,8 @@ from worth.server.common.helpers import (
     return_error_info,
     valid_account,
     valid_permlink)
-from worth.server.bridge_api.cursor import hide_pids_by_ids
+from worth.server.common.thread import load_tree
+from worth.server.common.posts_status import posts_status
 
 log = logging.getLogger(__name__)
 
@@ -19,15 +20,12 @@ async def get_discussion(context, author, permlink):
     author = valid_account(author)
     permlink = valid_permlink(permlink)
     root_id = await _get_post_id(db, author, permlink)
-    hide_id = await _get_author_hide_id(db, author)
-    if not root_id or hide_id:
+    status = await posts_status(db)
+    if (not root_id or author in status.hidden_authors
+            or root_id in status.hidden_posts):
         return {}
 
-    post_hide_id = await _check_posts_hide_id(db, root_id)
-    if post_hide_id:
-        return {}
-
-    return await _load_discussion(db, root_id)
+    return await _load_discussion(db, root_id, status)
 
 async def _get_post_id(db, author, permlink):
     """Given an author/permlink, retrieve the id from db."""
@@ -36,55 +34,19 @@ async def _get_post_id(db, author, permlink):
     return await db.query_one(sql, a=author, p=permlink)
 
 
-async def _get_author_hide_id(db, author):
-    """Given an author, retrieve the id from db."""
-    sql = ("SELECT id FROM worth_posts_status WHERE author = :a "
-           "AND list_type = '3' LIMIT 1")
-    return await db.query_one(sql, a=author)
-
-
-async def _check_posts_hide_id(db, post_id):
-    """Given an post_id, retrieve the id from db."""
-    sql = ("SELECT id FROM worth_posts_status WHERE post_id = :post_id "
-           "AND list_type = '1' LIMIT 1")
-    return await db.query_one(sql, post_id=post_id)
-
 def _ref(post):
     return post['author'] + '/' + post['permlink']
 
-async def _child_ids(db, parent_ids):
-    """Load child ids for multuple parent ids."""
-    hide = "SELECT author FROM worth_posts_status WHERE list_type = '3'"
-    sql = """
-             SELECT parent_id, array_agg(id)
-               FROM worth_posts
-              WHERE parent_id IN :ids
-                AND is_deleted = '0'
-                AND author NOT IN (%s)
-           GROUP BY parent_id
-    """ % hide
-    rows = await db.query_all(sql, ids=tuple(parent_ids))
-    return [[row[0], row[1]] for row in rows]
-
-async def _load_discussion(db, root_id):
+async def _load_discussion(db, root_id, status):
     """Load a full discussion thread."""
-    # build `ids` list and `tree` map
-    ids = []
-    tree = {}
-    todo = [root_id]
-    while todo:
-        ids.extend(todo)
-        rows = await _child_ids(db, todo)
-        todo = []
-        for pid, cids in rows:
-            if cids:
-                hide_pids = await hide_pids_by_ids(db, cids)
-                for hide_pid in hide_pids:
-                    if hide_pid in cids:
-                        cids.remove(hide_pid)
-
-            tree[pid] = cids
-            todo.extend(cids)
+    # build `ids` list and `tree` map, skipping hidden posts and authors
+    where = []
+    if status.hidden_posts: where.append("worth_posts.id NOT IN :hidden_posts")
+    if status.hidden_authors: where.append("worth_posts.author NOT IN :hidden_authors")
+    tree = await load_tree(db, root_id, ' AND '.join(where),
+                           hidden_posts=tuple(status.hidden_posts),
+                           hidden_authors=tuple(status.hidden_authors))
+    ids = [root_id] + [cid for cids in tree.values() for cid in cids]
 
     # load all post objects, build ref-map
     posts = await load_posts_keyed(db, ids)
@@ -0,0 +1,56 @@
+"""Account id to name cache for server process."""
+
+import collections
+import logging
+
+log = logging.getLogger(__name__)
+
+class AccountNames:
+    """Singleton LRU of account names by id.
+
+    Account names never change once an id is assigned, so entries are
+    never invalidated; unknown ids are fetched in one query per call.
+    """
+
+    _instance = None
+
+    # max number of names kept
+    CACHE_SIZE = 200000
+
+    @classmethod
+    def instance(cls):
+        """Get the shared instance."""
+        assert cls._instance, 'set_shared_instance was never called'
+        return cls._instance
+
+    @classmethod
+    def set_shared_instance(cls, instance):
+        """Set the global/shared instance."""
+        cls._instance = instance
+
+    def __init__(self, db):
+        self._db = db
+        self._names = collections.OrderedDict()
+
+    async def names(self, ids):
+        """Get an id->name map for `ids` (unknown ids are omitted)."""
+        found = {}
+        for _id in ids:
+            if _id in self._names:
+                self._names.move_to_end(_id)
+                found[_id] = self._names[_id]
+
+        missing = set(ids) - found.keys()
+        if missing:
+            sql = "SELECT id, name FROM worth_accounts WHERE id IN :ids"
+            loaded = dict(await self._db.query_all(sql, ids=tuple(missing)))
+            found.update(loaded)
+            self._names.update(loaded)
+            while len(self._names) > self.CACHE_SIZE:
+                self._names.popitem(last=False)
+        return found
+
+async def account_names(db, ids):
+    """Get an id->name map, via the shared `AccountNames` if one is set."""
+    names = AccountNames._instance or AccountNames(db)
+    return await names.names(ids)
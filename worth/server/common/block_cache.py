@@ -0,0 +1,47 @@
+"""LRU cache of upstream blocks for server process."""
+
+import asyncio
+import collections
+import logging
+
+log = logging.getLogger(__name__)
+
+class BlockCache:
+    """Serves blocks by number from memory, fetching misses upstream.
+
+    The worths client is synchronous, so upstream calls run in the
+    default executor rather than on the event loop. Concurrent requests
+    for the same block share a single upstream call.
+    """
+
+    def __init__(self, worths, size=2000):
+        self._worths = worths
+        self._size = size
+        self._blocks = collections.OrderedDict()
+        self._pending = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, num):
+        """Get block `num`, or None if it does not exist (yet)."""
+        if num in self._blocks:
+            self.hits += 1
+            self._blocks.move_to_end(num)
+            return self._blocks[num]
+
+        self.misses += 1
+        if num not in self._pending:
+            loop = asyncio.get_event_loop()
+            self._pending[num] = loop.run_in_executor(
+                None, lambda: self._worths.get_block(num, strict=False))
+        future = self._pending[num]
+        try:
+            block = await asyncio.shield(future)
+        finally:
+            self._pending.pop(num, None)
+
+        if block and num not in self._blocks:
+            self._blocks[num] = block
+            if len(self._blocks) > self._size:
+                self._blocks.popitem(last=False)
+        return block
@@ -0,0 +1,155 @@
+"""Community metadata cache (names, titles, roles, pins) for server process."""
+
+import asyncio
+import logging
+
+log = logging.getLogger(__name__)
+
+# notify types which change titles, roles or pins (see indexer.notify)
+CHANGE_NOTIFS = (1, 2, 3, 4, 7, 8)
+
+class CommunityCache:
+    """Singleton holding community names, titles, non-default roles and pins.
+
+    Everything is loaded once, then on each new head block the
+    communities with role/props/pin notifications since the last check,
+    or with a pinned post deleted since, are reloaded. Communities not
+    seen yet are loaded on first use.
+    """
+
+    _instance = None
+
+    @classmethod
+    def instance(cls):
+        """Get the shared instance."""
+        assert cls._instance, 'set_shared_instance was never called'
+        return cls._instance
+
+    @classmethod
+    def set_shared_instance(cls, instance):
+        """Set the global/shared instance."""
+        cls._instance = instance
+
+    def __init__(self, db, head_block=None):
+        self._db = db
+        self._head_block = head_block
+        self._head = None
+        self._notif_id = None
+        self._refreshing = None
+        self._names = {}
+        self._titles = {}
+        self._roles = {}
+        self._pinned = {}
+
+    async def load(self, cids):
+        """Make sure metadata for `cids` is loaded and current."""
+        if self._head_block:
+            await self.refresh()
+        missing = set(cids) - self._titles.keys()
+        if missing:
+            await self._load(tuple(missing))
+
+    def name(self, cid):
+        """Get community name."""
+        return self._names.get(cid)
+
+    def title(self, cid):
+        """Get community title."""
+        return self._titles.get(cid)
+
+    def role(self, cid, account_id):
+        """Get (role_id, title) of an account in a community."""
+        return self._roles.get(cid, {}).get(account_id, (0, ''))
+
+    def pinned(self, cid):
+        """Get pinned post ids of a community, newest first."""
+        return sorted(self._pinned.get(cid, ()), reverse=True)
+
+    def is_pinned(self, cid, post_id):
+        """Check if a post is pinned in its community."""
+        return post_id in self._pinned.get(cid, ())
+
+    async def refresh(self):
+        """Reload changed communities if head block moved (single-flight)."""
+        if self._refreshing:
+            await asyncio.shield(self._refreshing)
+            return
+        head = await self._head_block()
+        if head == self._head:
+            return
+
+        self._refreshing = asyncio.ensure_future(self._refresh(head))
+        try:
+            await asyncio.shield(self._refreshing)
+        finally:
+            self._refreshing = None
+
+    async def _refresh(self, head):
+        last_id = await self._db.query_one("SELECT MAX(id) FROM worth_notifs") or 0
+        if self._notif_id is None:
+            await self._load()
+        else:
+            # deleting a pinned post emits no notification
+            cids = set(await self._deleted_pins())
+            if last_id > self._notif_id:
+                sql = """SELECT DISTINCT community_id FROM worth_notifs
+                          WHERE id > :first AND id <= :last
+                            AND community_id IS NOT NULL
+                            AND type_id IN :types"""
+                cids.update(await self._db.query_col(sql, first=self._notif_id,
+                                                     last=last_id, types=CHANGE_NOTIFS))
+            if cids:
+                await self._load(tuple(cids))
+        self._notif_id = last_id
+        self._head = head
+
+    async def _deleted_pins(self):
+        """Get communities whose cached pinned posts have been deleted."""
+        pins = tuple(pid for pids in self._pinned.values() for pid in pids)
+        if not pins:
+            return []
+        sql = """SELECT DISTINCT community_id FROM worth_posts
+                  WHERE id IN :ids AND is_deleted = '1'"""
+        return await self._db.query_col(sql, ids=pins)
+
+    async def _load(self, cids=None):
+        """Load metadata for `cids`, or for all communities."""
+        where = "IN :ids" if cids else "IS NOT NULL"
+        ids = cids or ()
+
+        names = {cid: None for cid in ids}
+        titles = {cid: None for cid in ids}
+        sql = "SELECT id, name, title FROM worth_communities WHERE id %s" % where
+        for cid, name, title in await self._db.query_all(sql, ids=ids):
+            names[cid] = name
+            titles[cid] = title
+
+        roles = {cid: {} for cid in ids}
+        sql = """SELECT community_id, account_id, role_id, title
+                   FROM worth_roles WHERE community_id %s
+                    AND (role_id != 0 OR title != '')""" % where
+        for cid, account_id, role_id, title in await self._db.query_all(sql, ids=ids):
+            roles.setdefault(cid, {})[account_id] = (role_id, title)
+
+        pinned = {cid: set() for cid in ids}
+        sql = """SELECT community_id, id FROM worth_posts
+                  WHERE community_id %s
+                    AND is_pinned = '1' AND is_deleted = '0'""" % where
+        for cid, post_id in await self._db.query_all(sql, ids=ids):
+            pinned.setdefault(cid, set()).add(post_id)
+
+        if not cids:
+            self._names, self._titles = names, titles
+            self._roles, self._pinned = roles, pinned
+            log.info("[COMMUNITY] loaded %d communities", len(titles))
+        else:
+            self._names.update(names)
+            self._titles.update(titles)
+            self._roles.update(roles)
+            self._pinned.update(pinned)
+
+async def load_communities(db, cids):
+    """Get a `CommunityCache` with `cids` loaded; shared one if set."""
+    cache = CommunityCache._instance or CommunityCache(db)
+    await cache.load(cids)
+    return cache
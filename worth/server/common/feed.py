@@ -0,0 +1,94 @@
+"""Feed queries backed by the fan-out-on-write feed inbox."""
+
+from aiocache import cached
+
+@cached(ttl=300, timeout=1200)
+async def feed_fanout_limit(db):
+    """Get the fan-out limit the indexer populates `worth_feed_inbox` with.
+
+    Zero means the inbox is disabled and feeds must be built from
+    `worth_feed_cache` alone."""
+    return await db.query_one("SELECT feed_fanout_limit FROM worth_state")
+
+async def pids_by_feed_inbox(db, account_id, start_id, limit, cutoff):
+    """Get a list of [post_id, reblogged_by_str] from an account's inbox.
+
+    Entries fanned out on write are read from the follower's inbox;
+    the rest (bloggers over the fan-out limit when they posted) are
+    merged in from `worth_feed_cache`. A post is ordered by its first
+    entry. Pages read a window of the newest entries at or before the
+    start post by index; a post is only served once its first entry is
+    inside the window, so it never shows on two pages.
+    """
+    seek = None
+    if start_id:
+        entries = await _feed_entries(db, account_id, (start_id,), cutoff)
+        if start_id not in entries:
+            return []
+        seek = entries[start_id][0]
+
+    rows = limit * 2
+    while True:
+        window = await _feed_window(db, account_id, seek, rows, cutoff)
+        full = len(window) == rows
+        pids = tuple({pid for pid, _ in window})
+        entries = await _feed_entries(db, account_id, pids, cutoff) if pids else {}
+        page = sorted(((first, pid) for pid, (first, _) in entries.items()
+                       if not full or first > window[-1][1]), reverse=True)
+        if len(page) >= limit or not full:
+            break
+        rows *= 4
+
+    return [(pid, ','.join(entries[pid][1])) for _, pid in page[:limit]]
+
+async def _feed_window(db, account_id, seek, rows, cutoff):
+    """Get the newest `rows` (post_id, created_at) feed entries up to `seek`."""
+    where = "AND created_at <= :seek" if seek else ""
+    sql = """SELECT post_id, created_at FROM worth_feed_inbox
+              WHERE account_id = :account AND created_at > :cutoff %s
+           ORDER BY created_at DESC LIMIT :rows""" % where
+    inbox = await db.query_all(sql, account=account_id, cutoff=cutoff,
+                               seek=seek, rows=rows)
+
+    where = "AND worth_feed_cache.created_at <= :seek" if seek else ""
+    sql = """SELECT post_id, worth_feed_cache.created_at
+               FROM worth_follows
+               JOIN worth_feed_cache ON following = account_id
+              WHERE follower = :account AND state IN (1,3)
+                AND NOT fanned_out
+                AND worth_feed_cache.created_at > :cutoff %s
+           ORDER BY worth_feed_cache.created_at DESC LIMIT :rows""" % where
+    pulled = await db.query_all(sql, account=account_id, cutoff=cutoff,
+                                seek=seek, rows=rows)
+
+    merged = sorted([tuple(r) for r in inbox] + [tuple(r) for r in pulled],
+                    key=lambda r: r[1], reverse=True)
+    return merged[:rows]
+
+async def _feed_entries(db, account_id, pids, cutoff):
+    """Map each of `pids` in the feed to [first created_at, blogger names]."""
+    sql = """
+        SELECT post_id, created_at, name
+          FROM (SELECT post_id, blogger_id, created_at
+                  FROM worth_feed_inbox
+                 WHERE post_id IN :ids AND account_id = :account
+                   AND created_at > :cutoff
+             UNION ALL
+                SELECT post_id, account_id, created_at
+                  FROM worth_feed_cache
+                 WHERE post_id IN :ids AND NOT fanned_out
+                   AND created_at > :cutoff
+                   AND account_id IN (SELECT following FROM worth_follows
+                                       WHERE follower = :account
+                                         AND state IN (1,3))) feed
+          JOIN worth_accounts ON blogger_id = worth_accounts.id
+    """
+    entries = {}
+    for pid, created_at, name in await db.query_all(sql, ids=pids, account=account_id,
+                                                    cutoff=cutoff):
+        if pid not in entries:
+            entries[pid] = [created_at, []]
+        elif created_at < entries[pid][0]:
+            entries[pid][0] = created_at
+        entries[pid][1].append(name)
+    return entries
@@ -12,6 +12,17 @@ class ApiError(Exception):
     # pylint: disable=unnecessary-pass
     pass
 
+class RawJson:
+    """JSON text spliced verbatim into responses (via ujson's `__json__`)."""
+    # pylint: disable=too-few-public-methods
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+    def __json__(self):
+        return self.text
+
 def return_error_info(function):
     """Async API method decorator which catches and formats exceptions."""
     @wraps(function)
@@ -114,3 +125,9 @@ def valid_follow_type(follow_type: str):
     """Ensure follow type is valid worths type."""
     assert follow_type in ['blog', 'ignore'], 'invalid follow_type `%s`' % follow_type
     return follow_type
+
+def valid_trx_id(trx_id: str):
+    """Returns validated (40-char hex) transaction id or throws Assert."""
+    assert isinstance(trx_id, str), 'trx_id must be a string'
+    assert re.match(r'^[0-9a-f]{40}$', trx_id), 'invalid trx_id `%s`' % trx_id
+    return trx_id
@@ -0,0 +1,122 @@
+"""Batched, cached loading of worth_posts_cache rows for server process."""
+
+import asyncio
+import collections
+import logging
+
+log = logging.getLogger(__name__)
+
+POST_ROW_SQL = """
+    SELECT post_id, community_id, author, permlink, title, body, category,
+           depth, promoted, payout, payout_at, is_paidout, children,
+           created_at, updated_at, rshares, json, is_hidden, is_grayed,
+           total_votes, flag_weight, payload, active_votes,
+           CASE WHEN payload IS NULL THEN votes END AS votes,
+           CASE WHEN payload IS NULL THEN raw_json END AS raw_json,
+           worth_accounts.id AS author_id, reputation AS author_rep
+      FROM worth_posts_cache
+      JOIN worth_accounts ON worth_accounts.name = author
+     WHERE post_id IN :ids"""
+
+class PostLoader:
+    """Singleton coalescing post row lookups across concurrent requests.
+
+    Ids requested during one event loop iteration are fetched together
+    in a single query, and the rows are shared by all waiting callers.
+    Rows are kept in an LRU which is dropped whenever the head block
+    changes, so cached rows are never older than the current block.
+    """
+
+    _instance = None
+
+    # max number of rows kept for one block
+    CACHE_SIZE = 20000
+
+    @classmethod
+    def instance(cls):
+        """Get the shared instance."""
+        assert cls._instance, 'set_shared_instance was never called'
+        return cls._instance
+
+    @classmethod
+    def set_shared_instance(cls, instance):
+        """Set the global/shared instance."""
+        cls._instance = instance
+
+    def __init__(self, db, head_block):
+        self._db = db
+        self._head_block = head_block
+        self._head = None
+        self._rows = collections.OrderedDict()
+        self._queued = set()
+        self._batch = None
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+
+    async def load(self, ids):
+        """Get a post_id->row map for `ids` (missing posts are omitted).
+
+        Rows are returned as fresh dicts which callers may modify.
+        """
+        head = await self._head_block()
+        if head != self._head:
+            self._head = head
+            self._rows.clear()
+
+        found = {}
+        for pid in ids:
+            if pid in self._rows:
+                self._rows.move_to_end(pid)
+                found[pid] = self._rows[pid]
+        self.hits += len(found)
+
+        missing = set(ids) - found.keys()
+        if missing:
+            self.misses += len(missing)
+            found.update(await self._enqueue(missing))
+
+        return {pid: dict(row) for pid, row in found.items()}
+
+    def _enqueue(self, ids):
+        """Add ids to the batch fetched on the next loop iteration."""
+        if not self._batch:
+            self._batch = asyncio.get_event_loop().create_future()
+            asyncio.get_event_loop().call_soon(
+                lambda: asyncio.ensure_future(self._flush()))
+        self._queued |= ids
+        return self._wait(self._batch, ids)
+
+    @staticmethod
+    async def _wait(batch, ids):
+        rows = await asyncio.shield(batch)
+        return {pid: rows[pid] for pid in ids if pid in rows}
+
+    async def _flush(self):
+        batch, ids, head = self._batch, self._queued, self._head
+        self._batch, self._queued = None, set()
+        self.batches += 1
+        try:
+            result = await self._db.query_all(POST_ROW_SQL, ids=tuple(ids))
+        except Exception as e: # pylint: disable=broad-except
+            batch.set_exception(e)
+            return
+
+        rows = {row['post_id']: dict(row) for row in result}
+        if head == self._head:
+            self._rows.update(rows)
+            while len(self._rows) > self.CACHE_SIZE:
+                self._rows.popitem(last=False)
+        batch.set_result(rows)
+
+    def stats(self):
+        """Get hit/miss counters."""
+        return dict(entries=len(self._rows), hits=self.hits,
+                    misses=self.misses, batches=self.batches)
+
+async def load_post_rows(db, ids):
+    """Get a post_id->row map, via the shared `PostLoader` if one is set."""
+    if PostLoader._instance:
+        return await PostLoader._instance.load(ids)
+    result = await db.query_all(POST_ROW_SQL, ids=tuple(ids))
+    return {row['post_id']: dict(row) for row in result}
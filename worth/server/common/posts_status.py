@@ -0,0 +1,94 @@
+"""In-memory copy of worth_posts_status lists for server process."""
+
+import asyncio
+import logging
+from time import perf_counter as perf
+
+log = logging.getLogger(__name__)
+
+class PostsStatus:
+    """Singleton holding hidden posts/authors and featured post lists.
+
+    `worth_posts_status` is small and rarely changes, so it is loaded
+    whole; every `CHECK_INTERVAL` seconds a cheap version query decides
+    whether it needs to be reloaded. Inserts and deletes change the row
+    count, and a trigger stamps `updated_at` on updates in place.
+
+    List types: 1 = hidden post, 2 = featured post, 3 = hidden author.
+    """
+
+    _instance = None
+
+    # seconds between version checks
+    CHECK_INTERVAL = 5.0
+
+    @classmethod
+    def instance(cls):
+        """Get the shared instance."""
+        assert cls._instance, 'set_shared_instance was never called'
+        return cls._instance
+
+    @classmethod
+    def set_shared_instance(cls, instance):
+        """Set the global/shared instance."""
+        cls._instance = instance
+
+    def __init__(self, db):
+        self._db = db
+        self._version = None
+        self._checked = 0
+        self._refreshing = None
+        self.hidden_posts = frozenset()
+        self.hidden_authors = frozenset()
+        self.listed_authors = frozenset()
+        self._post_lists = {}
+
+    def post_ids(self, list_type):
+        """Get post ids of a list, newest first."""
+        return list(self._post_lists.get(list_type, []))
+
+    async def refresh(self):
+        """Reload lists if the table changed (single-flight)."""
+        if self._refreshing:
+            await asyncio.shield(self._refreshing)
+            return
+        if perf() - self._checked < self.CHECK_INTERVAL:
+            return
+
+        self._refreshing = asyncio.ensure_future(self._refresh())
+        try:
+            await asyncio.shield(self._refreshing)
+        finally:
+            self._refreshing = None
+
+    async def _refresh(self):
+        sql = """SELECT COUNT(*), MAX(updated_at)
+                   FROM worth_posts_status"""
+        version = tuple(await self._db.query_row(sql))
+        if version != self._version:
+            await self._load()
+            self._version = version
+        self._checked = perf()
+
+    async def _load(self):
+        sql = """SELECT post_id, author, list_type FROM worth_posts_status
+               ORDER BY created_at DESC"""
+        rows = await self._db.query_all(sql)
+
+        post_lists = {}
+        for post_id, _, list_type in rows:
+            post_lists.setdefault(list_type, []).append(post_id)
+        self._post_lists = post_lists
+        self.hidden_posts = frozenset(post_lists.get(1, []))
+        self.hidden_authors = frozenset(r[1] for r in rows if r[2] == 3)
+        self.listed_authors = frozenset(r[1] for r in rows if r[1])
+        log.info("[STATUS] %d hidden posts, %d hidden authors",
+                 len(self.hidden_posts), len(self.hidden_authors))
+
+async def posts_status(db):
+    """Get current `PostsStatus`; the shared one if set."""
+    status = PostsStatus._instance
+    if not status:
+        status = PostsStatus(db)
+    await status.refresh()
+    return status
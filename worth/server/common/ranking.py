@@ -0,0 +1,279 @@
+"""In-memory trending/hot rankings for server process."""
+
+import asyncio
+import bisect
+import collections
+import heapq
+import logging
+from datetime import timedelta
+from time import perf_counter as perf
+
+from worth.server.common.posts_status import posts_status
+
+log = logging.getLogger(__name__)
+
+# community excluded from the all-communities listing (see pids_by_community)
+EXCLUDED_CID = 1337319
+
+RankedPost = collections.namedtuple(
+    'RankedPost', ['author', 'community_id', 'is_grayed', 'tags', 'scores'])
+
+class RankingEngine:
+    """Singleton keeping top-K trending/hot post ids per tag and community.
+
+    All pending top-level posts are held in memory. Sorted lists of
+    `(-score, post_id)` are built lazily per (sort, key), capped at
+    `TOP_K`, and kept in place as posts change. A list is always an exact
+    prefix of its ranking, so pages within it are answered by binary
+    search; anything beyond it is left to the SQL cursors.
+
+    Changed rows are picked up via `worth_posts_cache.cached_at`; deleted
+    posts (whose cache rows are gone) are picked up via
+    `worth_posts.deleted_at`, which the indexer stamps with the same clock.
+    Community rankings also contain paid-out posts, which are not held
+    here; they are only served down to the best paid-out score (`floor`)
+    of the community.
+    """
+
+    _instance = None
+
+    SORTS = {'trending': 0, 'hot': 1}
+
+    # max length of each sorted list
+    TOP_K = 2000
+
+    # seconds between incremental refreshes (~1 block)
+    REFRESH_INTERVAL = 3.0
+
+    # seconds between full reloads
+    RELOAD_INTERVAL = 3600.0
+
+    # re-read rows cached this long before the last seen row, covering
+    # indexer transactions which committed late
+    OVERLAP = timedelta(seconds=30)
+
+    @classmethod
+    def instance(cls):
+        """Get the shared instance."""
+        assert cls._instance, 'set_shared_instance was never called'
+        return cls._instance
+
+    @classmethod
+    def set_shared_instance(cls, instance):
+        """Set the global/shared instance."""
+        cls._instance = instance
+
+    def __init__(self, db):
+        self._db = db
+        self._posts = {}
+        self._keys = collections.defaultdict(set)
+        self._floors = {}
+        self._lists = {}
+        self._hidden = set()
+        self._watermark = None
+        self._refreshed = 0
+        self._loaded = 0
+        self._refreshing = None
+
+    # -- public api --
+
+    async def pids(self, sort, key, seek_id, limit):
+        """Get a page of post ids, or None if it can't be served from memory.
+
+        `key` is `('tag', tag)` (`''` for all pending posts) or
+        `('community', community_id)` (`None` for all communities).
+        """
+        await self.refresh()
+
+        ranked = self._list(sort, key)
+        lst, complete = ranked['ids'], ranked['complete']
+
+        # only the part above the paid-out floor is guaranteed exact
+        floor = self._floor(sort, key)
+        end = len(lst)
+        if floor is not None:
+            end = bisect.bisect_left(lst, (-floor,))
+            complete = False
+
+        start = 0
+        if seek_id:
+            if seek_id not in self._posts:
+                return None
+            score = self._posts[seek_id].scores[self.SORTS[sort]]
+            start = bisect.bisect_right(lst, (-score, seek_id))
+
+        out = []
+        for idx in range(start, end):
+            pid = lst[idx][1]
+            if self._posts[pid].author in self._hidden:
+                continue
+            out.append(pid)
+            if len(out) == limit:
+                return out
+        return out if complete else None
+
+    async def refresh(self):
+        """Apply rows changed since the last refresh (single-flight)."""
+        if self._refreshing:
+            await asyncio.shield(self._refreshing)
+            return
+        if perf() - self._refreshed < self.REFRESH_INTERVAL:
+            return
+
+        self._refreshing = asyncio.ensure_future(self._refresh())
+        try:
+            await asyncio.shield(self._refreshing)
+        finally:
+            self._refreshing = None
+
+    # -- loading --
+
+    async def _refresh(self):
+        now = perf()
+        if not self._watermark or now - self._loaded > self.RELOAD_INTERVAL:
+            await self._load()
+            self._loaded = now
+        else:
+            since = self._watermark - self.OVERLAP
+            await self._load_changed(since)
+            await self._drop_deleted(since)
+        self._hidden = (await posts_status(self._db)).hidden_authors
+        self._refreshed = perf()
+
+    async def _load(self):
+        """Full (re)load of pending top-level posts and floors."""
+        start = perf()
+        sql = """SELECT post_id, author, community_id, is_grayed, is_paidout,
+                        sc_trend, sc_hot, cached_at
+                   FROM worth_posts_cache
+                  WHERE depth = 0 AND is_paidout = '0'"""
+        rows = await self._db.query_all(sql)
+
+        sql = """SELECT community_id, MAX(sc_trend), MAX(sc_hot)
+                   FROM worth_posts_cache
+                  WHERE community_id IS NOT NULL AND is_grayed = '0'
+                    AND depth = 0 AND is_paidout = '1'
+               GROUP BY community_id"""
+        floors = {r[0]: [r[1], r[2]] for r in await self._db.query_all(sql)}
+
+        self._posts = {}
+        self._keys = collections.defaultdict(set)
+        self._lists = {}
+        self._floors = floors
+        self._watermark = None
+        self._apply(rows, await self._tags(rows))
+        log.info("[RANK] loaded %d pending posts in %.3fs",
+                 len(self._posts), perf() - start)
+
+    async def _load_changed(self, since):
+        """Apply top-level posts cached since the last seen row."""
+        sql = """SELECT post_id, author, community_id, is_grayed, is_paidout,
+                        sc_trend, sc_hot, cached_at
+                   FROM worth_posts_cache
+                  WHERE depth = 0 AND cached_at >= :since"""
+        rows = await self._db.query_all(sql, since=since)
+        self._apply(rows, await self._tags(rows))
+
+    async def _drop_deleted(self, since):
+        """Remove posts deleted since the last seen row."""
+        sql = """SELECT id FROM worth_posts
+                  WHERE is_deleted = '1' AND deleted_at >= :since"""
+        for pid in await self._db.query_col(sql, since=since):
+            self._remove(pid)
+
+    async def _tags(self, rows):
+        pids = tuple(r['post_id'] for r in rows if not r['is_paidout'])
+        tags = collections.defaultdict(set)
+        if pids:
+            sql = "SELECT post_id, tag FROM worth_post_tags WHERE post_id IN :ids"
+            for pid, tag in await self._db.query_all(sql, ids=pids):
+                tags[pid].add(tag)
+        return tags
+
+    def _apply(self, rows, tags):
+        for row in rows:
+            pid = row['post_id']
+            if not self._watermark or row['cached_at'] > self._watermark:
+                self._watermark = row['cached_at']
+
+            if row['is_paidout']:
+                self._remove(pid)
+                cid = row['community_id']
+                if cid and not row['is_grayed']:
+                    floor = self._floors.setdefault(cid, [row['sc_trend'], row['sc_hot']])
+                    floor[0] = max(floor[0], row['sc_trend'])
+                    floor[1] = max(floor[1], row['sc_hot'])
+                continue
+
+            post = RankedPost(row['author'], row['community_id'],
+                              row['is_grayed'], frozenset(tags[pid]),
+                              (row['sc_trend'], row['sc_hot']))
+            if self._posts.get(pid) != post:
+                self._remove(pid)
+                self._add(pid, post)
+
+    # -- in-place list maintenance --
+
+    @staticmethod
+    def _post_keys(post):
+        keys = [('tag', '')] + [('tag', tag) for tag in post.tags]
+        if post.community_id and not post.is_grayed:
+            keys.append(('community', post.community_id))
+            if post.community_id != EXCLUDED_CID:
+                keys.append(('community', None))
+        return keys
+
+    def _add(self, pid, post):
+        self._posts[pid] = post
+        for key in self._post_keys(post):
+            self._keys[key].add(pid)
+            for sort, idx in self.SORTS.items():
+                ranked = self._lists.get((sort, key))
+                if not ranked:
+                    continue
+                lst = ranked['ids']
+                entry = (-post.scores[idx], pid)
+                if ranked['complete'] or (lst and entry < lst[-1]):
+                    bisect.insort(lst, entry)
+                    if len(lst) > self.TOP_K:
+                        lst.pop()
+                        ranked['complete'] = False
+
+    def _remove(self, pid):
+        post = self._posts.pop(pid, None)
+        if not post:
+            return
+        for key in self._post_keys(post):
+            self._keys[key].discard(pid)
+            for sort, idx in self.SORTS.items():
+                ranked = self._lists.get((sort, key))
+                if not ranked:
+                    continue
+                lst = ranked['ids']
+                entry = (-post.scores[idx], pid)
+                pos = bisect.bisect_left(lst, entry)
+                if pos < len(lst) and lst[pos] == entry:
+                    del lst[pos]
+                    # a short, incomplete list is rebuilt on next use
+                    if not ranked['complete'] and len(lst) < self.TOP_K // 2:
+                        del self._lists[(sort, key)]
+
+    def _list(self, sort, key):
+        if (sort, key) not in self._lists:
+            idx = self.SORTS[sort]
+            pids = self._keys.get(key, ())
+            entries = ((-self._posts[pid].scores[idx], pid) for pid in pids)
+            self._lists[(sort, key)] = {
+                'ids': heapq.nsmallest(self.TOP_K, entries),
+                'complete': len(pids) <= self.TOP_K}
+        return self._lists[(sort, key)]
+
+    def _floor(self, sort, key):
+        if key[0] != 'community':
+            return None
+        idx = self.SORTS[sort]
+        if key[1] is None:
+            floors = [f[idx] for cid, f in self._floors.items() if cid != EXCLUDED_CID]
+            return max(floors) if floors else None
+        floor = self._floors.get(key[1])
+        return floor[idx] if floor else None
@@ -0,0 +1,125 @@
+"""Shared API response cache, invalidated by head block."""
+
+import asyncio
+import collections
+import inspect
+import logging
+from functools import wraps
+from time import perf_counter as perf
+import ujson as json
+
+log = logging.getLogger(__name__)
+
+class ResponseCache:
+    """Singleton caching API responses for the current head block.
+
+    Entries are keyed by (head block, method, normalized params), so a
+    new block implicitly invalidates everything. Identical requests which
+    arrive while a response is being computed await the same result
+    instead of querying the db again.
+    """
+
+    _instance = None
+
+    # seconds between head block checks
+    HEAD_TTL = 1.0
+
+    # max number of responses kept for one block
+    MAX_ENTRIES = 10000
+
+    @classmethod
+    def instance(cls):
+        """Get the shared instance."""
+        assert cls._instance, 'set_shared_instance was never called'
+        return cls._instance
+
+    @classmethod
+    def set_shared_instance(cls, instance):
+        """Set the global/shared instance."""
+        cls._instance = instance
+
+    def __init__(self, db):
+        self._db = db
+        self._head = None
+        self._head_checked = 0
+        self._entries = collections.OrderedDict()
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def head_block(self):
+        """Get head block num, refreshed at most every `HEAD_TTL` secs.
+
+        Read from the primary: replicas may be at different heads, which
+        would make the head (and the cache) flap between them.
+        """
+        now = perf()
+        if now - self._head_checked > self.HEAD_TTL:
+            self._head_checked = now
+            sql = "SELECT num FROM worth_blocks ORDER BY num DESC LIMIT 1"
+            head = await self._db.query_primary_one(sql)
+            if head != self._head:
+                self._head = head
+                self._entries.clear()
+        return self._head
+
+    async def get(self, key, fetch):
+        """Get cached response for `key`, or await `fetch()` to build it."""
+        key = (await self.head_block(), key)
+
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        if key in self._inflight:
+            self.coalesced += 1
+            return await asyncio.shield(self._inflight[key])
+
+        self.misses += 1
+        future = asyncio.ensure_future(fetch())
+        self._inflight[key] = future
+        try:
+            result = await asyncio.shield(future)
+        finally:
+            self._inflight.pop(key, None)
+
+        if key[0] == self._head:
+            self._entries[key] = result
+            if len(self._entries) > self.MAX_ENTRIES:
+                self._entries.popitem(last=False)
+        return result
+
+    def stats(self):
+        """Get hit/miss counters."""
+        return dict(head_block=self._head, entries=len(self._entries),
+                    hits=self.hits, misses=self.misses,
+                    coalesced=self.coalesced)
+
+def cached_response(function):
+    """API method decorator which serves results from `ResponseCache`.
+
+    Params are bound to the method signature (applying defaults), so
+    positional, named and omitted-default calls share one entry.
+    """
+    sig = inspect.signature(function)
+    name = function.__module__ + '.' + function.__name__
+
+    @wraps(function)
+    async def wrapper(context, *args, **kwargs):
+        cache = ResponseCache._instance
+        if not cache:
+            return await function(context, *args, **kwargs)
+
+        try:
+            bound = sig.bind(context, *args, **kwargs)
+            bound.apply_defaults()
+            params = list(bound.arguments.items())[1:]
+            key = (name, json.dumps(params, sort_keys=True))
+        except (TypeError, OverflowError):
+            # invalid or unserializable params; let the method handle it
+            return await function(context, *args, **kwargs)
+
+        return await cache.get(key, lambda: function(context, *args, **kwargs))
+    return wrapper
@@ -0,0 +1,34 @@
+"""Comment tree queries shared by the discussion APIs."""
+
+async def load_tree(db, root_id, where='', max_depth=None, **params):
+    """Get a {parent_id: [child_id, ...]} map of a thread in one query.
+
+    All replies in the thread are read via `root_id`, then linked up
+    from `root_id`. `where` is an extra condition on `worth_posts` rows;
+    a reply it excludes is pruned along with all of its descendants.
+    Replies deeper than `max_depth` levels below the root are dropped.
+    """
+    sql = """
+        SELECT id, parent_id
+          FROM worth_posts
+         WHERE root_id = (SELECT COALESCE(root_id, id)
+                            FROM worth_posts WHERE id = :root_id)
+           AND is_deleted = '0' %s
+      ORDER BY id
+    """ % (where and 'AND ' + where)
+    children = {}
+    for pid, parent_id in await db.query_all(sql, root_id=root_id, **params):
+        children.setdefault(parent_id, []).append(pid)
+
+    tree = {}
+    todo = [root_id]
+    depth = 0
+    while todo and depth != max_depth:
+        depth += 1
+        level = []
+        for pid in todo:
+            if pid in children:
+                tree[pid] = children[pid]
+                level.extend(children[pid])
+        todo = level
+    return tree
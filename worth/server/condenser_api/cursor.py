@@ -1,9 +1,11 @@
 """Cursor-based pagination queries, mostly supporting condenser_api."""
 
+from base64 import urlsafe_b64encode, urlsafe_b64decode
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 
 from worth.utils.normalize import rep_to_raw
+from worth.server.common.feed import feed_fanout_limit, pids_by_feed_inbox
 
 # pylint: disable=too-many-lines
 
@@ -35,92 +37,124 @@ async def _get_account_id(db, name):
     return _id
 
 
-async def get_followers(db, account: str, start: str, follow_type: str, limit: int):
-    """Get a list of accounts following a given account."""
-    account_id = await _get_account_id(db, account)
-    start_id = await _get_account_id(db, start) if start else None
-    state = (2,3) if follow_type == 'ignore' else (1,3)
-
-    seek = ''
-    if start_id:
-        seek = """AND hf.created_at <= (
-                     SELECT created_at FROM worth_follows
-                      WHERE following = :account_id
-                        AND follower = :start_id)"""
-
+# follow lists: `column` is the worth_follows column matching the given
+# account -- 'following' lists its followers, 'follower' its followings.
+# rows are ordered by (created_at, other account id), and pages seek on
+# that key instead of counting through preceding rows. each state is
+# scanned separately, as an ordered range of ix5a/ix5b, and the two
+# scans merged; `state IN (..)` would read and sort every row instead.
+
+def _follow_other(column):
+    return 'follower' if column == 'following' else 'following'
+
+def _follow_state(follow_type):
+    return (2, 3) if follow_type == 'ignore' else (1, 3)
+
+def _follow_scans(column, seek):
+    """Build per-state scans of up to `:limit` rows, newest first."""
+    other = _follow_other(column)
+    where = ("AND (created_at, %s) <= (:created_at, :other_id)" % other
+             if seek else '')
+    scan = """(SELECT state, created_at, %s FROM worth_follows
+                WHERE %s = :account_id AND state = :%s %s
+             ORDER BY created_at DESC, %s DESC
+                LIMIT :limit)"""
+    return " UNION ALL ".join(scan % (other, column, state, where, other)
+                              for state in ('state_a', 'state_b'))
+
+async def _follows(db, column, account_id, state, limit, seek=None):
+    """Get follow rows of `account_id`, starting at `seek` if given."""
+    other = _follow_other(column)
     sql = """
-        SELECT name,reputation,state FROM worth_follows hf
-     LEFT JOIN worth_accounts ON hf.follower = id
-         WHERE hf.following = :account_id
-           AND state IN :state %s
-      ORDER BY hf.created_at DESC
+        SELECT name, reputation, state, hf.created_at, hf.%s AS account_id
+          FROM (%s) hf
+     LEFT JOIN worth_accounts ON hf.%s = id
+      ORDER BY hf.created_at DESC, hf.%s DESC
          LIMIT :limit
-    """ % seek
-
-    return await db.query_all(sql, account_id=account_id, start_id=start_id,
-                              state=state, limit=limit)
+    """ % (other, _follow_scans(column, seek), other, other)
 
+    created_at, other_id = seek or (None, None)
+    return await db.query_all(sql, account_id=account_id, state_a=state[0],
+                              state_b=state[1], limit=limit,
+                              created_at=created_at, other_id=other_id)
 
-async def get_followers_by_page(db, account: str, page: int, page_size: int, follow_type: str):
-    """Get a list of accounts following a given account."""
+async def _follows_from(db, column, account, start, follow_type, limit):
     account_id = await _get_account_id(db, account)
-    state = (2,3) if follow_type == 'ignore' else (1,3)
-
-    sql = """
-        SELECT name,reputation,state FROM worth_follows hf
-     LEFT JOIN worth_accounts ON hf.follower = id
-         WHERE hf.following = :account_id
-           AND state IN :state
-      ORDER BY hf.created_at DESC
-         LIMIT :limit OFFSET :offset
-    """
+    state = _follow_state(follow_type)
+
+    seek = None
+    if start:
+        start_id = await _get_account_id(db, start)
+        other = _follow_other(column)
+        sql = """SELECT created_at, %s FROM worth_follows
+                  WHERE %s = :account_id AND %s = :start_id""" % (other, column, other)
+        seek = await db.query_row(sql, account_id=account_id, start_id=start_id)
+        if not seek:
+            return []
 
-    return await db.query_all(sql, account_id=account_id,
-                              state=state, limit=page_size, offset=page*page_size)
+    return await _follows(db, column, account_id, state, limit, seek)
 
-async def get_following(db, account: str, start: str, follow_type: str, limit: int):
-    """Get a list of accounts followed by a given account."""
+async def _follows_page(db, column, account, page, page_size, follow_type):
     account_id = await _get_account_id(db, account)
-    start_id = await _get_account_id(db, start) if start else None
-    state = (2, 3) if follow_type == 'ignore' else (1, 3)
+    state = _follow_state(follow_type)
+
+    # find the page's first key by skipping over the index alone, then
+    # join accounts for that page only.
+    seek = None
+    if page > 0:
+        other = _follow_other(column)
+        offset = page * page_size
+        sql = """SELECT created_at, %s FROM (%s) hf
+               ORDER BY created_at DESC, %s DESC
+                 OFFSET :offset LIMIT 1""" % (other, _follow_scans(column, None), other)
+        seek = await db.query_row(sql, account_id=account_id, state_a=state[0],
+                                  state_b=state[1], limit=offset + 1,
+                                  offset=offset)
+        if not seek:
+            return []
 
-    seek = ''
-    if start_id:
-        seek = """AND hf.created_at <= (
-                     SELECT created_at FROM worth_follows
-                      WHERE follower = :account_id
-                        AND following = :start_id)"""
+    return await _follows(db, column, account_id, state, page_size, seek)
 
-    sql = """
-        SELECT name,reputation,state FROM worth_follows hf
-     LEFT JOIN worth_accounts ON hf.following = id
-         WHERE hf.follower = :account_id
-           AND state IN :state %s
-      ORDER BY hf.created_at DESC
-         LIMIT :limit
-    """ % seek
+def follow_cursor(row):
+    """Build an opaque cursor token pointing at a follow row."""
+    key = '%s,%d' % (row['created_at'].strftime('%Y-%m-%dT%H:%M:%S'),
+                     row['account_id'])
+    return urlsafe_b64encode(key.encode()).decode()
 
-    return await db.query_all(sql, account_id=account_id, start_id=start_id,
-                              state=state, limit=limit)
+def _parse_follow_cursor(token):
+    try:
+        created_at, other_id = urlsafe_b64decode(token.encode()).decode().split(',')
+        return (datetime.strptime(created_at, '%Y-%m-%dT%H:%M:%S'), int(other_id))
+    except ValueError:
+        raise AssertionError('invalid cursor `%s`' % token)
 
+async def get_followers(db, account: str, start: str, follow_type: str, limit: int):
+    """Get a list of accounts following a given account."""
+    return await _follows_from(db, 'following', account, start, follow_type, limit)
 
-async def get_following_by_page(db, account: str, page: int, page_size: int, follow_type: str):
-    """Get a list of accounts followed by a given account."""
-    account_id = await _get_account_id(db, account)
-    state = (2, 3) if follow_type == 'ignore' else (1, 3)
+async def get_followers_by_page(db, account: str, page: int, page_size: int, follow_type: str):
+    """Get a list of accounts following a given account."""
+    return await _follows_page(db, 'following', account, page, page_size, follow_type)
 
-    sql = """
-        SELECT name,reputation,state FROM worth_follows hf
-     LEFT JOIN worth_accounts ON hf.following = id
-         WHERE hf.follower = :account_id
-           AND state IN :state
-      ORDER BY hf.created_at DESC
-         LIMIT :limit OFFSET :offset
-    """
+async def get_following(db, account: str, start: str, follow_type: str, limit: int):
+    """Get a list of accounts followed by a given account."""
+    return await _follows_from(db, 'follower', account, start, follow_type, limit)
 
-    return await db.query_all(sql, account_id=account_id,
-                              state=state, limit=page_size, offset=page*page_size)
+async def get_following_by_page(db, account: str, page: int, page_size: int, follow_type: str):
+    """Get a list of accounts followed by a given account."""
+    return await _follows_page(db, 'follower', account, page, page_size, follow_type)
 
+async def list_follows(db, column, account: str, cursor: str, follow_type: str, limit: int):
+    """Get a page of followers (`column`='following') or followings
+    (`column`='follower'), starting after the row `cursor` points at."""
+    account_id = await _get_account_id(db, account)
+    seek = None
+    if cursor:
+        created_at, other_id = _parse_follow_cursor(cursor)
+        # exclusive: skip the row the cursor was taken from
+        seek = (created_at, other_id - 1)
+    return await _follows(db, column, account_id, _follow_state(follow_type),
+                          limit, seek)
 
 async def get_follow_counts(db, account: str):
     """Return following/followers count for `account`."""
@@ -259,10 +293,10 @@ async def pids_by_blog_by_index(db, account: str, start_index: int, limit: int =
     account_id = await _get_account_id(db, account)
 
     if start_index in (-1, 0):
-        sql = """SELECT COUNT(*) - 1 FROM worth_feed_cache
+        sql = """SELECT MAX(entry_id) FROM worth_feed_cache
                   WHERE account_id = :account_id"""
         start_index = await db.query_one(sql, account_id=account_id)
-        if start_index < 0:
+        if start_index is None:
             return (0, [])
 
     offset = start_index - limit + 1
@@ -273,13 +307,13 @@ async def pids_by_blog_by_index(db, account: str, start_index: int, limit: int =
         SELECT post_id
           FROM worth_feed_cache
          WHERE account_id = :account_id
-      ORDER BY created_at
-         LIMIT :limit
-        OFFSET :offset
+           AND entry_id BETWEEN :offset AND :start_index
+      ORDER BY entry_id DESC
     """
 
-    ids = await db.query_col(sql, account_id=account_id, limit=limit, offset=offset)
-    return (start_index, list(reversed(ids)))
+    ids = await db.query_col(sql, account_id=account_id, offset=offset,
+                             start_index=start_index)
+    return (start_index, ids)
 
 
 async def pids_by_blog_without_reblog(db, account: str, start_permlink: str = '', limit: int = 20):
@@ -311,13 +345,18 @@ async def pids_by_feed_with_reblog(db, account: str, start_author: str = '',
     """Get a list of [post_id, reblogged_by_str] for an account's feed."""
     account_id = await _get_account_id(db, account)
 
-    seek = ''
     start_id = None
     if start_permlink:
         start_id = await _get_post_id(db, start_author, start_permlink)
         if not start_id:
             return []
 
+    if await feed_fanout_limit(db):
+        return await pids_by_feed_inbox(db, account_id, start_id, limit,
+                                        last_month())
+
+    seek = ''
+    if start_id:
         seek = """
           HAVING MIN(worth_feed_cache.created_at) <= (
             SELECT MIN(created_at) FROM worth_feed_cache WHERE post_id = :start_id
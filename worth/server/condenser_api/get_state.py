@@ -8,6 +8,7 @@ from aiocache import cached
 
 from worth.utils.normalize import legacy_amount
 from worth.server.common.mutes import Mutes
+from worth.server.common.thread import load_tree
 
 from worth.server.condenser_api.objects import (
     load_accounts,
@@ -21,6 +22,7 @@ from worth.server.common.helpers import (
     valid_permlink,
     valid_sort,
     valid_tag)
+from worth.server.common.response_cache import cached_response
 from worth.server.condenser_api.tags import (
     get_trending_tags,
     get_top_trending_tags_summary)
@@ -82,6 +84,7 @@ POST_LIST_SORTS = [
 ]
 
 @return_error_info
+@cached_response
 async def get_state(context, path: str):
     """`get_state` reimplementation.
 
@@ -221,18 +224,6 @@ async def _load_account(db, name):
         account[key] = []
     return account
 
-async def _child_ids(db, parent_ids):
-    """Load child ids for multuple parent ids."""
-    sql = """
-             SELECT parent_id, array_agg(id)
-               FROM worth_posts
-              WHERE parent_id IN :ids
-                AND is_deleted = '0'
-           GROUP BY parent_id
-    """
-    rows = await db.query_all(sql, ids=tuple(parent_ids))
-    return [[row[0], row[1]] for row in rows]
-
 async def _load_discussion(db, author, permlink):
     """Load a full discussion thread."""
     root_id = await cursor.get_post_id(db, author, permlink)
@@ -240,16 +231,8 @@ async def _load_discussion(db, author, permlink):
         return {}
 
     # build `ids` list and `tree` map
-    ids = []
-    tree = {}
-    todo = [root_id]
-    while todo:
-        ids.extend(todo)
-        rows = await _child_ids(db, todo)
-        todo = []
-        for pid, cids in rows:
-            tree[pid] = cids
-            todo.extend(cids)
+    tree = await load_tree(db, root_id)
+    ids = [root_id] + [cid for cids in tree.values() for cid in cids]
 
     # load all post objects, build ref-map
     posts = await load_posts_keyed(db, ids)
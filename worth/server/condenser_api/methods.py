@@ -12,7 +12,9 @@ from worth.server.common.helpers import (
     valid_tag,
     valid_offset,
     valid_limit,
-    valid_follow_type)
+    valid_follow_type,
+    valid_trx_id)
+from worth.server.common.response_cache import cached_response
 
 # pylint: disable=too-many-arguments,line-too-long,too-many-lines
 
@@ -106,6 +108,41 @@ async def get_following_by_page(context, account: str, page: int, page_size: int
         valid_follow_type(follow_type))
     return [_legacy_follower_with_reputation(account,row['reputation'],row['name'],row['state']) for row in following]
 
+async def _list_follows(context, column, account, start_cursor, follow_type, limit):
+    limit = valid_limit(limit, 1000)
+    rows = await cursor.list_follows(
+        context['db'],
+        column,
+        valid_account(account),
+        start_cursor,
+        valid_follow_type(follow_type),
+        limit)
+    next_cursor = cursor.follow_cursor(rows[-1]) if len(rows) == limit else None
+    return rows, next_cursor
+
+@return_error_info
+async def list_followers(context, account: str, start_cursor: str = None,
+                         follow_type: str = 'blog', limit: int = 100):
+    """Get a page of accounts following `account`.
+
+    Pass the returned `next_cursor` as `start_cursor` to get the next page;
+    it is null on the last page."""
+    rows, next_cursor = await _list_follows(context, 'following', account,
+                                            start_cursor, follow_type, limit)
+    return dict(followers=[_legacy_follower_with_reputation(
+        row['name'], row['reputation'], account, row['state']) for row in rows],
+                next_cursor=next_cursor)
+
+@return_error_info
+async def list_following(context, account: str, start_cursor: str = None,
+                         follow_type: str = 'blog', limit: int = 100):
+    """Get a page of accounts `account` follows. See `list_followers`."""
+    rows, next_cursor = await _list_follows(context, 'follower', account,
+                                            start_cursor, follow_type, limit)
+    return dict(following=[_legacy_follower_with_reputation(
+        account, row['reputation'], row['name'], row['state']) for row in rows],
+                next_cursor=next_cursor)
+
 @return_error_info
 async def get_follow_count(context, account: str):
     """Get follow count stats. (EOL)"""
@@ -188,6 +225,7 @@ def nested_query_compat(function):
 
 @return_error_info
 @nested_query_compat
+@cached_response
 async def get_discussions_by_trending(context, start_author: str = '', start_permlink: str = '',
                                       limit: int = 20, tag: str = None,
                                       truncate_body: int = 0, filter_tags: list = None):
@@ -205,6 +243,7 @@ async def get_discussions_by_trending(context, start_author: str = '', start_per
 
 @return_error_info
 @nested_query_compat
+@cached_response
 async def get_discussions_by_hot(context, start_author: str = '', start_permlink: str = '',
                                  limit: int = 20, tag: str = None,
                                  truncate_body: int = 0, filter_tags: list = None):
@@ -239,6 +278,7 @@ async def get_discussions_by_promoted(context, start_author: str = '', start_per
 
 @return_error_info
 @nested_query_compat
+@cached_response
 async def get_discussions_by_created(context, start_author: str = '', start_permlink: str = '',
                                      limit: int = 20, tag: str = None,
                                      truncate_body: int = 0, filter_tags: list = None):
@@ -439,14 +479,15 @@ async def _get_blog(db, account: str, start_index: int, limit: int = None):
 async def get_transaction(context, trx_id: str):
     """Get transaction by trx_id.
     """
+    trx_id = valid_trx_id(trx_id)
     sql = "SELECT block_num FROM worth_trxid_block_num WHERE trx_id = :trx_id"
-    block_num = await context['db'].query_row(sql, trx_id = trx_id)
+    block_num = await context['db'].query_row(sql, trx_id=bytes.fromhex(trx_id))
     assert block_num != None, 'trx_id does not exist'
-    block = context['worths'].get_block(num = block_num[0])
+    block = await context['block_cache'].get(block_num[0])
     assert block != None, 'block does not exist'
     assert len(block['transactions']) != 0, 'invalid trx_id'
     trx_index = block['transaction_ids'].index(trx_id)
-    trx = block['transactions'][trx_index]
+    trx = dict(block['transactions'][trx_index])
     trx['transaction_id'] = trx_id
     trx['block_num'] = block_num[0]
     trx['transaction_num'] = trx_index
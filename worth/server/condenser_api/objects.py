@@ -5,7 +5,8 @@ import ujson as json
 
 from worth.utils.normalize import wbd_amount, rep_to_raw
 from worth.server.common.mutes import Mutes
-from worth.server.common.helpers import json_date
+from worth.server.common.helpers import json_date, RawJson
+from worth.server.common.post_loader import load_post_rows
 
 log = logging.getLogger(__name__)
 
@@ -40,18 +41,11 @@ async def load_posts_keyed(db, ids, truncate_body=0):
     assert ids, 'no ids passed to load_posts_keyed'
 
     # fetch posts and associated author reps
-    sql = """SELECT post_id, author, permlink, title, body, category, depth,
-                    promoted, payout, payout_at, is_paidout, children, votes,
-                    created_at, updated_at, rshares, raw_json, json
-               FROM worth_posts_cache WHERE post_id IN :ids"""
-    result = await db.query_all(sql, ids=tuple(ids))
-    author_reps = await _query_author_rep_map(db, result)
+    rows = await load_post_rows(db, ids)
 
     muted_accounts = Mutes.all()
     posts_by_id = {}
-    for row in result:
-        row = dict(row)
-        row['author_rep'] = author_reps[row['author']]
+    for row in rows.values():
         post = _condenser_post_object(row, truncate_body=truncate_body)
         post['active_votes'] = _mute_votes(post['active_votes'], muted_accounts)
         posts_by_id[row['post_id']] = post
@@ -88,14 +82,6 @@ async def load_posts(db, ids, truncate_body=0):
 
     return [posts_by_id[_id] for _id in ids]
 
-async def _query_author_rep_map(db, posts):
-    """Given a list of posts, returns an author->reputation map."""
-    if not posts:
-        return {}
-    names = tuple({post['author'] for post in posts})
-    sql = "SELECT name, reputation FROM worth_accounts WHERE name IN :names"
-    return {r['name']: r['reputation'] for r in await db.query_all(sql, names=names)}
-
 def _condenser_account_object(row):
     """Convert an internal account record into legacy-worths style."""
     return {
@@ -147,29 +133,30 @@ def _condenser_post_object(row, truncate_body=0):
 
     post['replies'] = []
     post['body_length'] = len(row['body'])
-    post['active_votes'] = _hydrate_active_votes(row['votes'])
     post['author_reputation'] = rep_to_raw(row['author_rep'])
 
-    # import fields from legacy object
-    assert row['raw_json']
-    assert len(row['raw_json']) > 32
-    raw_json = json.loads(row['raw_json'])
+    # import pre-built fields (legacy object, votes)
+    payload = _payload(row)
+    if row.get('active_votes'):
+        post['active_votes'] = RawJson(row['active_votes'])
+    else:
+        post['active_votes'] = payload['active_votes']
 
     if row['depth'] > 0:
-        post['parent_author'] = raw_json['parent_author']
-        post['parent_permlink'] = raw_json['parent_permlink']
+        post['parent_author'] = payload['parent_author']
+        post['parent_permlink'] = payload['parent_permlink']
     else:
         post['parent_author'] = ''
         post['parent_permlink'] = row['category']
 
-    post['url'] = raw_json['url']
-    post['root_title'] = raw_json['root_title']
-    post['beneficiaries'] = raw_json['beneficiaries']
-    post['max_accepted_payout'] = raw_json['max_accepted_payout']
-    post['percent_worth_dollars'] = raw_json['percent_worth_dollars']
+    post['url'] = payload['url']
+    post['root_title'] = payload['root_title']
+    post['beneficiaries'] = payload['beneficiaries']
+    post['max_accepted_payout'] = payload['max_accepted_payout']
+    post['percent_worth_dollars'] = payload['percent_worth_dollars']
 
     if paid:
-        curator_payout = wbd_amount(raw_json['curator_payout_value'])
+        curator_payout = wbd_amount(payload['curator_payout_value'])
         post['curator_payout_value'] = _amount(curator_payout)
         post['total_payout_value'] = _amount(row['payout'] - curator_payout)
 
@@ -186,6 +173,18 @@ def _amount(amount, asset='WBD'):
     assert asset == 'WBD', 'unhandled asset %s' % asset
     return "%.3f WBD" % amount
 
+def _payload(row):
+    """Get a row's pre-built payload, or derive it for rows cached before
+    `payload` existed."""
+    if row.get('payload'):
+        return json.loads(row['payload'])
+
+    assert row['raw_json']
+    assert len(row['raw_json']) > 32
+    payload = json.loads(row['raw_json'])
+    payload['active_votes'] = _hydrate_active_votes(row['votes'])
+    return payload
+
 def _hydrate_active_votes(vote_csv):
     """Convert minimal CSV representation into worths-style object."""
     if not vote_csv:
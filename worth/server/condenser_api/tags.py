@@ -11,10 +11,9 @@ async def get_top_trending_tags_summary(context):
     #return [tag['name'] for tag in await get_trending_tags('', 50)]
     sql = """
         SELECT category
-          FROM worth_posts_cache
-         WHERE is_paidout = '0'
-      GROUP BY category
-      ORDER BY SUM(payout) DESC
+          FROM worth_tag_stats
+         WHERE total_posts > 0
+      ORDER BY total_payouts DESC
          LIMIT 50
     """
     return await context['db'].query_col(sql)
@@ -29,24 +28,19 @@ async def get_trending_tags(context, start_tag: str = '', limit: int = 250):
 
     if start_tag:
         seek = """
-          HAVING SUM(payout) <= (
-            SELECT SUM(payout)
-              FROM worth_posts_cache
-             WHERE is_paidout = '0'
-               AND category = :start_tag)
+          AND total_payouts <= (
+            SELECT total_payouts
+              FROM worth_tag_stats
+             WHERE category = :start_tag)
         """
     else:
         seek = ''
 
     sql = """
-      SELECT category,
-             COUNT(*) AS total_posts,
-             SUM(CASE WHEN depth = 0 THEN 1 ELSE 0 END) AS top_posts,
-             SUM(payout) AS total_payouts
-        FROM worth_posts_cache
-       WHERE is_paidout = '0'
-    GROUP BY category %s
-    ORDER BY SUM(payout) DESC
+      SELECT category, total_posts, top_posts, total_payouts
+        FROM worth_tag_stats
+       WHERE total_posts > 0 %s
+    ORDER BY total_payouts DESC
        LIMIT :limit
     """ % seek
 
@@ -1,17 +1,37 @@
 """Async DB adapter for worthmind API."""
 
+import asyncio
+import contextvars
 import logging
 from time import perf_counter as perf
 
 import sqlalchemy
+from sqlalchemy.dialects.postgresql.psycopg2 import PGDialect_psycopg2
 from sqlalchemy.engine.url import make_url
-from aiopg.sa import create_engine
+from psycopg2 import OperationalError
+from psycopg2.extras import DictCursor
+from aiopg import create_pool
 
 from worth.utils.stats import Stats
 
 logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)
 log = logging.getLogger(__name__)
 
+_DIALECT = PGDialect_psycopg2()
+
+# replica the current request reads from (False: primary; None: not pinned)
+_PINNED = contextvars.ContextVar('worth_db_replica', default=None)
+
+async def _create_pool(url, pool_size):
+    conf = make_url(url)
+    return await create_pool(user=conf.username,
+                             database=conf.database,
+                             password=conf.password,
+                             host=conf.host,
+                             port=conf.port,
+                             maxsize=pool_size,
+                             **conf.query)
+
 def sqltimer(function):
     """Decorator for DB query methods which tracks timing."""
     async def _wrapper(*args, **kwargs):
@@ -22,89 +42,206 @@ def sqltimer(function):
     return _wrapper
 
 class Db:
-    """Wrapper for aiopg.sa db driver."""
+    """Wrapper for aiopg db driver.
+
+    Queries use `:name` binds. Each distinct statement is compiled to
+    the driver's paramstyle once and then sent as-is through a plain
+    psycopg2 cursor, so hot queries skip per-call SQLAlchemy
+    compilation and result wrapping. Rows support both key and index
+    access.
+
+    Reads may be spread over read replicas, which are only used while
+    their head block is within `MAX_REPLICA_LAG` of the primary's; on
+    replica errors reads fall back to the primary. Writes always go to
+    the primary. `pin_replica` keeps all reads of a request on the same
+    replica, so one response never mixes data from different heads.
+    """
+
+    # max number of compiled statements kept
+    MAX_COMPILED = 5000
+
+    # replicas more than this many blocks behind primary are not read from
+    MAX_REPLICA_LAG = 3
+
+    # seconds between replica lag checks
+    LAG_CHECK_INTERVAL = 5.0
 
     @classmethod
-    async def create(cls, url):
+    async def create(cls, url, pool_size=20, replica_urls=()):
         """Factory method."""
         instance = Db()
-        await instance.init(url)
+        await instance.init(url, pool_size)
+        for replica_url in replica_urls:
+            await instance.add_replica(replica_url, pool_size)
         return instance
 
     def __init__(self):
         self.db = None
         self._prep_sql = {}
+        self._replicas = []
+        self._next_replica = 0
+        self._lag_checked = 0
+        self._lag_check = None
 
-    async def init(self, url):
-        """Initialize the aiopg.sa engine."""
+    async def init(self, url, pool_size=20):
+        """Initialize the aiopg connection pool."""
+        self.db = await _create_pool(url, pool_size)
+
+    async def add_replica(self, url, pool_size=20):
+        """Add a read replica. Reads are routed to it once its lag is known."""
         conf = make_url(url)
-        self.db = await create_engine(user=conf.username,
-                                      database=conf.database,
-                                      password=conf.password,
-                                      host=conf.host,
-                                      port=conf.port,
-                                      maxsize=20,
-                                      **conf.query)
+        self._replicas.append(dict(
+            name='%s:%s/%s' % (conf.host, conf.port or 5432, conf.database),
+            pool=await _create_pool(url, pool_size),
+            head=None, lag=None, healthy=False))
 
     def close(self):
         """Close pool."""
         self.db.close()
+        for replica in self._replicas:
+            replica['pool'].close()
 
     async def wait_closed(self):
         """Wait for releasing and closing all acquired connections."""
         await self.db.wait_closed()
+        for replica in self._replicas:
+            await replica['pool'].wait_closed()
+
+    def replica_status(self):
+        """Get name, head block, lag and health of each replica."""
+        return [{k: v for k, v in replica.items() if k != 'pool'}
+                for replica in self._replicas]
 
     @sqltimer
     async def query_all(self, sql, **kwargs):
         """Perform a `SELECT n*m`"""
-        async with self.db.acquire() as conn:
-            cur = await self._query(conn, sql, **kwargs)
-            res = await cur.fetchall()
-        return res
+        return await self._read(sql, kwargs, lambda cur: cur.fetchall())
 
     @sqltimer
     async def query_row(self, sql, **kwargs):
         """Perform a `SELECT 1*m`"""
-        async with self.db.acquire() as conn:
-            cur = await self._query(conn, sql, **kwargs)
-            res = await cur.first()
-        return res
+        return await self._read(sql, kwargs, lambda cur: cur.fetchone())
 
     @sqltimer
     async def query_col(self, sql, **kwargs):
         """Perform a `SELECT n*1`"""
-        async with self.db.acquire() as conn:
-            cur = await self._query(conn, sql, **kwargs)
-            res = await cur.fetchall()
-        return [r[0] for r in res]
+        rows = await self._read(sql, kwargs, lambda cur: cur.fetchall())
+        return [r[0] for r in rows]
 
     @sqltimer
     async def query_one(self, sql, **kwargs):
         """Perform a `SELECT 1*1`"""
-        async with self.db.acquire() as conn:
-            cur = await self._query(conn, sql, **kwargs)
-            row = await cur.first()
+        row = await self._read(sql, kwargs, lambda cur: cur.fetchone())
+        return row[0] if row else None
+
+    @sqltimer
+    async def query_primary_one(self, sql, **kwargs):
+        """Perform a `SELECT 1*1` on the primary, bypassing replicas."""
+        row = await self._fetch(self.db, sql, kwargs, lambda cur: cur.fetchone())
         return row[0] if row else None
 
     @sqltimer
     async def query(self, sql, **kwargs):
         """Perform a write query"""
-        async with self.db.acquire() as conn:
-            await self._query(conn, sql, **kwargs)
-
-    async def _query(self, conn, sql, **kwargs):
-        """Send a query off to SQLAlchemy."""
+        await self._fetch(self.db, sql, kwargs, None)
+
+    async def _read(self, sql, kwargs, fetch):
+        """Run a read query on a replica if one is usable, else primary."""
+        replica = self._replica()
+        if replica:
+            try:
+                return await self._fetch(replica['pool'], sql, kwargs, fetch)
+            except OperationalError:
+                log.warning("[SQL] replica %s failed; using primary", replica['name'])
+                replica['healthy'] = False
+        return await self._fetch(self.db, sql, kwargs, fetch)
+
+    async def _fetch(self, pool, sql, kwargs, fetch):
+        async with pool.acquire() as conn:
+            async with conn.cursor(cursor_factory=DictCursor) as cur:
+                await self._query(cur, sql, **kwargs)
+                if fetch:
+                    return await fetch(cur)
+        return None
+
+    def pin_replica(self):
+        """Send the rest of the current task's reads to a single replica.
+
+        Called at the start of each request; tasks the request spawns
+        afterwards inherit the choice. If the replica becomes unusable,
+        remaining reads go to the primary.
+        """
+        _PINNED.set(self._next() or False)
+
+    def _replica(self):
+        """Pick the replica for a read: the pinned one, else the next one."""
+        pinned = _PINNED.get()
+        if pinned is None:
+            return self._next()
+        if pinned and pinned in self._usable():
+            return pinned
+        return None
+
+    def _next(self):
+        """Pick the next healthy replica within lag limits, if any."""
+        usable = self._usable()
+        if not usable:
+            return None
+        self._next_replica = (self._next_replica + 1) % len(usable)
+        return usable[self._next_replica]
+
+    def _usable(self):
+        """List replicas fit for reads; schedules a lag check when due."""
+        if not self._replicas:
+            return []
+
+        if not self._lag_check and perf() - self._lag_checked > self.LAG_CHECK_INTERVAL:
+            self._lag_checked = perf()
+            self._lag_check = asyncio.ensure_future(self._check_lag())
+
+        return [r for r in self._replicas if r['healthy']
+                and r['lag'] is not None and r['lag'] <= self.MAX_REPLICA_LAG]
+
+    async def _check_lag(self):
+        """Compare each replica's head block against the primary's."""
+        sql = "SELECT num FROM worth_blocks ORDER BY num DESC LIMIT 1"
+        fetch = lambda cur: cur.fetchone()
+        try:
+            head = (await self._fetch(self.db, sql, {}, fetch))[0]
+            for replica in self._replicas:
+                try:
+                    row = await self._fetch(replica['pool'], sql, {}, fetch)
+                    assert row, 'no blocks'
+                    replica['head'] = row[0]
+                    replica['lag'] = head - row[0]
+                    replica['healthy'] = True
+                except Exception as e: # pylint: disable=broad-except
+                    log.warning("[SQL] replica %s unavailable: %r", replica['name'], e)
+                    replica['healthy'] = False
+                if replica['healthy'] and replica['lag'] > self.MAX_REPLICA_LAG:
+                    log.info("[SQL] replica %s lagging %d blocks",
+                             replica['name'], replica['lag'])
+        except Exception as e: # pylint: disable=broad-except
+            log.warning("[SQL] replica lag check failed: %r", e)
+            for replica in self._replicas:
+                replica['healthy'] = False
+        finally:
+            self._lag_check = None
+
+    async def _query(self, cur, sql, **kwargs):
+        """Execute a compiled query on a cursor."""
         try:
-            return await conn.execute(self._sql_text(sql), **kwargs)
+            await cur.execute(self._compiled(sql), kwargs)
         except Exception as e:
             log.warning("[SQL-ERR] %s in query %s (%s)",
                         e.__class__.__name__, sql, kwargs)
             raise e
 
-    def _sql_text(self, sql):
-        if sql in self._prep_sql:
-            query = self._prep_sql[sql]
-        else:
-            query = sqlalchemy.text(sql).execution_options(autocommit=False)
-            self._prep_sql[sql] = query
-        return query
+    def _compiled(self, sql):
+        """Get `sql` with `:name` binds as psycopg2 `%(name)s` params."""
+        if sql not in self._prep_sql:
+            if len(self._prep_sql) >= self.MAX_COMPILED:
+                self._prep_sql.clear()
+            query = sqlalchemy.text(sql).compile(dialect=_DIALECT)
+            self._prep_sql[sql] = str(query)
+        return self._prep_sql[sql]
@@ -0,0 +1,214 @@
+"""Fast JSON-RPC 2.0 dispatch for the API server."""
+
+import asyncio
+import inspect
+import logging
+
+import ujson as json
+from aiohttp import web
+
+log = logging.getLogger(__name__)
+request_log = logging.getLogger(__name__ + '.request')
+response_log = logging.getLogger(__name__ + '.response')
+
+NOID = object()
+
+PARSE_ERROR = (-32700, 'Invalid JSON')
+INVALID_REQUEST = (-32600, 'Invalid JSON-RPC')
+METHOD_NOT_FOUND = (-32601, 'Method not found')
+INVALID_PARAMS = (-32602, 'Invalid parameters')
+SERVER_ERROR = (-32000, 'Server error')
+
+HEADERS = {'Access-Control-Allow-Origin': '*'}
+
+def _error(err, data=None, _id=None):
+    code, message = err
+    error = {'code': code, 'message': message}
+    if data is not None:
+        error['data'] = data
+    return {'jsonrpc': '2.0', 'error': error, 'id': _id}
+
+def _valid(req):
+    """Check a request object's members against the JSON-RPC 2.0 spec."""
+    return (isinstance(req, dict)
+            and req.get('jsonrpc') == '2.0'
+            and isinstance(req.get('method'), str)
+            and isinstance(req.get('params', []), (list, dict))
+            and (req.get('id') is None
+                 or (isinstance(req['id'], (str, int, float))
+                     and not isinstance(req['id'], bool))))
+
+class Dispatcher:
+    """Routes JSON-RPC requests straight to registered methods.
+
+    Replaces `jsonrpcserver.async_dispatch` on the request path: methods
+    are looked up directly, params are checked against a cached
+    signature, and responses are encoded once with ujson into the
+    response body. Batch results are streamed to the client as each
+    call finishes. Error codes, messages and data match jsonrpcserver's
+    (with debug enabled), including its mapping of TypeError and
+    AssertionError to invalid params.
+
+    Calls of a batch run concurrently, at most `BATCH_CONCURRENCY` at a
+    time so one batch cannot take over the db pool. Identical calls
+    (same method and params) within a batch are run only once. Each
+    call is limited to `CALL_TIMEOUT` seconds and the whole batch to
+    `BATCH_TIMEOUT`; calls over the limit get a server error.
+    """
+
+    # max calls of one batch running at once
+    BATCH_CONCURRENCY = 8
+
+    # seconds allowed for a single call of a batch
+    CALL_TIMEOUT = 10.0
+
+    # seconds allowed for all calls of a batch
+    BATCH_TIMEOUT = 30.0
+
+    def __init__(self, methods, context):
+        self._context = context
+        self._methods = {name: (func, inspect.signature(func))
+                         for name, func in methods.items.items()}
+
+    async def handle(self, request):
+        """aiohttp handler for `POST /`."""
+        body = await request.text()
+        request_log.info(body)
+        reqs = self._parse(body)
+        if isinstance(reqs, list):
+            return await self._stream_batch(request, reqs)
+
+        response = await self._call(reqs)
+        if response is None:
+            return web.Response()
+        return self._response(self._encode(response))
+
+    def _parse(self, body):
+        """Decode a request body into a request dict or a batch list.
+
+        Undecodable or malformed requests are replaced with the error
+        response they should produce.
+        """
+        try:
+            reqs = json.loads(body)
+        except ValueError as e:
+            return _Failed(_error(PARSE_ERROR, str(e)))
+        if isinstance(reqs, list):
+            if not reqs:
+                return _Failed(_error(INVALID_REQUEST))
+            return [req if _valid(req) else _Failed(_error(INVALID_REQUEST))
+                    for req in reqs]
+        return reqs if _valid(reqs) else _Failed(_error(INVALID_REQUEST))
+
+    async def _call(self, req, execution=None):
+        """Run one request; returns the response dict, or None if unwanted.
+
+        If `execution` is given, it is awaited for the outcome instead
+        of running the method here.
+        """
+        if isinstance(req, _Failed):
+            return req.response
+
+        if execution is None:
+            execution = self._execute(req['method'], req.get('params', []))
+        response = await execution
+        _id = req.get('id', NOID)
+        return None if _id is NOID else dict(response, id=_id)
+
+    async def _execute(self, method, params):
+        """Call a method; returns a response dict with a null id."""
+        args, kwargs = (params, {}) if isinstance(params, list) else ([], params)
+        try:
+            if method not in self._methods:
+                raise KeyError(method)
+            func, sig = self._methods[method]
+            sig.bind(self._context, *args, **kwargs)
+            result = await func(self._context, *args, **kwargs)
+            return {'jsonrpc': '2.0', 'result': result, 'id': None}
+        except KeyError:
+            # jsonrpcserver reports any KeyError as a missing method
+            return _error(METHOD_NOT_FOUND, method)
+        except (TypeError, AssertionError) as e:
+            return _error(INVALID_PARAMS, str(e))
+        except Exception as e: # pylint: disable=broad-except
+            return _error(SERVER_ERROR, "%s: %s" % (e.__class__.__name__, e))
+
+    def _batch_calls(self, reqs):
+        """Schedule the calls of a batch; one future per request."""
+        loop = asyncio.get_event_loop()
+        limit = asyncio.Semaphore(self.BATCH_CONCURRENCY)
+        deadline = loop.time() + self.BATCH_TIMEOUT
+
+        async def _limited(method, params):
+            async with limit:
+                timeout = max(min(self.CALL_TIMEOUT, deadline - loop.time()), 0)
+                try:
+                    return await asyncio.wait_for(
+                        self._execute(method, params), timeout)
+                except asyncio.TimeoutError:
+                    return _error(SERVER_ERROR, 'TimeoutError: call timed out')
+
+        executions = {}
+        calls = []
+        for req in reqs:
+            execution = None
+            if not isinstance(req, _Failed):
+                params = req.get('params', [])
+                key = (req['method'], json.dumps(params, sort_keys=True))
+                if key not in executions:
+                    executions[key] = asyncio.ensure_future(
+                        _limited(req['method'], params))
+                execution = executions[key]
+            calls.append(asyncio.ensure_future(self._call(req, execution)))
+        return calls
+
+    @staticmethod
+    def _encode(response):
+        try:
+            out = json.dumps(response, escape_forward_slashes=False)
+        except (TypeError, OverflowError) as e:
+            log.error("could not encode response: %s", e)
+            data = "%s: %s" % (e.__class__.__name__, e)
+            out = json.dumps(_error(SERVER_ERROR, data, response['id']))
+        if response_log.isEnabledFor(logging.INFO):
+            response_log.info(out)
+        return out.encode('utf-8')
+
+    @staticmethod
+    def _response(body):
+        return web.Response(body=body, content_type='application/json',
+                            headers=HEADERS)
+
+    async def _stream_batch(self, request, reqs):
+        """Write batch responses as their calls complete."""
+        calls = self._batch_calls(reqs)
+        resp = None
+        try:
+            for done in asyncio.as_completed(calls):
+                response = await done
+                if response is None:
+                    continue
+                if not resp:
+                    resp = web.StreamResponse(headers=HEADERS)
+                    resp.content_type = 'application/json'
+                    await resp.prepare(request)
+                    await resp.write(b'[')
+                else:
+                    await resp.write(b',')
+                await resp.write(self._encode(response))
+        finally:
+            for call in calls:
+                call.cancel()
+
+        # batch of notifications only: nothing to return
+        if not resp:
+            return web.Response()
+        await resp.write(b']')
+        await resp.write_eof()
+        return resp
+
+class _Failed:
+    """A request which failed validation, holding its error response."""
+    # pylint: disable=too-few-public-methods
+    def __init__(self, response):
+        self.response = response
@@ -6,17 +6,22 @@ import logging
 import time
 
 from datetime import datetime
-from sqlalchemy.exc import OperationalError
+from psycopg2 import OperationalError
 from aiohttp import web
 from jsonrpcserver.methods import Methods
-from jsonrpcserver import async_dispatch as dispatch
 
 from worth.server.condenser_api import methods as condenser_api
 from worth.server.condenser_api.tags import get_trending_tags as condenser_api_get_trending_tags
 from worth.server.condenser_api.get_state import get_state as condenser_api_get_state
 from worth.server.condenser_api.call import call as condenser_api_call
+from worth.server.common.block_cache import BlockCache
 from worth.server.common.mutes import Mutes
-from worth.server.common.payout_stats import PayoutStats
+from worth.server.common.response_cache import ResponseCache
+from worth.server.common.ranking import RankingEngine
+from worth.server.common.post_loader import PostLoader
+from worth.server.common.community_cache import CommunityCache
+from worth.server.common.account_names import AccountNames
+from worth.server.common.posts_status import PostsStatus
 
 from worth.server.bridge_api import methods as bridge_api
 from worth.server.bridge_api.thread import get_discussion as bridge_api_get_discussion
@@ -27,6 +32,8 @@ from worth.server.worth_api import notify as worth_api_notify
 from worth.server.worth_api import stats as worth_api_stats
 
 from worth.server.db import Db
+from worth.server.rpc import Dispatcher
+from worth.server.workers import WorkerPool
 
 # pylint: disable=too-many-lines
 
@@ -54,6 +61,8 @@ def build_methods():
         condenser_api.get_following,
         condenser_api.get_followers_by_page,
         condenser_api.get_following_by_page,
+        condenser_api.list_followers,
+        condenser_api.list_following,
         condenser_api.get_follow_count,
         condenser_api.get_content,
         condenser_api.get_content_replies,
@@ -90,6 +99,8 @@ def build_methods():
         'follow_api.get_following': condenser_api.get_following,
         'follow_api.get_followers_by_page': condenser_api.get_followers_by_page,
         'follow_api.get_following_by_page': condenser_api.get_following_by_page,
+        'follow_api.list_followers': condenser_api.list_followers,
+        'follow_api.list_following': condenser_api.list_following,
         'follow_api.get_follow_count': condenser_api.get_follow_count,
         'follow_api.get_account_reputations': condenser_api.get_account_reputations,
         'follow_api.get_blog': condenser_api.get_blog,
@@ -143,7 +154,7 @@ def build_methods():
     return methods
 
 def truncate_response_log(logger):
-    """Overwrite jsonrpcserver resp logger to truncate output.
+    """Overwrite rpc request/response logger to truncate output.
 
     https://github.com/bcb/jsonrpcserver/issues/65 was one native
     attempt but helps little for more complex response structs.
@@ -161,12 +172,12 @@ def run_server(conf):
     """Configure and launch the API server."""
     #pylint: disable=too-many-statements
 
-    # configure jsonrpcserver logging
+    # configure rpc logging
     log_level = conf.log_level()
     logging.getLogger('aiohttp.access').setLevel(logging.WARNING)
-    logging.getLogger('jsonrpcserver.dispatcher.response').setLevel(log_level)
-    truncate_response_log(logging.getLogger('jsonrpcserver.dispatcher.request'))
-    truncate_response_log(logging.getLogger('jsonrpcserver.dispatcher.response'))
+    logging.getLogger('worth.server.rpc.response').setLevel(log_level)
+    truncate_response_log(logging.getLogger('worth.server.rpc.request'))
+    truncate_response_log(logging.getLogger('worth.server.rpc.response'))
 
     # init
     log = logging.getLogger(__name__)
@@ -175,20 +186,34 @@ def run_server(conf):
     mutes = Mutes(conf.get('muted_accounts_url'))
     Mutes.set_shared_instance(mutes)
 
-    app = web.Application()
+    @web.middleware
+    async def pin_replica(request, handler):
+        """Serve all reads of a request from the same db replica."""
+        request.app['db'].pin_replica()
+        return await handler(request)
+
+    app = web.Application(middlewares=[pin_replica])
     app['config'] = dict()
     app['config']['args'] = conf.args()
     app['config']['worth.MAX_DB_ROW_RESULTS'] = 100000
     app['worths'] = conf.worth()
+    app['block_cache'] = BlockCache(app['worths'])
     #app['config']['worth.logger'] = logger
 
     async def init_db(app):
         """Initialize db adapter."""
         args = app['config']['args']
-        app['db'] = await Db.create(args['database_url'])
-
-        stats = PayoutStats(app['db'])
-        stats.set_shared_instance(stats)
+        replicas = [url for url in args['database_replica_urls'].split(',') if url]
+        app['db'] = await Db.create(args['database_url'], args['db_pool_size'],
+                                    replicas)
+
+        cache = ResponseCache(app['db'])
+        ResponseCache.set_shared_instance(cache)
+        PostLoader.set_shared_instance(PostLoader(app['db'], cache.head_block))
+        CommunityCache.set_shared_instance(CommunityCache(app['db'], cache.head_block))
+        AccountNames.set_shared_instance(AccountNames(app['db']))
+        PostsStatus.set_shared_instance(PostsStatus(app['db']))
+        RankingEngine.set_shared_instance(RankingEngine(app['db']))
 
     async def close_db(app):
         """Teardown db adapter."""
@@ -243,25 +268,25 @@ def run_server(conf):
             result=result,
             status='OK' if status == 200 else 'WARN',
             sync_service=is_syncer,
+            replicas=app['db'].replica_status(),
+            response_cache=ResponseCache.instance().stats(),
+            post_loader=PostLoader.instance().stats(),
             source_commit=os.environ.get('SOURCE_COMMIT'),
             schema_hash=os.environ.get('SCHEMA_HASH'),
             docker_tag=os.environ.get('DOCKER_TAG'),
             timestamp=datetime.utcnow().isoformat()))
 
-    async def jsonrpc_handler(request):
-        """Handles all worth jsonrpc API requests."""
-        request = await request.text()
-        # debug=True refs https://github.com/bcb/jsonrpcserver/issues/71
-        response = await dispatch(request, methods=methods, debug=True, context=app)
-        if response.wanted:
-            headers = {'Access-Control-Allow-Origin': '*'}
-            return web.json_response(response.deserialized(), status=200, headers=headers)
-        return web.Response()
-
     if conf.get('sync_to_s3'):
         app.router.add_get('/head_age', head_age)
     app.router.add_get('/.well-known/healthcheck.json', health)
     app.router.add_get('/health', health)
-    app.router.add_post('/', jsonrpc_handler)
-
-    web.run_app(app, port=app['config']['args']['http_server_port'])
+    app.router.add_post('/', Dispatcher(methods, app).handle)
+
+    port = app['config']['args']['http_server_port']
+    workers = app['config']['args']['http_server_workers']
+    if workers > 1:
+        # each worker binds its own socket and sets up its own db pool
+        target = lambda: web.run_app(app, port=port, reuse_port=True)
+        WorkerPool(target, workers).run()
+    else:
+        web.run_app(app, port=port)
@@ -0,0 +1,143 @@
+"""Pre-fork process manager for the API server."""
+
+import logging
+import os
+import signal
+import time
+
+log = logging.getLogger(__name__)
+
+class WorkerPool:
+    """Forks and supervises API server worker processes.
+
+    Each worker runs its own event loop, db pool and caches, and binds
+    the server port with SO_REUSEPORT so the kernel balances connections
+    between them. State loaded before `run` (e.g. mutes) is inherited by
+    all workers. Workers which die are replaced; SIGHUP replaces all
+    workers one at a time, and SIGTERM/SIGINT stops them.
+
+    Replacements of workers which die soon after starting are delayed
+    exponentially; after `MAX_FAILURES` such deaths in a row (e.g. a bad
+    db url) the pool stops and `run` raises.
+    """
+
+    # seconds between starting a replacement and stopping the old worker
+    RECYCLE_DELAY = 2.0
+
+    # seconds to wait before replacing a crashed worker (doubled per failure)
+    RESTART_DELAY = 1.0
+    MAX_RESTART_DELAY = 60.0
+
+    # a worker dying within this many seconds of starting counts as a failure
+    MIN_UPTIME = 10.0
+
+    # consecutive failures after which the pool gives up
+    MAX_FAILURES = 6
+
+    def __init__(self, target, size):
+        assert size > 0, 'invalid worker count'
+        self._target = target
+        self._size = size
+        self._pids = {}
+        self._retiring = set()
+        self._restarts = []
+        self._failures = 0
+        self._stopping = False
+        self._recycle = False
+
+    def run(self):
+        """Start workers and supervise them until stopped."""
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_recycle)
+
+        for _ in range(self._size):
+            self._spawn()
+
+        while self._pids or (self._restarts and not self._stopping):
+            if self._recycle:
+                self._recycle = False
+                self._recycle_all()
+            self._reap()
+            self._restart_due()
+            time.sleep(0.2)
+        log.info("[SERVER] all workers stopped")
+        if self._failures >= self.MAX_FAILURES:
+            raise Exception("workers failed %d times in a row" % self._failures)
+
+    def _spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+                signal.signal(signum, signal.SIG_DFL)
+            code = 0
+            try:
+                self._target()
+            except Exception: # pylint: disable=broad-except
+                log.exception("[SERVER] worker %d failed", os.getpid())
+                code = 1
+            finally:
+                os._exit(code) # pylint: disable=protected-access
+        self._pids[pid] = time.time()
+        log.info("[SERVER] started worker %d", pid)
+
+    def _reap(self):
+        while self._pids:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if not pid:
+                return
+            if pid not in self._pids:
+                continue
+            started = self._pids.pop(pid)
+            if pid in self._retiring:
+                self._retiring.discard(pid)
+            elif not self._stopping:
+                self._schedule_restart(pid, status, time.time() - started)
+
+    def _schedule_restart(self, pid, status, uptime):
+        if uptime >= self.MIN_UPTIME:
+            self._failures = 0
+        self._failures += 1
+        if self._failures >= self.MAX_FAILURES:
+            log.error("[SERVER] worker %d exited (%d); %d failures in a row, "
+                      "giving up", pid, status, self._failures)
+            self._on_stop(None, None)
+            return
+        delay = min(self.RESTART_DELAY * 2 ** (self._failures - 1),
+                    self.MAX_RESTART_DELAY)
+        log.warning("[SERVER] worker %d exited (%d); restarting in %.0fs",
+                    pid, status, delay)
+        self._restarts.append(time.time() + delay)
+
+    def _restart_due(self):
+        """Start replacements whose delay has passed."""
+        now = time.time()
+        due = [at for at in self._restarts if at <= now]
+        self._restarts = [at for at in self._restarts if at > now]
+        for _ in due:
+            if not self._stopping:
+                self._spawn()
+
+    def _recycle_all(self):
+        """Replace each worker, starting its successor before stopping it."""
+        log.info("[SERVER] recycling %d workers", len(self._pids))
+        for pid in list(set(self._pids) - self._retiring):
+            if self._stopping:
+                return
+            self._spawn()
+            time.sleep(self.RECYCLE_DELAY)
+            self._retiring.add(pid)
+            os.kill(pid, signal.SIGTERM)
+            self._reap()
+
+    def _on_stop(self, signum, frame):
+        # pylint: disable=unused-argument
+        if not self._stopping:
+            log.info("[SERVER] stopping %d workers", len(self._pids))
+            self._stopping = True
+            for pid in list(self._pids):
+                os.kill(pid, signal.SIGTERM)
+
+    def _on_recycle(self, signum, frame):
+        # pylint: disable=unused-argument
+        self._recycle = True
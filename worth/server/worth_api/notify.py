@@ -2,7 +2,9 @@
 import logging
 
 from worth.server.common.helpers import return_error_info, json_date
-from worth.indexer.notify import NotifyType
+from worth.server.common.account_names import account_names
+from worth.server.common.community_cache import load_communities
+from worth.indexer.notify import Notify, NotifyType
 from worth.server.worth_api.common import get_account_id, valid_limit, get_post_id
 
 log = logging.getLogger(__name__)
@@ -45,13 +47,17 @@ async def unread_notifications(context, account, min_score=25):
     db = context['db']
     account_id = await get_account_id(db, account)
 
-    sql = """SELECT lastread_at,
-                    (SELECT COUNT(*) FROM worth_notifs
-                      WHERE dst_id = ha.id
-                        AND score >= :min_score
-                        AND created_at > lastread_at) unread
+    if min_score in Notify.UNREAD_BUCKETS:
+        unread = """SELECT COALESCE(SUM(unread), 0) FROM worth_notifs_unread
+                     WHERE account_id = ha.id AND bucket >= :min_score"""
+    else:
+        unread = """SELECT COUNT(*) FROM worth_notifs
+                     WHERE dst_id = ha.id
+                       AND score >= :min_score
+                       AND created_at > lastread_at"""
+    sql = """SELECT lastread_at, (%s) unread
                FROM worth_accounts ha
-              WHERE id = :account_id"""
+              WHERE id = :account_id""" % unread
     row = await db.query_row(sql, account_id=account_id, min_score=min_score)
     return dict(lastread=str(row['lastread_at']), unread=row['unread'])
 
@@ -64,13 +70,9 @@ async def account_notifications(context, account, min_score=25, last_id=None, li
 
     if account[:5] == 'worth-': min_score = 0
 
-    seek = ' AND hn.id < :last_id' if last_id else ''
-    col = 'hn.community_id' if account[:5] == 'worth-' else 'dst_id'
-    sql = _notifs_sql(col + " = :dst_id" + seek)
-
-    rows = await db.query_all(sql, min_score=min_score, dst_id=account_id,
-                              last_id=last_id, limit=limit)
-    return [_render(row) for row in rows]
+    col = 'community_id' if account[:5] == 'worth-' else 'dst_id'
+    return await _notifs(db, col + " = :dst_id", min_score, last_id, limit,
+                         dst_id=account_id)
 
 @return_error_info
 async def post_notifications(context, author, permlink, min_score=25, last_id=None, limit=100):
@@ -80,29 +82,62 @@ async def post_notifications(context, author, permlink, min_score=25, last_id=No
     limit = valid_limit(limit, 100)
     post_id = await get_post_id(db, author, permlink)
 
-    seek = ' AND hn.id < :last_id' if last_id else ''
-    sql = _notifs_sql("post_id = :post_id" + seek)
-
-    rows = await db.query_all(sql, min_score=min_score, post_id=post_id,
-                              last_id=last_id, limit=limit)
-    return [_render(row) for row in rows]
-
-def _notifs_sql(where):
-    sql = """SELECT hn.id, hn.type_id, hn.score, hn.created_at,
-                    src.name src, dst.name dst,
-                    hp.author, hp.permlink, hc.name community,
-                    hc.title community_title, payload
-               FROM worth_notifs hn
-          LEFT JOIN worth_accounts src ON hn.src_id = src.id
-          LEFT JOIN worth_accounts dst ON hn.dst_id = dst.id
-          LEFT JOIN worth_posts hp ON hn.post_id = hp.id
-          LEFT JOIN worth_communities hc ON hn.community_id = hc.id
-          WHERE %s
-            AND score >= :min_score
-            AND COALESCE(hp.is_deleted, False) = False
-       ORDER BY hn.id DESC
-          LIMIT :limit"""
-    return sql % where
+    return await _notifs(db, "post_id = :post_id", min_score, last_id, limit,
+                         post_id=post_id)
+
+async def _notifs(db, where, min_score, last_id, limit, **params):
+    """Get rendered notifications, newest first.
+
+    Rows come from a single scan of `worth_notifs`; names are filled in
+    from the account and community caches and post refs are looked up
+    by id. Notifications on deleted posts are skipped, reading further
+    rows until the page is full.
+    """
+    # pylint: disable=too-many-arguments
+    sql = """SELECT id, type_id, score, created_at, src_id, dst_id,
+                    post_id, community_id, payload
+               FROM worth_notifs
+              WHERE %s AND score >= :min_score %s
+           ORDER BY id DESC
+              LIMIT :limit"""
+
+    out = []
+    while len(out) < limit:
+        seek = 'AND id < :last_id' if last_id else ''
+        rows = await db.query_all(sql % (where, seek), min_score=min_score,
+                                  last_id=last_id, limit=limit, **params)
+        rows = [dict(row) for row in rows]
+        out.extend(await _resolve(db, rows))
+        if len(rows) < limit:
+            break
+        last_id = rows[-1]['id']
+    return [_render(row) for row in out[:limit]]
+
+async def _resolve(db, rows):
+    """Add names and post refs to notif rows; drop those on deleted posts."""
+    pids = {row['post_id'] for row in rows if row['post_id']}
+    posts = {}
+    if pids:
+        sql = "SELECT id, author, permlink, is_deleted FROM worth_posts WHERE id IN :ids"
+        posts = {row[0]: row for row in await db.query_all(sql, ids=tuple(pids))}
+
+    aids = {row[key] for row in rows for key in ('src_id', 'dst_id') if row[key]}
+    names = await account_names(db, aids)
+    communities = await load_communities(
+        db, {row['community_id'] for row in rows if row['community_id']})
+
+    out = []
+    for row in rows:
+        post = posts.get(row['post_id'])
+        if post and post['is_deleted']:
+            continue
+        row['author'], row['permlink'] = (post[1], post[2]) if post else (None, None)
+        row['src'] = names.get(row['src_id'])
+        row['dst'] = names.get(row['dst_id'])
+        row['community'] = communities.name(row['community_id'])
+        row['community_title'] = communities.title(row['community_id'])
+        out.append(row)
+    return out
 
 def _render(row):
     """Convert object to string rep."""
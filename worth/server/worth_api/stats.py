@@ -2,7 +2,6 @@
 import logging
 
 from worth.server.common.helpers import return_error_info
-from worth.server.common.payout_stats import PayoutStats
 from worth.server.worth_api.common import valid_limit
 
 log = logging.getLogger(__name__)
@@ -19,13 +18,13 @@ def _row(row):
 
 @return_error_info
 async def get_payout_stats(context, limit=250):
-    """Get payout stats for building treemap."""
+    """Get payout stats for building treemap.
+
+    `payout_stats` is rebuilt hourly by the indexer.
+    """
     db = context['db']
     limit = valid_limit(limit, 250)
 
-    stats = PayoutStats.instance()
-    await stats.generate()
-
     sql = """
         SELECT hc.name, hc.title, author, payout, posts, authors
           FROM payout_stats
@@ -46,4 +45,4 @@ async def get_payout_stats(context, limit=250):
               WHERE community_id IS NULL AND author IS NULL"""
     blog_ttl = await db.query_one(sql)
 
-    return dict(items=items, total=float(total), blogs=float(blog_ttl))
+    return dict(items=items, total=float(total or 0), blogs=float(blog_ttl or 0))
@@ -3,6 +3,7 @@ import logging
 
 from worth.server.worth_api.common import url_to_id, valid_comment_sort, valid_limit
 from worth.server.worth_api.objects import comments_by_id
+from worth.server.common.thread import load_tree
 log = logging.getLogger(__name__)
 
 # pylint: disable=too-many-arguments
@@ -99,36 +100,20 @@ def _build_tree(root_ids, tree, comments, sort_ids):
 
 async def _load_tree(db, root_id, muted, max_depth):
     """Build `ids` list and `tree` map."""
+    where = "worth_posts.is_muted = '0' AND worth_posts.is_valid = '1'"
+    if muted:
+        where += " AND worth_posts.author NOT IN :muted"
+    tree = await load_tree(db, root_id, where, max_depth=max_depth + 1,
+                           muted=tuple(muted))
+
     parent = {} # only loaded to max_depth
-    tree = {}   # loaded to max_depth + 1
     todo = [root_id]
-    depth = 0
-    while todo:
-        depth += 1
-        rows = await _child_ids(db, todo, muted)
-        todo = []
-        for pid, cids in rows:
-            tree[pid] = cids
-            todo.extend(cids)
-            if depth <= max_depth:
-                for cid in cids:
-                    parent[cid] = pid
-        if depth > max_depth:
-            break
+    for _ in range(max_depth):
+        level = []
+        for pid in todo:
+            for cid in tree.get(pid, []):
+                parent[cid] = pid
+                level.append(cid)
+        todo = level
 
     return (tree, parent)
-
-async def _child_ids(db, parent_ids, muted):
-    """Load child ids for multiple parent ids."""
-    filt = 'AND author NOT IN :muted' if muted else ''
-    sql = """
-             SELECT parent_id, array_agg(id)
-               FROM worth_posts
-              WHERE parent_id IN :ids
-                AND is_deleted = '0'
-                AND is_muted = '0'
-                AND is_valid = '1' %s
-           GROUP BY parent_id
-    """ % filt
-    rows = await db.query_all(sql, ids=tuple(parent_ids), muted=tuple(muted))
-    return [[row[0], row[1]] for row in rows]
@@ -6,7 +6,8 @@ import math
 import ujson as json
 from funcy.seqs import first, distinct
 
-from worth.utils.normalize import wbd_amount, rep_log10, safe_img_url, parse_time, utc_timestamp
+from worth.utils.normalize import (wbd_amount, rep_log10, rep_to_raw, safe_img_url,
+                                   parse_time, utc_timestamp)
 
 def mentions(body):
     """Given a post body, return proper @-mentioned account names."""
@@ -91,6 +92,8 @@ def post_to_internal(post, post_id, level='insert', promoted=None):
         ('is_grayed',   stats['gray']),
         ('author_rep',  stats['author_rep']),
         ('children',    min(post['children'], 32767)),
+        ('payload',     json.dumps(post_payload(post))),
+        ('active_votes', json.dumps(post_active_votes(post))),
     ])
 
     return values
@@ -176,6 +179,29 @@ def post_legacy(post):
                'allow_curation_rewards', 'beneficiaries']
     return {k: v for k, v in post.items() if k in _legacy}
 
+def post_payload(post):
+    """Return pre-built API fields, so servers need not derive them per read.
+
+    Holds the legacy fields the API objects expose. Rewritten on every
+    cache update.
+    """
+    return {k: post[k] for k in ['url', 'root_title', 'parent_author',
+                                 'parent_permlink', 'beneficiaries',
+                                 'max_accepted_payout',
+                                 'percent_worth_dollars',
+                                 'curator_payout_value']}
+
+def post_active_votes(post):
+    """Return condenser-style `active_votes` (reputation in raw form).
+
+    Stored JSON-encoded, so servers can splice it into responses as is.
+    """
+    return [dict(voter=vote['voter'],
+                 rshares=str(vote['rshares']),
+                 percent=str(vote['percent']),
+                 reputation=rep_to_raw(rep_log10(vote['reputation'])))
+            for vote in post['active_votes']]
+
 def post_payout(post):
     """Get current vote/payout data and recalculate trend/hot score."""
     # total payout (completed and/or pending)